@@ -0,0 +1,341 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+"""
+Benchmarks of easyssh against local ssh servers (see server.py), written
+as json so runs of different versions can be compared.
+
+python benchmarks/run.py --output before.json
+python benchmarks/run.py --latency 0.05 --bandwidth 100 --output after.json --compare before.json
+"""
+from __future__ import print_function, division
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import paramiko
+
+from easyssh import Fleet, ProcessFleet, SSHConnection
+from server import SSHServer
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def latencies(values):
+    return {
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "max": max(values),
+    }
+
+
+def write_tree(folder, files, size, fanout=10):
+    """
+    files files of size bytes each, spread over fanout folders per level.
+    """
+    for index in range(files):
+        path = os.path.join(folder, "d%d" % (index % fanout), "d%d" % (index // fanout % fanout))
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        with open(os.path.join(path, "f%d" % index), "wb") as f:
+            f.write(os.urandom(size))
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.scale = 0.1 if args.quick else 1
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.server = self.start_server()
+        self.temp = tempfile.mkdtemp(prefix="easyssh-bench-")
+
+    def start_server(self):
+        return SSHServer(self.args.latency, self.bandwidth, self.host_key)
+
+    @property
+    def bandwidth(self):
+        # --bandwidth is in Mbit/s, the proxy paces bytes per second
+        return self.args.bandwidth * 1000 * 1000 / 8 if self.args.bandwidth else None
+
+    def count(self, number):
+        return max(1, int(number * self.scale))
+
+    def connect(self, server=None, **kwargs):
+        ssh = SSHConnection(
+            host="127.0.0.1",
+            port=(server or self.server).port,
+            username="bench",
+            password="bench",
+            **kwargs
+        )
+        ssh.connect()
+        return ssh
+
+    def path(self, *names):
+        return os.path.join(self.temp, *names)
+
+    def close(self):
+        self.server.close()
+        shutil.rmtree(self.temp, ignore_errors=True)
+
+
+@benchmark
+def connect(bench):
+    times = []
+    for _ in range(bench.count(20)):
+        start = time.time()
+        ssh = bench.connect()
+        times.append(time.time() - start)
+        ssh.disconnect()
+    return {"connect_seconds": latencies(times)}
+
+
+@benchmark
+def exec_command(bench):
+    ssh = bench.connect()
+    times = []
+    for _ in range(bench.count(100)):
+        start = time.time()
+        ssh.exec_command("true")
+        times.append(time.time() - start)
+
+    commands = ["echo %d" % index for index in range(bench.count(200))]
+    start = time.time()
+    for _ in ssh.exec_commands(commands, max_sessions=10):
+        pass
+    parallel = time.time() - start
+    start = time.time()
+    ssh.exec_script(commands)
+    script = time.time() - start
+
+    start = time.time()
+    ssh.exec_command_stream("head -c %d /dev/zero" % (bench.count(100) * 1024 * 1024), max_output=0).wait()
+    output = time.time() - start
+    ssh.disconnect()
+    return {
+        "exec_seconds": latencies(times),
+        "exec_commands_per_second": len(commands) / parallel,
+        "exec_script_commands_per_second": len(commands) / script,
+        "exec_output_mb_per_second": bench.count(100) / output,
+    }
+
+
+@benchmark
+def small_files(bench):
+    files, size = bench.count(500), 4096
+    source = bench.path("small", "source")
+    write_tree(source, files, size)
+    results = {}
+    ssh = bench.connect()
+    for workers in (1, 8):
+        remote = bench.path("small", "remote%d" % workers)
+        start = time.time()
+        ssh.upload_folder(source, remote, workers=workers)
+        results["upload_files_per_second_workers_%d" % workers] = files / (time.time() - start)
+        start = time.time()
+        ssh.download_folder(remote, bench.path("small", "back%d" % workers), workers=workers)
+        results["download_files_per_second_workers_%d" % workers] = files / (time.time() - start)
+    start = time.time()
+    ssh.upload_folder_tar(source, bench.path("small", "tar"))
+    results["upload_tar_files_per_second"] = files / (time.time() - start)
+    ssh.disconnect()
+    return results
+
+
+@benchmark
+def large_file(bench):
+    megabytes = bench.count(128)
+    source = bench.path("large", "source")
+    os.makedirs(os.path.dirname(source))
+    with open(source, "wb") as f:
+        for _ in range(megabytes):
+            f.write(os.urandom(1024 * 1024))
+    ssh = bench.connect()
+    results = {}
+    start = time.time()
+    ssh.upload(source, bench.path("large", "remote"))
+    results["upload_mb_per_second"] = megabytes / (time.time() - start)
+    start = time.time()
+    ssh.download(bench.path("large", "remote"), bench.path("large", "back"))
+    results["download_mb_per_second"] = megabytes / (time.time() - start)
+    start = time.time()
+    ssh.upload_large(source, bench.path("large", "parallel"), chunk_size=16 * 1024 * 1024, workers=4)
+    results["upload_large_mb_per_second"] = megabytes / (time.time() - start)
+    start = time.time()
+    ssh.download_large(bench.path("large", "parallel"), bench.path("large", "parallel_back"), chunk_size=16 * 1024 * 1024, workers=4)
+    results["download_large_mb_per_second"] = megabytes / (time.time() - start)
+    ssh.disconnect()
+    return results
+
+
+@benchmark
+def tree_listing(bench):
+    folder = bench.path("tree")
+    files = bench.count(2000)
+    write_tree(folder, files, 0, fanout=20)
+    ssh = bench.connect()
+    results = {}
+    for use_find in (False, True):
+        start = time.time()
+        found = len(ssh.get_folder_files(folder, use_find=use_find))
+        assert found == files, (found, files)
+        results["list_%s_files_per_second" % ("find" if use_find else "sftp")] = files / (time.time() - start)
+    ssh.disconnect()
+    return results
+
+
+@benchmark
+def fanout(bench):
+    servers = [bench.start_server() for _ in range(bench.args.hosts)]
+    try:
+        hosts = [
+            {"host": "127.0.0.1", "port": server.port, "username": "bench", "password": "bench"}
+            for server in servers
+        ]
+        start = time.time()
+        results = list(Fleet(hosts, workers=len(hosts)).exec_command("hostname"))
+        elapsed = time.time() - start
+        failed = [result for result in results if not result.ok]
+    finally:
+        for server in servers:
+            server.close()
+    return {
+        "fanout_hosts": len(hosts),
+        "fanout_seconds": elapsed,
+        "fanout_hosts_per_second": len(hosts) / elapsed,
+        "fanout_failed": len(failed),
+    }
+
+
+@benchmark
+def fanout_upload(bench):
+    megabytes = bench.count(32)
+    source = bench.path("fanout", "source")
+    os.makedirs(os.path.dirname(source))
+    with open(source, "wb") as f:
+        for _ in range(megabytes):
+            f.write(os.urandom(1024 * 1024))
+    servers = [bench.start_server() for _ in range(bench.args.hosts)]
+    results = {}
+    try:
+        hosts = [
+            {"host": "127.0.0.1", "port": server.port, "username": "bench", "password": "bench"}
+            for server in servers
+        ]
+
+        def upload(ssh):
+            ssh.upload(source, bench.path("fanout", "remote%d" % ssh.port))
+
+        # the servers encrypt in this process too, so processes help only on a multi-core box
+        for name, fleet in (
+            ("threads", Fleet(hosts, workers=len(hosts))),
+            ("processes", ProcessFleet(hosts, workers=max(1, len(hosts) // (os.cpu_count() or 1)))),
+        ):
+            start = time.time()
+            failed = [error for _, _, error, _ in fleet.run(upload) if error is not None]
+            results["upload_%s_mb_per_second" % name] = megabytes * len(hosts) / (time.time() - start)
+            results["upload_%s_failed" % name] = len(failed)
+    finally:
+        for server in servers:
+            server.close()
+    return results
+
+
+def environment(args):
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.STDOUT
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.time(),
+        "python": platform.python_version(),
+        "paramiko": paramiko.__version__,
+        "platform": platform.platform(),
+        "latency": args.latency,
+        "bandwidth_mbit": args.bandwidth,
+        "quick": args.quick,
+    }
+
+
+def compare(results, baseline):
+    """
+    Print every shared number with its ratio to the baseline run.
+    """
+    print("%-55s %12s %12s %8s" % ("metric", "baseline", "now", "ratio"))
+    for name in sorted(results):
+        old = baseline.get(name, {})
+        for metric, value in sorted(results[name].items()):
+            values = [(metric, value, old.get(metric))]
+            if isinstance(value, dict):
+                values = [
+                    ("%s.%s" % (metric, key), value[key], (old.get(metric) or {}).get(key))
+                    for key in sorted(value)
+                ]
+            for label, new, before in values:
+                if isinstance(before, (int, float)) and before:
+                    print("%-55s %12.4g %12.4g %8.2f" % ("%s.%s" % (name, label), before, new, new / before))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.0, help="round trip seconds added by the proxy")
+    parser.add_argument("--bandwidth", type=float, default=None, help="Mbit/s per direction")
+    parser.add_argument("--hosts", type=int, default=20, help="servers for the fan-out benchmark")
+    parser.add_argument("--only", nargs="*", help="benchmarks to run: %s" % ", ".join(b.__name__ for b in BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="a tenth of the work, for a smoke run")
+    parser.add_argument("--output", help="json file for the results, default stdout")
+    parser.add_argument("--compare", help="json file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    bench = Bench(args)
+    results = {}
+    try:
+        for func in BENCHMARKS:
+            if args.only and func.__name__ not in args.only:
+                continue
+            print("running %s" % func.__name__, file=sys.stderr)
+            start = time.time()
+            # the per file lines easyssh prints would end up in the json
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results[func.__name__] = func(bench)
+            results[func.__name__]["wall_seconds"] = time.time() - start
+    finally:
+        bench.close()
+
+    report = {"environment": environment(args), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)["results"])
+
+
+if __name__ == "__main__":
+    main()
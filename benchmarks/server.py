@@ -0,0 +1,336 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+"""
+A local stand-in for sshd: a paramiko server on 127.0.0.1 that accepts any
+user, password or key, runs exec requests with /bin/sh and serves sftp from
+the local filesystem. An optional proxy in front of it adds latency and
+limits bandwidth, so benchmarks can model a remote link.
+"""
+from __future__ import print_function, division
+import heapq
+import logging
+import os
+import socket
+import subprocess
+import threading
+import time
+
+import paramiko
+from paramiko import SFTP_OK, SFTPAttributes, SFTPHandle, SFTPServer, SFTPServerInterface
+
+logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+
+
+def _sftp_errors(func):
+    def call(*args):
+        try:
+            return func(*args)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    return call
+
+
+class LocalHandle(SFTPHandle):
+    @_sftp_errors
+    def stat(self):
+        return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    @_sftp_errors
+    def chattr(self, attr):
+        SFTPServer.set_file_attr(self.filename, attr)
+        return SFTP_OK
+
+
+class LocalSFTP(SFTPServerInterface):
+    @_sftp_errors
+    def list_folder(self, path):
+        attrs = []
+        for name in os.listdir(path):
+            attr = SFTPAttributes.from_stat(os.lstat(os.path.join(path, name)))
+            attr.filename = name
+            attrs.append(attr)
+        return attrs
+
+    @_sftp_errors
+    def stat(self, path):
+        return SFTPAttributes.from_stat(os.stat(path))
+
+    @_sftp_errors
+    def lstat(self, path):
+        return SFTPAttributes.from_stat(os.lstat(path))
+
+    @_sftp_errors
+    def open(self, path, flags, attr):
+        mode = getattr(attr, "st_mode", None)
+        fd = os.open(path, flags, mode if mode is not None else 0o666)
+        if (flags & os.O_CREAT) and attr is not None:
+            attr._flags &= ~attr.FLAG_PERMISSIONS
+            SFTPServer.set_file_attr(path, attr)
+        if flags & os.O_WRONLY:
+            fstr = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            fstr = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            fstr = "rb"
+        handle = LocalHandle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(fd, fstr)
+        return handle
+
+    @_sftp_errors
+    def remove(self, path):
+        os.remove(path)
+        return SFTP_OK
+
+    @_sftp_errors
+    def rename(self, old_path, new_path):
+        os.rename(old_path, new_path)
+        return SFTP_OK
+
+    @_sftp_errors
+    def mkdir(self, path, attr):
+        os.mkdir(path)
+        if attr is not None:
+            SFTPServer.set_file_attr(path, attr)
+        return SFTP_OK
+
+    @_sftp_errors
+    def rmdir(self, path):
+        os.rmdir(path)
+        return SFTP_OK
+
+    @_sftp_errors
+    def chattr(self, path, attr):
+        SFTPServer.set_file_attr(path, attr)
+        return SFTP_OK
+
+    @_sftp_errors
+    def symlink(self, target, path):
+        os.symlink(target, path)
+        return SFTP_OK
+
+    @_sftp_errors
+    def readlink(self, path):
+        return os.readlink(path)
+
+    def canonicalize(self, path):
+        return os.path.normpath(os.path.join(os.getcwd(), path))
+
+
+def _pump(source, send):
+    while True:
+        data = os.read(source.fileno(), 32768)
+        if not data:
+            break
+        send(data)
+
+
+def _pump_quietly(source, send):
+    # the client may close the channel before the output is all sent
+    try:
+        _pump(source, send)
+    except (OSError, IOError, EOFError):
+        pass
+
+
+class LocalServer(paramiko.ServerInterface):
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "password,publickey"
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        return self.check_channel_exec_request(channel, "/bin/sh")
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self._run, args=(channel, command), daemon=True).start()
+        return True
+
+    @staticmethod
+    def _run(channel, command):
+        process = subprocess.Popen(
+            ["/bin/sh", "-c", command],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+        def feed():
+            try:
+                for data in iter(lambda: channel.recv(32768), b""):
+                    process.stdin.write(data)
+                    process.stdin.flush()
+            except (OSError, IOError, EOFError):
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except (OSError, IOError):
+                    pass
+
+        threading.Thread(target=feed, daemon=True).start()
+        errors = threading.Thread(
+            target=_pump_quietly, args=(process.stderr, channel.sendall_stderr), daemon=True
+        )
+        errors.start()
+        try:
+            _pump(process.stdout, channel.sendall)
+            errors.join()
+            channel.send_exit_status(process.wait())
+            channel.shutdown_write()
+        except (OSError, IOError, EOFError):
+            process.kill()
+        finally:
+            try:
+                channel.close()
+            except (OSError, IOError, EOFError):
+                pass
+            process.stdout.close()
+            process.stderr.close()
+
+
+class LinkProxy:
+    """
+    Forwards tcp connections to port, delaying every chunk by half of
+    latency seconds in each direction and pacing each direction to
+    bandwidth bytes per second (None for no limit).
+    """
+
+    def __init__(self, port, latency=0.0, bandwidth=None):
+        self.target = port
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(128)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            server = socket.create_connection(("127.0.0.1", self.target))
+            for sock in (client, server):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._link(client, server)
+            self._link(server, client)
+
+    def _link(self, source, destination):
+        queue = []
+        condition = threading.Condition()
+        state = {"count": 0, "closed": False}
+
+        def receive():
+            while True:
+                try:
+                    data = source.recv(65536)
+                except OSError:
+                    data = b""
+                with condition:
+                    if not data:
+                        state["closed"] = True
+                    else:
+                        state["count"] += 1
+                        heapq.heappush(
+                            queue, (time.time() + self.latency / 2, state["count"], data)
+                        )
+                    condition.notify()
+                if not data:
+                    return
+
+        def send():
+            free_at = time.time()
+            while True:
+                with condition:
+                    while not queue and not state["closed"]:
+                        condition.wait()
+                    if not queue:
+                        break
+                    due, _, data = heapq.heappop(queue)
+                delay = max(due, free_at) - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                if self.bandwidth:
+                    free_at = max(time.time(), free_at) + len(data) / self.bandwidth
+                try:
+                    destination.sendall(data)
+                except OSError:
+                    break
+            try:
+                destination.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+        threading.Thread(target=receive, daemon=True).start()
+        threading.Thread(target=send, daemon=True).start()
+
+    def close(self):
+        self.sock.close()
+
+
+class SSHServer:
+    """
+    A local ssh/sftp server on its own port. With latency (round trip
+    seconds) or bandwidth (bytes per second per direction) clients connect
+    through a LinkProxy; port is the one to connect to either way.
+
+    For example:
+
+    server = SSHServer(latency=0.05, bandwidth=10 * 1024 * 1024)
+    ssh = SSHConnection(host="127.0.0.1", port=server.port, username="bench", password="bench")
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, host_key=None):
+        self.host_key = host_key or paramiko.RSAKey.generate(2048)
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(128)
+        self.server_port = self.sock.getsockname()[1]
+        self.transports = []
+        threading.Thread(target=self._accept, daemon=True).start()
+        self.proxy = None
+        if latency or bandwidth:
+            self.proxy = LinkProxy(self.server_port, latency, bandwidth)
+        self.port = self.proxy.port if self.proxy else self.server_port
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            # like sshd, so small packets are not held back by nagle
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, LocalSFTP)
+            try:
+                transport.start_server(server=LocalServer())
+            except (paramiko.SSHException, EOFError, OSError):
+                # port probes close without a handshake
+                continue
+            self.transports.append(transport)
+
+    def close(self):
+        if self.proxy:
+            self.proxy.close()
+        self.sock.close()
+        for transport in self.transports:
+            transport.close()
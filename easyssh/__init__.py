@@ -1,2 +1,15 @@
 from .utils import *
-from .ssh import SSHConnection
\ No newline at end of file
+from .ssh import SSHConnection, CommandResult
+from .fleet import Fleet, HostResult, RolloutReport
+from .procfleet import ProcessFleet
+from .pool import ConnectionPool, PoolExhausted, default_pool
+from .aio import AsyncSSHConnection
+from .sync import SyncReport
+from .cache import StatCache
+from .facts import Facts, FactCache
+from .telemetry import Telemetry, TerminalSink, LoggingSink, JsonSink
+from .metrics import Metrics, MetricsRecorder, PrometheusMetrics, OpenTelemetrySpans
+from .scan import scan, ScanReport, Resolver
+from .credentials import CredentialCache, KnownHosts, default_credentials
+from .steps import Step, StepEngine, StepStore
+from .remotefile import RemoteFile
@@ -0,0 +1,184 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from easyssh.ssh import SSHConnection, CommandResult, channel_finished
+from easyssh.utils import to_str
+
+# shared by every AsyncSSHConnection that is not given its own executor, so the
+# number of threads stays fixed no matter how many hosts are scheduled
+default_executor = ThreadPoolExecutor(max_workers=64)
+
+
+def _blocking(name):
+    def method(self, *args, **kwargs):
+        return self._run(getattr(self.ssh, name), *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = "Awaitable SSHConnection.%s" % name
+    return method
+
+
+class AsyncSSHConnection:
+    """
+    The SSHConnection API for asyncio programs.
+
+    For example:
+
+    ssh = AsyncSSHConnection(**server)
+    await ssh.connect()
+    pwd = await ssh.exec_command("pwd")
+    await asyncio.wait_for(ssh.upload("/tmp/a.tar", "/tmp/a.tar"), 60)
+    await ssh.disconnect()
+
+    Commands are read straight from the channel by the event loop, so a long
+    running command holds no thread. Calls that need a server reply (connect,
+    channel open, sftp requests) run in a bounded thread pool shared by all
+    connections. Every call accepts the usual asyncio cancellation and
+    asyncio.wait_for timeouts; op_timeout applies one to every call. A
+    cancelled sftp call may still finish in its worker thread, a cancelled
+    command has its channel closed. SSHConnection methods with no async
+    version here (walk_folder, exec_command_stream, ...) raise
+    AttributeError rather than block the event loop.
+    """
+
+    def __init__(self, executor=None, op_timeout=None, **kwargs):
+        self.ssh = SSHConnection(**kwargs)
+        self.executor = executor or default_executor
+        self.op_timeout = op_timeout
+
+    # SSHConnection methods that never wait on the server
+    local_methods = ("forget_stat", "progress", "invalidate_facts")
+
+    def __getattr__(self, name):
+        value = getattr(self.ssh, name)
+        # anything else would block the event loop and then fail on await
+        if callable(value) and name not in self.local_methods:
+            raise AttributeError(
+                "AsyncSSHConnection has no async %s; SSHConnection.%s blocks" % (name, name)
+            )
+        return value
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+        return await asyncio.wait_for(future, self.op_timeout)
+
+    connect = _blocking("connect")
+    disconnect = _blocking("disconnect")
+    upload = _blocking("upload")
+    upload_folder = _blocking("upload_folder")
+    download = _blocking("download")
+    download_folder = _blocking("download_folder")
+    rename = _blocking("rename")
+    chmod = _blocking("chmod")
+    mkdir = _blocking("mkdir")
+    mkdir_tree = _blocking("mkdir_tree")
+    remove = _blocking("remove")
+    rmdir = _blocking("rmdir")
+    chdir = _blocking("chdir")
+    symlink = _blocking("symlink")
+    unlink = _blocking("unlink")
+    chown = _blocking("chown")
+    listdir = _blocking("listdir")
+    listdir_attr = _blocking("listdir_attr")
+    get_folder_files = _blocking("get_folder_files")
+    get_folder_files_size = _blocking("get_folder_files_size")
+    stat = _blocking("stat")
+    lstat = _blocking("lstat")
+    exists = _blocking("exists")
+    isfile = _blocking("isfile")
+    islink = _blocking("islink")
+    isdir = _blocking("isdir")
+    ismount = _blocking("ismount")
+    open = _blocking("open")
+    exec_command_without_block = _blocking("exec_command_without_block")
+    exec_script = _blocking("exec_script")
+    map_sftp = _blocking("map_sftp")
+    upload_files = _blocking("upload_files")
+    download_files = _blocking("download_files")
+    upload_large = _blocking("upload_large")
+    download_large = _blocking("download_large")
+    upload_folder_tar = _blocking("upload_folder_tar")
+    download_folder_tar = _blocking("download_folder_tar")
+    copy_to = _blocking("copy_to")
+    sync_folder = _blocking("sync_folder")
+    facts = _blocking("facts")
+    ensure_block = _blocking("ensure_block")
+    ensure_line = _blocking("ensure_line")
+    grep = _blocking("grep")
+    contains = _blocking("contains")
+    mkdir_trees = _blocking("mkdir_trees")
+    chmod_many = _blocking("chmod_many")
+    prefetch_stat = _blocking("prefetch_stat")
+
+    def _open_exec(self, command, environment=None):
+        channel = self.ssh.transport.open_session()
+        if environment:
+            channel.update_environment(environment)
+        channel.exec_command(command)
+        return channel
+
+    async def _drain(self, channel, command):
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        fd = channel.fileno()
+        out, err = [], []
+        loop.add_reader(fd, readable.set)
+        try:
+            while True:
+                await readable.wait()
+                readable.clear()
+                while channel.recv_ready():
+                    out.append(channel.recv(32768))
+                while channel.recv_stderr_ready():
+                    err.append(channel.recv_stderr(32768))
+                if channel.eof_received or channel.closed:
+                    break
+        finally:
+            loop.remove_reader(fd)
+        while channel.recv_ready():
+            out.append(channel.recv(32768))
+        while channel.recv_stderr_ready():
+            err.append(channel.recv_stderr(32768))
+        if not channel.exit_status_ready():
+            await self._run(channel.recv_exit_status)
+        # raises when the connection closed under the command
+        channel_finished(channel, command)
+        return to_str(b"".join(out)), to_str(b"".join(err)), channel.exit_status
+
+    async def exec_command_result(self, command, timeout=3600, environment=None):
+        start = time.time()
+        channel = await self._run(self._open_exec, command, environment)
+        try:
+            res, error, exit_status = await asyncio.wait_for(
+                self._drain(channel, command), timeout
+            )
+        finally:
+            channel.close()
+        return CommandResult(command, res, error, exit_status, time.time() - start)
+
+    async def exec_command(self, command, timeout=3600, environment=None):
+        result = await self.exec_command_result(command, timeout, environment)
+        return (
+            result.stdout + result.stderr if result.stderr.strip() else result.stdout
+        )
+
+    async def exec_commands(self, commands, max_sessions=10, timeout=3600, environment=None):
+        semaphore = asyncio.Semaphore(max_sessions)
+
+        async def run(command):
+            async with semaphore:
+                return await self.exec_command_result(command, timeout, environment)
+
+        for future in asyncio.as_completed([run(command) for command in commands]):
+            yield await future
+
+    async def rm_tree(self, path):
+        await self.exec_command("rm -rf %s" % path)
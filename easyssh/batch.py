@@ -0,0 +1,110 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import re
+import time
+import uuid
+
+from easyssh.result import CommandResult
+
+# The script goes in on stdin: as one `sh -c` argument it would hit the
+# 128kb limit of a single argument after a few hundred commands. It is
+# saved to a temp file and run from there, so commands that read stdin
+# get /dev/null instead of the rest of the script.
+RUNNER = (
+    'f=$(mktemp) || exit 125; cat > "$f"; "${SHELL:-/bin/sh}" "$f" < /dev/null; '
+    's=$?; rm -f "$f"; exit $s'
+)
+
+
+def build_script(commands, token, stop_on_error=True):
+    """
+    One shell script that runs commands in order and, after each one, prints
+    "\\n<token> <index> <exit status>" on stdout and on stderr.
+    """
+    lines = []
+    for index, command in enumerate(commands):
+        lines.append(command.rstrip("\n"))
+        lines.append("__easyssh_status=$?")
+        lines.append(
+            "printf '\\n%s %d %d\\n' {token} {index} $__easyssh_status; "
+            "printf '\\n%s %d %d\\n' {token} {index} $__easyssh_status >&2".format(
+                token=token, index=index
+            )
+        )
+        if stop_on_error:
+            lines.append(
+                '[ "$__easyssh_status" -eq 0 ] || exit "$__easyssh_status"'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def split_output(text, token):
+    """
+    {index: (output, exit status)} from the output of a build_script script.
+    """
+    pattern = re.compile(r"\n%s (\d+) (\d+)\n" % token)
+    parts = {}
+    position = 0
+    for match in pattern.finditer(text):
+        parts[int(match.group(1))] = (text[position : match.start()], int(match.group(2)))
+        position = match.end()
+    return parts
+
+
+def exec_script(ssh, commands, stop_on_error=True, timeout=3600, environment=None):
+    """
+    Run commands in order in one remote shell and return a CommandResult
+    for each command that ran.
+
+    The commands share the shell, so cd, variables and functions carry over
+    from one command to the next. A sentinel line after every command splits
+    the output and records its exit status. With stop_on_error the script
+    stops at the first command that exits non zero. IOError is raised when
+    the shell ends before the first command finished.
+    """
+    commands = list(commands)
+    token = "EASYSSH_%s" % uuid.uuid4().hex
+    stream = ssh.exec_command_stream(
+        RUNNER,
+        timeout=timeout,
+        environment=environment,
+        input=build_script(commands, token, stop_on_error).encode("utf-8"),
+        max_output=None,
+        lines=False,
+    )
+    # record when each sentinel shows up on stdout to time the commands
+    marker = "\n%s " % token
+    finished = []
+    buffer = ""
+    for name, text in stream:
+        if name != "stdout":
+            continue
+        buffer += text
+        index = buffer.find(marker)
+        while index >= 0:
+            finished.append(time.time())
+            buffer = buffer[index + len(marker) :]
+            index = buffer.find(marker)
+        # keep only the tail that may hold the start of a sentinel
+        buffer = buffer[-len(marker) :]
+
+    stdout = split_output(stream.stdout, token)
+    stderr = split_output(stream.stderr, token)
+    if commands and not stdout:
+        raise IOError(
+            "the remote shell exited with %s before %r finished: %s"
+            % (stream.exit_status, commands[0], stream.stderr.strip())
+        )
+    results = []
+    started = stream.start
+    for index, command in enumerate(commands):
+        if index not in stdout:
+            break
+        out, exit_status = stdout[index]
+        err = stderr.get(index, ("", exit_status))[0]
+        ended = finished[index] if index < len(finished) else time.time()
+        results.append(CommandResult(command, out, err, exit_status, ended - started))
+        started = ended
+    return results
@@ -0,0 +1,188 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import json
+import os
+import posixpath
+import stat
+import threading
+import time
+from collections import OrderedDict
+
+from easyssh.utils import standardize_path
+
+# cached answer for a path that does not exist
+MISSING = object()
+
+
+class HostStore:
+    """
+    One json value per host, in memory and, with path, as one json file per
+    host in that folder, written atomically so other processes and later runs
+    read it whole. Subclasses turn values into json with dump and back with
+    load; a file that can not be read or loaded counts as missing.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._values = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(ssh):
+        return "%s_%s_%s" % (ssh.host, ssh.port, ssh.username)
+
+    def _file(self, key):
+        return os.path.join(self.path, "%s.json" % key.replace("/", "_").replace(":", "_"))
+
+    def load(self, data):
+        return data
+
+    def dump(self, value):
+        return value
+
+    def get(self, ssh):
+        key = self.key(ssh)
+        with self._lock:
+            value = self._values.get(key)
+        if value is None and self.path and os.path.exists(self._file(key)):
+            try:
+                with open(self._file(key)) as f:
+                    value = self.load(json.load(f))
+            except (IOError, OSError, ValueError, TypeError):
+                return None
+            with self._lock:
+                self._values[key] = value
+        return value
+
+    def put(self, ssh, value):
+        key = self.key(ssh)
+        with self._lock:
+            self._values[key] = value
+        if self.path:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+            temp_file = self._file(key) + ".tmp"
+            with open(temp_file, "w") as f:
+                json.dump(self.dump(value), f)
+            os.replace(temp_file, self._file(key))
+
+    def invalidate(self, ssh):
+        key = self.key(ssh)
+        with self._lock:
+            self._values.pop(key, None)
+        if self.path and os.path.exists(self._file(key)):
+            os.remove(self._file(key))
+
+
+def normalize(path):
+    path = standardize_path(path)
+    return path.rstrip("/") or "/"
+
+
+class StatCache:
+    """
+    Remembers stat/lstat answers of one connection for ttl seconds.
+
+    At most max_size entries are kept, the least recently used go first.
+    A directory listing can be stored with put_listing, after which both
+    its entries and the absence of any other name in it are answered from
+    memory. hits and misses count lookups.
+
+    For example:
+
+    ssh = SSHConnection(stat_cache=StatCache(ttl=60), **server)
+    ssh.connect()
+    ssh.prefetch_stat("/etc")
+    ssh.exists("/etc/hosts"), ssh.isfile("/etc/nope")   # no round trip
+    print(ssh.stat_cache.hits, ssh.stat_cache.misses)
+    """
+
+    def __init__(self, ttl=30, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _fresh(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if now - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value, now):
+        self._entries[key] = (value, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, kind, path):
+        """
+        The cached attributes for ("stat" | "lstat", path), MISSING when the
+        path is known not to exist, or None when nothing is cached.
+        """
+        path = normalize(path)
+        now = time.time()
+        with self._lock:
+            value = self._fresh((kind, path), now)
+            if value is None:
+                names = self._fresh(("listing", posixpath.dirname(path)), now)
+                if names is not None and posixpath.basename(path) not in names:
+                    value = MISSING
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, kind, path, attr):
+        with self._lock:
+            self._store((kind, normalize(path)), attr, time.time())
+
+    def put_listing(self, folder, attrs):
+        """
+        Store the SFTPAttributes of a listdir_attr(folder) answer.
+        """
+        folder = normalize(folder)
+        now = time.time()
+        with self._lock:
+            for attr in attrs:
+                path = posixpath.join(folder, attr.filename)
+                self._store(("lstat", path), attr, now)
+                if not stat.S_ISLNK(attr.st_mode):
+                    self._store(("stat", path), attr, now)
+            self._store(("listing", folder), set(attr.filename for attr in attrs), now)
+
+    def invalidate(self, path, tree=False, parents=False):
+        """
+        Forget path and its parent listing; with tree also everything below
+        path, with parents also every folder above it.
+        """
+        path = normalize(path)
+        folders = [path]
+        while parents and posixpath.dirname(folders[-1]) not in (folders[-1], ""):
+            folders.append(posixpath.dirname(folders[-1]))
+        with self._lock:
+            for folder in folders:
+                for key in (("stat", folder), ("lstat", folder), ("listing", folder)):
+                    self._entries.pop(key, None)
+            self._entries.pop(("listing", posixpath.dirname(folders[-1])), None)
+            if tree:
+                prefix = path.rstrip("/") + "/"
+                for key in [key for key in self._entries if key[1].startswith(prefix)]:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
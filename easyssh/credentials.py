@@ -0,0 +1,213 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+import threading
+import time
+
+import paramiko
+
+# tried in order when paramiko has no PKey.from_path
+KEY_CLASSES = [
+    getattr(paramiko, name)
+    for name in ("Ed25519Key", "ECDSAKey", "RSAKey", "DSSKey")
+    if hasattr(paramiko, name)
+]
+
+
+def load_private_key(path, passphrase=None):
+    """
+    Parse an RSA, ECDSA or Ed25519 private key file, decrypting it with passphrase.
+    """
+    if hasattr(paramiko.PKey, "from_path"):
+        if isinstance(passphrase, str):
+            passphrase = passphrase.encode("utf-8")
+        return paramiko.PKey.from_path(path, passphrase)
+    error = None
+    for key_class in KEY_CLASSES:
+        try:
+            return key_class.from_private_key_file(path, passphrase)
+        except paramiko.PasswordRequiredException:
+            raise
+        except paramiko.SSHException as e:
+            error = e
+    raise error
+
+
+class CredentialCache:
+    """
+    Private keys parsed (and decrypted) once and shared by every
+    connection, safe to use from many threads: when 800 connections start
+    with the same key file, one thread reads it and the rest wait for it.
+    A key file that changed on disk is read again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loading = {}
+        # path -> ((mtime, size), key)
+        self._keys = {}
+
+    def load_key(self, path, passphrase=None):
+        path = os.path.abspath(os.path.expanduser(path))
+        st = os.stat(path)
+        version = (st.st_mtime, st.st_size)
+        entry = self._keys.get(path)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._lock:
+            lock = self._loading.setdefault(path, threading.Lock())
+        with lock:
+            entry = self._keys.get(path)
+            if entry is None or entry[0] != version:
+                entry = self._keys[path] = (version, load_private_key(path, passphrase))
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+default_credentials = CredentialCache()
+
+
+def agent_auth(transport, username):
+    """
+    Authenticate with the keys of the running ssh-agent ($SSH_AUTH_SOCK),
+    trying each in turn. The agent signs, no key is read here.
+    """
+    agent = paramiko.Agent()
+    try:
+        keys = agent.get_keys()
+        if not keys:
+            raise paramiko.AuthenticationException("ssh-agent has no keys")
+        for key in keys:
+            try:
+                transport.auth_publickey(username, key)
+                return
+            except paramiko.AuthenticationException:
+                if key is keys[-1]:
+                    raise
+    finally:
+        agent.close()
+
+
+class KnownHosts:
+    """
+    A known_hosts file loaded once and indexed by host name, so checking a
+    host key is a dict lookup instead of a scan of the file. Hashed entries
+    are matched once per host name and the answer is remembered. The file
+    is read again when it changed, checked at most every refresh seconds.
+
+    With accept_new an unknown host's key is added (and appended to the
+    file); a key that differs from the recorded one is always rejected.
+    """
+
+    def __init__(self, path="~/.ssh/known_hosts", accept_new=False, refresh=30):
+        self.path = os.path.expanduser(path)
+        self.accept_new = accept_new
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked = 0
+        self._load()
+
+    def _load(self):
+        host_keys = paramiko.HostKeys()
+        version = None
+        if os.path.exists(self.path):
+            st = os.stat(self.path)
+            version = (st.st_mtime, st.st_size)
+            host_keys.load(self.path)
+        # plain host name -> {key type: key}
+        index = {}
+        hashed = []
+        for entry in host_keys._entries:
+            for name in entry.hostnames:
+                if name.startswith("|1|"):
+                    hashed.append((name, entry.key))
+                else:
+                    index.setdefault(name, {})[entry.key.get_name()] = entry.key
+        self._index, self._hashed, self._version = index, hashed, version
+        self._checked = time.time()
+
+    def _maybe_reload(self):
+        if time.time() - self._checked < self.refresh:
+            return
+        self._checked = time.time()
+        version = None
+        if os.path.exists(self.path):
+            st = os.stat(self.path)
+            version = (st.st_mtime, st.st_size)
+        if version != self._version:
+            self._load()
+
+    @staticmethod
+    def name(host, port=22):
+        return host if int(port) == 22 else "[%s]:%s" % (host, port)
+
+    def lookup(self, host, port=22):
+        """
+        {key type: key} recorded for host, empty when unknown.
+        """
+        name = self.name(host, port)
+        with self._lock:
+            self._maybe_reload()
+            keys = self._index.get(name)
+            if keys is None:
+                keys = {}
+                for hashed_name, key in self._hashed:
+                    if paramiko.HostKeys.hash_host(name, hashed_name) == hashed_name:
+                        keys[key.get_name()] = key
+                self._index[name] = keys
+            return keys
+
+    def restrict(self, transport, host, port=22):
+        """
+        Make transport ask only for the host key types recorded for host,
+        as OpenSSH does, so a server with several keys offers the one that
+        can be checked. Hosts with no record are left alone.
+        """
+        known = self.lookup(host, port)
+        if not known:
+            return
+        options = transport.get_security_options()
+        # rsa-sha2-* signatures are made with the ssh-rsa key
+        preferred = [
+            algorithm
+            for algorithm in options.key_types
+            if ("ssh-rsa" if algorithm.startswith("rsa-sha2-") else algorithm) in known
+        ]
+        if preferred:
+            options.key_types = preferred
+
+    def verify(self, host, port, key):
+        """
+        Raise paramiko.BadHostKeyException when key differs from the
+        recorded one, paramiko.SSHException when the host is unknown (unless
+        accept_new, which records it).
+        """
+        keys = self.lookup(host, port)
+        known = keys.get(key.get_name())
+        if known is not None:
+            if known != key:
+                raise paramiko.BadHostKeyException(host, key, known)
+            return
+        if keys or not self.accept_new:
+            raise paramiko.SSHException(
+                "%s has no %s key in %s" % (self.name(host, port), key.get_name(), self.path)
+            )
+        self.add(host, port, key)
+
+    def add(self, host, port, key):
+        name = self.name(host, port)
+        with self._lock:
+            self._index.setdefault(name, {})[key.get_name()] = key
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            with open(self.path, "a") as f:
+                f.write("%s %s %s\n" % (name, key.get_name(), key.get_base64()))
+            st = os.stat(self.path)
+            self._version = (st.st_mtime, st.st_size)
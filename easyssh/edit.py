@@ -0,0 +1,146 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import uuid
+
+from easyssh.utils import *
+
+# prints every line of the file with the marked block replaced by the lines of
+# the file $new, or with them appended when the file has no block yet; exits 3
+# when a marker line has no closing one, rather than dropping the rest
+ENSURE_BLOCK_AWK = r"""
+function block(  line) { while ((getline line < new) > 0) print line; close(new) }
+state == 0 && $0 == ENVIRON["MARKER"] { state = 1; block(); next }
+state == 1 { if ($0 == ENVIRON["MARKER"]) state = 2; next }
+{ print }
+END { if (state == 1) exit 3; if (state == 0) block() }
+"""
+
+# prints the file with lines matching $MATCH replaced by $LINE, appending
+# $LINE when nothing matched and it is not already present
+ENSURE_LINE_AWK = r"""
+ENVIRON["MATCH"] != "" && $0 ~ ENVIRON["MATCH"] { if (!done) print ENVIRON["LINE"]; done = 1; next }
+$0 == ENVIRON["LINE"] { if (!done) print; done = 1; next }
+{ print }
+END { if (!done) print ENVIRON["LINE"] }
+"""
+
+# writes $out over $f only when it differs, keeping the inode and mode
+REPLACE_IF_CHANGED = """
+if cmp -s "$out" "$f"; then echo unchanged; else cat "$out" > "$f" && echo changed; fi
+rm -f "$out" "$new"
+"""
+
+
+def _run(ssh, script):
+    result = ssh.exec_command_result(script)
+    if not result.ok:
+        raise IOError(result.stderr.strip() or "exit status %s" % result.exit_status)
+    return result.stdout
+
+
+def _heredoc(content):
+    delimiter = "EASYSSH_%s" % uuid.uuid4().hex
+    if not content.endswith("\n"):
+        content += "\n"
+    return "<<'%s'\n%s%s\n" % (delimiter, content, delimiter)
+
+
+def ensure_block(ssh, path, marker, content):
+    """
+    Make path contain content between two marker lines, with one remote command.
+
+    An existing marked block is replaced when its content differs, otherwise
+    the block is appended (creating the file if needed). Returns True when
+    the file was changed. A marker line without a closing one raises IOError
+    and leaves the file as it is.
+    """
+    block = "%s\n%s%s\n" % (
+        marker,
+        content if content.endswith("\n") or not content else content + "\n",
+        marker,
+    )
+    script = (
+        "set -e\n"
+        "f=%s\n"
+        "[ -e \"$f\" ] || : > \"$f\"\n"
+        "new=$(mktemp) out=$(mktemp)\n"
+        "cat > \"$new\" %s"
+        "MARKER=%s awk -v new=\"$new\" %s \"$f\" > \"$out\" || {\n"
+        "  rm -f \"$out\" \"$new\"\n"
+        "  echo %s >&2\n"
+        "  exit 1\n"
+        "}\n"
+        "%s"
+        % (
+            shell_quote(path),
+            _heredoc(block),
+            shell_quote(marker),
+            shell_quote(ENSURE_BLOCK_AWK),
+            shell_quote("%s: %s has no closing marker line, not changed" % (path, marker)),
+            REPLACE_IF_CHANGED,
+        )
+    )
+    changed = _run(ssh, script).strip() == "changed"
+    if changed:
+        ssh.forget_stat(path)
+    return changed
+
+
+def ensure_line(ssh, path, line, match=None):
+    """
+    Make path contain line, with one remote command.
+
+    With match (an awk regular expression) the first matching line is
+    replaced by line and later matches are dropped; otherwise line is
+    appended when it is not present. Returns True when the file was changed.
+    """
+    script = (
+        "set -e\n"
+        "f=%s\n"
+        "[ -e \"$f\" ] || : > \"$f\"\n"
+        "new= out=$(mktemp)\n"
+        "LINE=%s MATCH=%s awk %s \"$f\" > \"$out\"\n"
+        "%s"
+        % (
+            shell_quote(path),
+            shell_quote(line),
+            shell_quote(match or ""),
+            shell_quote(ENSURE_LINE_AWK),
+            REPLACE_IF_CHANGED,
+        )
+    )
+    changed = _run(ssh, script).strip() == "changed"
+    if changed:
+        ssh.forget_stat(path)
+    return changed
+
+
+def grep(ssh, path, pattern, fixed=False, max_count=None):
+    """
+    Lines of the remote file matching pattern (an extended regular
+    expression, or a plain string with fixed), found on the server.
+    """
+    options = "-F" if fixed else "-E"
+    if max_count:
+        options += " -m %d" % max_count
+    result = ssh.exec_command_result(
+        "grep %s -e %s -- %s" % (options, shell_quote(pattern), shell_quote(path))
+    )
+    if result.exit_status not in (0, 1):
+        raise IOError(result.stderr.strip())
+    return result.stdout.splitlines()
+
+
+def contains(ssh, path, pattern, fixed=True):
+    """
+    Whether the remote file has a line containing pattern, without reading it over the wire.
+    """
+    result = ssh.exec_command_result(
+        "grep -q %s -e %s -- %s"
+        % ("-F" if fixed else "-E", shell_quote(pattern), shell_quote(path))
+    )
+    if result.exit_status not in (0, 1):
+        raise IOError(result.stderr.strip())
+    return result.exit_status == 0
@@ -0,0 +1,154 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import time
+
+from easyssh.cache import HostStore
+
+# every fact comes from one script run through SSHConnection.exec_script
+GATHER_COMMANDS = [
+    "hostname",
+    "cat /etc/os-release 2>/dev/null",
+    "uname -r",
+    "cat /proc/self/limits 2>/dev/null",
+    "if command -v rpm >/dev/null 2>&1; then rpm -qa --qf '%{NAME}\\n'; "
+    "elif command -v dpkg-query >/dev/null 2>&1; then dpkg-query -W -f='${Package}\\n'; fi",
+    "pip3 list --format=freeze 2>/dev/null",
+]
+
+
+def parse_os_release(text):
+    release = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition("=")
+        if sep and key.strip() and not key.startswith("#"):
+            release[key.strip()] = value.strip().strip("\"'")
+    return release
+
+
+def parse_limits(text):
+    """
+    {"max open files": ("1024", "4096"), ...} (soft, hard) from /proc/self/limits.
+    """
+    limits = {}
+    for line in text.splitlines()[1:]:
+        name, values = line[:26].strip(), line[26:].split()
+        if name and len(values) >= 2:
+            limits[name.lower()] = (values[0], values[1])
+    return limits
+
+
+class Facts:
+    """
+    What is installed and running on one host, parsed into sets and dicts so
+    membership checks are O(1):
+
+    hostname, kernel, os_release (dict), limits ({name: (soft, hard)}),
+    packages (set of system package names), pip_packages ({lowercase name: version}).
+    """
+
+    def __init__(
+        self,
+        hostname="",
+        kernel="",
+        os_release=None,
+        limits=None,
+        packages=None,
+        pip_packages=None,
+        gathered_at=None,
+    ):
+        self.hostname = hostname
+        self.kernel = kernel
+        self.os_release = os_release or {}
+        self.limits = limits or {}
+        self.packages = set(packages or ())
+        self.pip_packages = dict(pip_packages or {})
+        self.gathered_at = gathered_at or time.time()
+
+    @classmethod
+    def gather(cls, ssh):
+        results = ssh.exec_script(GATHER_COMMANDS, stop_on_error=False)
+        outputs = [result.stdout for result in results]
+        outputs += [""] * (len(GATHER_COMMANDS) - len(outputs))
+        hostname, os_release, kernel, limits, packages, pip_packages = outputs
+        pips = {}
+        for line in pip_packages.splitlines():
+            name, _, version = line.partition("==")
+            if name:
+                pips[name.strip().lower()] = version.strip()
+        return cls(
+            hostname=hostname.strip(),
+            kernel=kernel.strip(),
+            os_release=parse_os_release(os_release),
+            limits=parse_limits(limits),
+            packages=set(line.strip() for line in packages.splitlines() if line.strip()),
+            pip_packages=pips,
+        )
+
+    @property
+    def os_name(self):
+        return self.os_release.get("ID", "")
+
+    @property
+    def os_version(self):
+        return self.os_release.get("VERSION_ID", "")
+
+    def has_package(self, name):
+        return name in self.packages
+
+    def has_pip_package(self, name):
+        return name.lower() in self.pip_packages
+
+    def to_dict(self):
+        return {
+            "hostname": self.hostname,
+            "kernel": self.kernel,
+            "os_release": self.os_release,
+            "limits": self.limits,
+            "packages": sorted(self.packages),
+            "pip_packages": self.pip_packages,
+            "gathered_at": self.gathered_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data["limits"] = dict((k, tuple(v)) for k, v in data.get("limits", {}).items())
+        return cls(**data)
+
+    def __repr__(self):
+        return "<Facts %s %s %s kernel=%s packages=%d pip_packages=%d>" % (
+            self.hostname,
+            self.os_name,
+            self.os_version,
+            self.kernel,
+            len(self.packages),
+            len(self.pip_packages),
+        )
+
+
+class FactCache(HostStore):
+    """
+    Facts per host for ttl seconds, in memory and, with path, as one json
+    file per host in that folder so other processes and later runs reuse them.
+    """
+
+    def __init__(self, ttl=600, path=None):
+        HostStore.__init__(self, path)
+        self.ttl = ttl
+
+    def load(self, data):
+        return Facts.from_dict(data)
+
+    def dump(self, facts):
+        return facts.to_dict()
+
+    def get(self, ssh):
+        facts = HostStore.get(self, ssh)
+        if facts is None or time.time() - facts.gathered_at > self.ttl:
+            return None
+        return facts
+
+
+default_fact_cache = FactCache()
@@ -0,0 +1,366 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import math
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from easyssh.scan import scan, target
+from easyssh.ssh import SSHConnection
+
+# the deadline of the host a worker thread is on, set by Fleet.call
+_current = threading.local()
+
+
+class HostResult:
+    """
+    Everything one host produced for a Fleet run.
+
+    results holds one CommandResult per command that was started, error holds
+    the exception that stopped the host (connect failure, timeout, ...) if any.
+    value is what func returned when the host ran a function instead.
+    """
+
+    def __init__(self, host, results=None, error=None, elapsed=0.0, value=None):
+        self.host = host
+        self.results = results or []
+        self.error = error
+        self.elapsed = elapsed
+        self.value = value
+
+    @property
+    def stdout(self):
+        return "".join(result.stdout for result in self.results)
+
+    @property
+    def stderr(self):
+        return "".join(result.stderr for result in self.results)
+
+    @property
+    def exit_status(self):
+        if self.error is not None or not self.results:
+            return None
+        return self.results[-1].exit_status
+
+    @property
+    def ok(self):
+        return self.exit_status == 0
+
+    def __repr__(self):
+        return "<HostResult %s exit_status=%s error=%r elapsed=%.3fs>" % (
+            self.host,
+            self.exit_status,
+            self.error,
+            self.elapsed,
+        )
+
+
+def count_of(size, total, minimum=1):
+    """
+    Hosts meant by size: a number, or a percentage of total such as "25%"
+    (rounded up to at least minimum). Sizes below minimum raise ValueError.
+    """
+    if isinstance(size, str) and size.endswith("%"):
+        percent = float(size[:-1])
+        if percent < 0 or (minimum and percent == 0):
+            raise ValueError("size must be above 0%%, not %r" % size)
+        return max(minimum, int(math.ceil(total * percent / 100)))
+    if int(size) < minimum:
+        raise ValueError("size must be at least %d, not %r" % (minimum, size))
+    return int(size)
+
+
+class StageReport:
+    """
+    One stage of a rollout: its hosts' HostResults, which of them failed and
+    how long the stage took.
+    """
+
+    def __init__(self, name, hosts):
+        self.name = name
+        self.hosts = hosts
+        self.results = []
+        self.elapsed = 0.0
+
+    @property
+    def failed(self):
+        # func rollouts have no command results, only errors
+        return [
+            result
+            for result in self.results
+            if result.error is not None or (result.results and not result.ok)
+        ]
+
+    def __repr__(self):
+        return "<StageReport %s hosts=%d failed=%d elapsed=%.3fs>" % (
+            self.name,
+            len(self.hosts),
+            len(self.failed),
+            self.elapsed,
+        )
+
+
+class RolloutReport:
+    """
+    What Fleet.rollout did: the stages that ran, whether and why it stopped
+    early and the hosts it never touched.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.stopped = False
+        self.reason = None
+        self.skipped = []
+        self.elapsed = 0.0
+
+    @property
+    def results(self):
+        return [result for stage in self.stages for result in stage.results]
+
+    @property
+    def failed(self):
+        return [result for stage in self.stages for result in stage.failed]
+
+    @property
+    def ok(self):
+        return not self.stopped and not self.failed
+
+    def __str__(self):
+        lines = [
+            "%-10s %5d hosts %4d failed %8.2fs"
+            % (stage.name, len(stage.hosts), len(stage.failed), stage.elapsed)
+            for stage in self.stages
+        ]
+        if self.stopped:
+            lines.append("stopped: %s, %d hosts skipped" % (self.reason, len(self.skipped)))
+        lines.append(
+            "%d hosts, %d failed in %.2fs" % (len(self.results), len(self.failed), self.elapsed)
+        )
+        return "\n".join(lines)
+
+
+class Fleet:
+    """
+    Run commands on many servers concurrently.
+
+    For example:
+
+    servers = [{"host": "ip1", "port": 22, "username": "root", "password": "123456"},
+               {"host": "ip2", "port": 22, "username": "root", "password": "123456"}]
+    fleet = Fleet(servers, workers=50, timeout=600)
+    for result in fleet.exec_command(["yum -y install gcc", "gcc --version"]):
+        print(result.host, result.exit_status, result.stdout)
+
+    Results are yielded as each host finishes. A host stops at the first
+    command that exits non zero unless stop_on_error is False. Pass a
+    ConnectionPool as pool to keep the connections open between runs.
+    fleet.preflight() first drops hosts that do not answer, in seconds.
+    """
+
+    def __init__(self, servers, workers=32, max_in_flight=None, timeout=None, pool=None):
+        self.servers = list(servers)
+        self.workers = workers
+        # hosts submitted to the pool but not yet collected
+        self.max_in_flight = max_in_flight or workers * 2
+        # seconds allowed per host for connect plus all of its commands
+        self.timeout = timeout
+        self.pool = pool
+
+    def preflight(self, **kwargs):
+        """
+        Scan every server at once (keyword arguments go to easyssh.scan.scan),
+        drop the unreachable ones from this fleet and return the ScanReport.
+        """
+        report = scan(self.servers, **kwargs)
+        alive = report.alive()
+        self.servers = [server for server in self.servers if target(server) in alive]
+        return report
+
+    def stages(self, canary=1, batch_size="25%"):
+        """
+        [(name, servers)] of a rollout: a canary stage of canary hosts, then
+        batches of batch_size hosts. Sizes are numbers or percentages of the
+        fleet; a list of batch sizes grows the batches, its last size repeats.
+        """
+        total = len(self.servers)
+        sizes = batch_size if isinstance(batch_size, (list, tuple)) else [batch_size]
+        stages = []
+        index = 0
+        if canary:
+            index = min(total, count_of(canary, total))
+            stages.append(("canary", self.servers[:index]))
+        batch = 0
+        while index < total:
+            size = count_of(sizes[min(batch, len(sizes) - 1)], total)
+            batch += 1
+            stages.append(("batch %d" % batch, self.servers[index : index + size]))
+            index += size
+        return stages
+
+    def rollout(
+        self,
+        commands=None,
+        func=None,
+        canary=1,
+        batch_size="25%",
+        concurrency=None,
+        max_failures=0,
+        pause=0,
+        environment=None,
+        stop_on_error=True,
+        on_stage=None,
+    ):
+        """
+        Roll commands (or func(ssh)) across the fleet in stages and return a
+        RolloutReport.
+
+        The canary stage runs first and any failure there stops the rollout.
+        Then the batches run one after another, up to concurrency hosts
+        (default workers) at once within a batch. When more than max_failures
+        hosts (a number or a percentage of the fleet) have failed by the end
+        of a batch the rollout stops and the remaining hosts are skipped.
+        pause seconds are waited between stages, on_stage(StageReport) is
+        called after each one.
+
+        For example:
+
+        report = fleet.rollout("sysctl -p", canary=2, batch_size=["10%", "50%"], max_failures="5%")
+        print(report)
+        """
+        if (commands is None) == (func is None):
+            raise ValueError("give either commands or func")
+        start = time.time()
+        report = RolloutReport()
+        if not self.servers:
+            # nothing to roll out to, e.g. preflight dropped every host
+            return report
+        limit = count_of(max_failures, len(self.servers), minimum=0)
+        failures = 0
+        for name, servers in self.stages(canary, batch_size):
+            if report.stopped:
+                report.skipped.extend(servers)
+                continue
+            if report.stages and pause:
+                time.sleep(pause)
+            stage = StageReport(name, servers)
+            stage_start = time.time()
+            fleet = self.subset(servers, max(1, min(concurrency or self.workers, len(servers))))
+            if func is None:
+                stage.results.extend(fleet.exec_command(commands, environment, stop_on_error))
+            else:
+                for server, value, error, elapsed in fleet.run(func):
+                    stage.results.append(
+                        HostResult(server.get("host"), error=error, elapsed=elapsed, value=value)
+                    )
+            stage.elapsed = time.time() - stage_start
+            report.stages.append(stage)
+            failures += len(stage.failed)
+            if name == "canary" and stage.failed:
+                report.stopped, report.reason = True, "canary failed"
+            elif failures > limit:
+                report.stopped = True
+                report.reason = "%d failures, more than the %d allowed" % (failures, limit)
+            if on_stage is not None:
+                on_stage(stage)
+        report.elapsed = time.time() - start
+        return report
+
+    def subset(self, servers, workers):
+        """
+        A fleet like this one for some of its servers, used by rollout stages.
+        """
+        return Fleet(servers, workers=workers, timeout=self.timeout, pool=self.pool)
+
+    def connection(self, server, deadline=None):
+        conf = dict(server)
+        if deadline is not None and not conf.get("timeout"):
+            conf["timeout"] = max(deadline - time.time(), 0.001)
+        if self.pool is not None:
+            return self.pool.acquire(**conf)
+        ssh = SSHConnection(**conf)
+        ssh.connect()
+        return ssh
+
+    def close_connection(self, ssh, error=None):
+        if self.pool is None:
+            ssh.disconnect()
+        elif error is None:
+            self.pool.release(ssh)
+        else:
+            self.pool.discard(ssh)
+
+    def call(self, server, func):
+        """
+        Connect to server, call func(ssh) and return (server, value, error, elapsed).
+        The host's timeout starts before connecting, connect gets what is left.
+        """
+        start = time.time()
+        _current.deadline = start + self.timeout if self.timeout else None
+        try:
+            ssh = self.connection(server, _current.deadline)
+        except Exception as e:
+            return server, None, e, time.time() - start
+        try:
+            value = func(ssh)
+        except Exception as e:
+            self.close_connection(ssh, e)
+            return server, None, e, time.time() - start
+        self.close_connection(ssh)
+        return server, value, None, time.time() - start
+
+    def run(self, func):
+        """
+        Call func(ssh) for every server, yield (server, value, error, elapsed) as they finish.
+        """
+        pending = set()
+        servers = iter(self.servers)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                for server in servers:
+                    pending.add(executor.submit(self.call, server, func))
+                    if len(pending) >= self.max_in_flight:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def exec_command(self, commands, environment=None, stop_on_error=True):
+        if isinstance(commands, str):
+            commands = [commands]
+
+        def execute(ssh):
+            # the same deadline the connect counted against
+            deadline = _current.deadline
+            results = []
+            try:
+                for command in commands:
+                    timeout, max_time = 3600, None
+                    if deadline is not None:
+                        timeout = max_time = deadline - time.time()
+                        if timeout <= 0:
+                            raise socket.timeout("timed out after %ss" % self.timeout)
+                    # max_time holds the host to its deadline even while output flows
+                    result = ssh.exec_command_result(
+                        command, timeout=timeout, environment=environment, max_time=max_time
+                    )
+                    results.append(result)
+                    if stop_on_error and not result.ok:
+                        break
+            except Exception as e:
+                # the channel may be left half read, do not reuse the connection
+                e.results = results
+                raise
+            return results
+
+        for server, results, error, elapsed in self.run(execute):
+            if error is not None:
+                results = getattr(error, "results", None)
+            yield HostResult(server.get("host"), results, error, elapsed)
+
+    def exec_command_all(self, commands, environment=None, stop_on_error=True):
+        return list(self.exec_command(commands, environment, stop_on_error))
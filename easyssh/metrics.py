@@ -0,0 +1,160 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import threading
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+
+class Metrics:
+    """
+    Hooks an SSHConnection built with metrics=... calls on its hot paths.
+    Subclasses override what they need; without metrics nothing is
+    measured at all.
+
+    phase(name, start, end, **labels) is called once per timed phase with
+    time.time() values:
+        connect.tcp_probe, connect.tcp_connect, connect.kex, connect.auth,
+        connect.sftp_init, exec.channel_open, exec.first_byte, exec.exit,
+        sftp.stat, sftp.lstat, sftp.upload, sftp.download
+    increment(name, value, **labels) counts:
+        round_trips, exec.bytes_received, exec.bytes_sent,
+        sftp.bytes_sent, sftp.bytes_received
+    round_trips counts the request/reply waits of exec channel opens (two
+    each) and stats; transfers pipeline their sftp requests, so they add
+    bytes and time but no round trips.
+    Every call has a host label, exec.* calls also carry exit_status.
+    """
+
+    def phase(self, name, start, end, **labels):
+        self.observe(name, end - start, **labels)
+
+    def observe(self, name, seconds, **labels):
+        pass
+
+    def increment(self, name, value=1, **labels):
+        pass
+
+
+class MetricsRecorder(Metrics):
+    """
+    Keeps counters and timing summaries in memory, keyed by name and host.
+
+    For example:
+
+    metrics = MetricsRecorder()
+    ssh = SSHConnection(metrics=metrics, **server)
+    ssh.connect()
+    ssh.exec_command("uptime")
+    for name, timing in sorted(metrics.timings.items()):
+        print(name, timing)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (name, host) -> value
+        self.counters = {}
+        # (name, host) -> {"count", "total", "min", "max"}
+        self.timings = {}
+
+    def observe(self, name, seconds, **labels):
+        key = (name, labels.get("host"))
+        with self._lock:
+            timing = self.timings.get(key)
+            if timing is None:
+                self.timings[key] = {"count": 1, "total": seconds, "min": seconds, "max": seconds}
+            else:
+                timing["count"] += 1
+                timing["total"] += seconds
+                timing["min"] = min(timing["min"], seconds)
+                timing["max"] = max(timing["max"], seconds)
+
+    def increment(self, name, value=1, **labels):
+        key = (name, labels.get("host"))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def summary(self):
+        """
+        {name: {"count", "total", "mean", "min", "max"}} over all hosts, plus the counters.
+        """
+        summary = {}
+        with self._lock:
+            for (name, _), timing in self.timings.items():
+                total = summary.setdefault(name, {"count": 0, "total": 0.0, "min": None, "max": 0.0})
+                total["count"] += timing["count"]
+                total["total"] += timing["total"]
+                total["min"] = timing["min"] if total["min"] is None else min(total["min"], timing["min"])
+                total["max"] = max(total["max"], timing["max"])
+            for total in summary.values():
+                total["mean"] = total["total"] / total["count"]
+            for (name, _), value in self.counters.items():
+                summary[name] = summary.get(name, 0) + value
+        return summary
+
+
+class PrometheusMetrics(Metrics):
+    """
+    Phases as prometheus_client histograms (seconds) and counts as counters,
+    named prefix_name with dots turned into underscores and labelled by host.
+    """
+
+    def __init__(self, registry=None, prefix="easyssh"):
+        if prometheus_client is None:
+            raise ImportError("PrometheusMetrics needs the prometheus_client package")
+        self.registry = registry or prometheus_client.REGISTRY
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _metric(self, kind, name):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = kind(
+                        "%s_%s" % (self.prefix, name.replace(".", "_")),
+                        name,
+                        ["host"],
+                        registry=self.registry,
+                    )
+        return metric
+
+    def observe(self, name, seconds, **labels):
+        self._metric(prometheus_client.Histogram, name + ".seconds").labels(
+            labels.get("host", "")
+        ).observe(seconds)
+
+    def increment(self, name, value=1, **labels):
+        self._metric(prometheus_client.Counter, name).labels(labels.get("host", "")).inc(value)
+
+
+class OpenTelemetrySpans(Metrics):
+    """
+    Every phase as a finished OpenTelemetry span with its labels as
+    attributes; the spans of a connect or a command nest under the current
+    span of the caller.
+    """
+
+    def __init__(self, tracer=None):
+        if otel_trace is None:
+            raise ImportError("OpenTelemetrySpans needs the opentelemetry-api package")
+        self.tracer = tracer or otel_trace.get_tracer("easyssh")
+
+    def phase(self, name, start, end, **labels):
+        span = self.tracer.start_span(
+            "easyssh." + name,
+            start_time=int(start * 1e9),
+            attributes=dict((key, str(value)) for key, value in labels.items()),
+        )
+        span.end(end_time=int(end * 1e9))
@@ -0,0 +1,202 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from easyssh.ssh import SSHConnection
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Keep connected SSHConnection objects around so repeated jobs against the
+    same hosts pay the tcp probe, handshake, auth and sftp open only once.
+
+    Connections are keyed by (host, port, username, credential). An idle
+    connection must answer a keepalive request within check_timeout seconds
+    before it is handed out (checked outside the pool lock). Idle connections
+    older than idle_timeout are closed, and when max_size connections are
+    open the least recently used idle one is evicted.
+
+    For example:
+
+    pool = ConnectionPool(max_size=200, idle_timeout=300)
+    with pool.connection(**server) as ssh:
+        ssh.exec_command("pwd")
+    pool.close()
+    """
+
+    def __init__(
+        self,
+        max_size=64,
+        idle_timeout=300,
+        keepalive=None,
+        wait_timeout=None,
+        check_timeout=5,
+    ):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        # seconds between transport keepalives, None disables them
+        self.keepalive = keepalive
+        # seconds acquire() waits for a free slot before PoolExhausted
+        self.wait_timeout = wait_timeout
+        # seconds an idle connection has to answer before it counts as dead
+        self.check_timeout = check_timeout
+
+        self._condition = threading.Condition()
+        # id(ssh) -> (key, ssh, released_at), least recently used first
+        self._idle = OrderedDict()
+        self._in_use = {}
+
+    @staticmethod
+    def key(server):
+        return (
+            server.get("host", "127.0.0.1"),
+            server.get("port", 22),
+            server.get("username", "root"),
+            server.get("password") or server.get("hostkey"),
+        )
+
+    @staticmethod
+    def is_alive(ssh, timeout=5):
+        """
+        True when the server answers a keepalive request within timeout
+        seconds. An ignore message would only reach the local socket
+        buffer, so a peer that silently went away (reboot, NAT timeout)
+        would still pass.
+        """
+        transport = ssh.transport
+        if transport is None or not transport.is_active():
+            return False
+
+        def ask():
+            try:
+                # servers answer unknown global requests with a failure, a reply all the same
+                transport.global_request("keepalive@openssh.com", wait=True)
+            except Exception:
+                pass
+
+        # global_request has no timeout of its own; closing a dead
+        # connection ends the thread
+        thread = threading.Thread(target=ask, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        return not thread.is_alive() and transport.is_active()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._idle) + len(self._in_use)
+
+    def acquire(self, **server):
+        key = self.key(server)
+        deadline = time.time() + self.wait_timeout if self.wait_timeout else None
+        placeholder = object()
+        while True:
+            with self._condition:
+                ssh = self._reserve(key, deadline)
+                if ssh is None:
+                    # reserve the slot while connecting outside the lock
+                    self._in_use[id(placeholder)] = (key, placeholder)
+                    break
+            # checked outside the lock, a round trip must not hold up other hosts
+            if self.is_alive(ssh, self.check_timeout):
+                return ssh
+            self.discard(ssh)
+
+        try:
+            ssh = SSHConnection(**server)
+            ssh.connect()
+            if self.keepalive:
+                ssh.transport.set_keepalive(self.keepalive)
+        except Exception:
+            with self._condition:
+                del self._in_use[id(placeholder)]
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            del self._in_use[id(placeholder)]
+            self._in_use[id(ssh)] = (key, ssh)
+        return ssh
+
+    def release(self, ssh):
+        with self._condition:
+            key, _ = self._in_use.pop(id(ssh))
+            self._idle[id(ssh)] = (key, ssh, time.time())
+            self._condition.notify()
+
+    def discard(self, ssh):
+        with self._condition:
+            self._in_use.pop(id(ssh), None)
+            self._idle.pop(id(ssh), None)
+            self._condition.notify()
+        self._close(ssh)
+
+    @contextmanager
+    def connection(self, **server):
+        ssh = self.acquire(**server)
+        try:
+            yield ssh
+        except Exception:
+            self.discard(ssh)
+            raise
+        else:
+            self.release(ssh)
+
+    def close(self):
+        with self._condition:
+            idle = [entry[1] for entry in self._idle.values()]
+            self._idle.clear()
+        for ssh in idle:
+            self._close(ssh)
+
+    def _reserve(self, key, deadline):
+        """
+        Move the most recently used idle connection for key to in use and
+        return it, or return None once there is room for a new connection.
+        Called with the lock held.
+        """
+        while True:
+            self._evict_expired()
+            for ident, (idle_key, ssh, _) in reversed(list(self._idle.items())):
+                if idle_key == key:
+                    del self._idle[ident]
+                    self._in_use[id(ssh)] = (key, ssh)
+                    return ssh
+            if len(self._idle) + len(self._in_use) < self.max_size:
+                return None
+            if self._idle:
+                self._close(self._idle.popitem(last=False)[1][1])
+                return None
+            remaining = deadline - time.time() if deadline else None
+            if remaining is not None and remaining <= 0:
+                raise PoolExhausted("%d connections in use" % len(self._in_use))
+            self._condition.wait(remaining)
+
+    def _evict_expired(self):
+        if not self.idle_timeout:
+            return
+        expired_before = time.time() - self.idle_timeout
+        while self._idle:
+            ident, (_, ssh, released_at) = next(iter(self._idle.items()))
+            if released_at > expired_before:
+                break
+            del self._idle[ident]
+            self._close(ssh)
+
+    @staticmethod
+    def _close(ssh):
+        try:
+            ssh.disconnect()
+        except Exception:
+            pass
+
+
+default_pool = ConnectionPool()
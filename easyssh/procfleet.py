@@ -0,0 +1,217 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import threading
+from queue import Empty
+
+from easyssh.fleet import Fleet
+from easyssh.telemetry import Telemetry
+
+# numbers the runs, so telemetry sources of different runs never collide
+_runs = itertools.count()
+
+
+class _Shards:
+    """
+    Host indexes split into one contiguous range per process, in shared
+    memory. A process takes hosts from the front of its own range; once that
+    is empty it steals from the back of the fullest other range, so a shard
+    with slow hosts is finished by whoever is free.
+    """
+
+    def __init__(self, context, count, shards):
+        size = int(math.ceil(count / shards)) if count else 0
+        self.lock = context.Lock()
+        self.heads = context.RawArray("l", [min(shard * size, count) for shard in range(shards)])
+        self.tails = context.RawArray("l", [min((shard + 1) * size, count) for shard in range(shards)])
+
+    def take(self, shard):
+        """
+        The next host index for the process of shard, None when none are left.
+        """
+        with self.lock:
+            if self.heads[shard] < self.tails[shard]:
+                self.heads[shard] += 1
+                return self.heads[shard] - 1
+            victim = max(range(len(self.heads)), key=lambda other: self.tails[other] - self.heads[other])
+            if self.heads[victim] < self.tails[victim]:
+                self.tails[victim] -= 1
+                return self.tails[victim]
+        return None
+
+
+class _QueueSink:
+    """
+    Sends the snapshots of a worker process's Telemetry to the parent.
+    """
+
+    def __init__(self, messages, number):
+        self.messages = messages
+        self.number = number
+
+    def emit(self, snapshot):
+        self.messages.put(pickle.dumps(("progress", self.number, snapshot)))
+
+
+def _result(index, value, error, elapsed):
+    """
+    A pickled result message. Fleet.exec_command hangs the CommandResults on
+    errors, which do not survive pickling, so they travel on their own; an
+    error or value that can not be pickled and unpickled again (exceptions
+    with required arguments do not) becomes a RuntimeError.
+    """
+    results = getattr(error, "results", None)
+    try:
+        message = pickle.dumps(("result", index, value, error, results, elapsed))
+        pickle.loads(message)
+        return message
+    except Exception as e:
+        reason = repr(error) if error is not None else "the value can not be sent back: %s" % e
+        return pickle.dumps(("result", index, None, RuntimeError(reason), results, elapsed))
+
+
+def _work(number, shards, messages, servers, func, workers, timeout, interval):
+    """
+    Body of one worker process: workers threads take hosts from shards,
+    connect, call func and send each result back as soon as it is ready.
+    """
+    telemetry = None
+    if interval is not None:
+        telemetry = Telemetry([_QueueSink(messages, number)], interval)
+    fleet = Fleet([], workers=workers, timeout=timeout)
+
+    def loop():
+        while True:
+            index = shards.take(number)
+            if index is None:
+                return
+            server = servers[index]
+            if telemetry is not None and "telemetry" not in server:
+                server = dict(server, telemetry=telemetry)
+            _, value, error, elapsed = fleet.call(server, func)
+            messages.put(_result(index, value, error, elapsed))
+
+    threads = [threading.Thread(target=loop) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if telemetry is not None:
+        telemetry.close()
+    messages.put(pickle.dumps(("done", number)))
+
+
+class ProcessFleet(Fleet):
+    """
+    A Fleet that spreads its hosts over processes, for work that keeps one
+    core busy with paramiko's encryption, such as uploading to hundreds of
+    hosts at once.
+
+    Hosts are split into one shard per process and each process runs
+    workers threads with connections of its own; a process that runs out of
+    hosts takes the remaining ones of the busiest shard. Results come back
+    as each host finishes, and with telemetry the progress of the transfers
+    in every process is reported by that one Telemetry.
+
+    For example:
+
+    fleet = ProcessFleet(servers, processes=8, workers=16, telemetry=Telemetry([TerminalSink()]))
+    for server, value, error, elapsed in fleet.run(lambda ssh: ssh.upload("image.tar", "/opt/image.tar")):
+        print(server["host"], error)
+
+    func, its return values and errors are passed between processes:
+    without the fork start method (the default where there is one) func
+    must be picklable. A ConnectionPool can not be shared between
+    processes, every host is connected to for the run.
+    """
+
+    def __init__(
+        self,
+        servers,
+        processes=None,
+        workers=32,
+        timeout=None,
+        telemetry=None,
+        start_method=None,
+    ):
+        Fleet.__init__(self, servers, workers=workers, timeout=timeout)
+        self.processes = processes or os.cpu_count() or 1
+        self.telemetry = telemetry
+        if start_method is None and "fork" in multiprocessing.get_all_start_methods():
+            start_method = "fork"
+        self.start_method = start_method
+
+    def subset(self, servers, workers):
+        return ProcessFleet(
+            servers,
+            processes=self.processes,
+            # workers is per process here
+            workers=max(1, int(math.ceil(workers / self.processes))),
+            timeout=self.timeout,
+            telemetry=self.telemetry,
+            start_method=self.start_method,
+        )
+
+    def run(self, func):
+        """
+        Call func(ssh) for every server in the worker processes, yield
+        (server, value, error, elapsed) as they finish.
+        """
+        if not self.servers:
+            return
+        context = multiprocessing.get_context(self.start_method)
+        run = next(_runs)
+        count = len(self.servers)
+        shards = _Shards(context, count, min(self.processes, count))
+        messages = context.Queue()
+        interval = self.telemetry.interval if self.telemetry is not None else None
+        processes = [
+            context.Process(
+                target=_work,
+                args=(number, shards, messages, self.servers, func, self.workers, self.timeout, interval),
+                daemon=True,
+            )
+            for number in range(len(shards.heads))
+        ]
+        for process in processes:
+            process.start()
+        pending = set(range(count))
+        running = set(range(len(processes)))
+        finished = False
+        try:
+            while running:
+                try:
+                    data = messages.get(timeout=1)
+                except Empty:
+                    # a process that died without saying done will not send more
+                    running = set(number for number in running if processes[number].is_alive())
+                    continue
+                try:
+                    message = pickle.loads(data)
+                except Exception:
+                    # the host it was for is reported as unfinished at the end
+                    continue
+                if message[0] == "progress":
+                    self.telemetry.merge((run, message[1]), message[2])
+                elif message[0] == "done":
+                    running.discard(message[1])
+                else:
+                    _, index, value, error, results, elapsed = message
+                    if results is not None:
+                        error.results = results
+                    pending.discard(index)
+                    yield self.servers[index], value, error, elapsed
+            for index in sorted(pending):
+                yield self.servers[index], None, RuntimeError("no result came back from the worker process"), 0.0
+            finished = True
+        finally:
+            for process in processes:
+                if not finished:
+                    process.terminate()
+                process.join()
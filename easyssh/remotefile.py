@@ -0,0 +1,306 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import socket
+import threading
+import weakref
+
+import paramiko
+
+# bytes fetched per read-ahead window, each window is one pipelined readv
+READ_AHEAD = 8 * 1024 * 1024
+# bytes per plain sftp read before read-ahead starts
+READ_BLOCK = 32 * 1024
+# paramiko's buffer for files opened for writing
+WRITE_BUFFER = 1024 * 1024
+
+
+class _ReadAhead:
+    """
+    Fetches [start, end) of a remote file in window sized pieces over
+    `workers` sftp sessions of their own, so one session waits for its next
+    window while the others deliver theirs. At most `workers` windows are
+    held or in flight ahead of the reader, which bounds memory.
+    """
+
+    def __init__(self, transport, path, start, end, window, workers):
+        self.windows = [(offset, min(window, end - offset)) for offset in range(start, end, window)]
+        self.end = end
+        self._taken = 0
+        self._ready = {}
+        self._error = None
+        self._stopped = False
+        self._condition = threading.Condition()
+        # opened here so a server out of sessions (sshd MaxSessions) is
+        # known at once; fewer sessions than asked for will do
+        sessions = []
+        for _ in range(min(workers, len(self.windows))):
+            try:
+                sessions.append(paramiko.SFTPClient.from_transport(transport))
+            except (paramiko.SSHException, socket.error, EOFError):
+                if not sessions:
+                    raise
+                break
+        for index, sftp in enumerate(sessions):
+            threading.Thread(
+                target=self._fetch, args=(sftp, path, index, len(sessions)), daemon=True
+            ).start()
+
+    def _fetch(self, sftp, path, index, workers):
+        try:
+            with sftp.open(path, "r") as f:
+                for number in range(index, len(self.windows), workers):
+                    with self._condition:
+                        while not self._stopped and number >= self._taken + workers:
+                            self._condition.wait()
+                        if self._stopped:
+                            return
+                    offset, length = self.windows[number]
+                    blocks = [
+                        (block, min(READ_BLOCK, offset + length - block))
+                        for block in range(offset, offset + length, READ_BLOCK)
+                    ]
+                    data = b"".join(f.readv(blocks))
+                    with self._condition:
+                        self._ready[number] = data
+                        self._condition.notify_all()
+        except Exception as e:
+            with self._condition:
+                self._error = e
+                self._condition.notify_all()
+        finally:
+            sftp.close()
+
+    def get(self):
+        """
+        The next window's bytes, None after the last one.
+        """
+        with self._condition:
+            if self._taken >= len(self.windows):
+                return None
+            while self._taken not in self._ready and self._error is None:
+                self._condition.wait()
+            if self._taken not in self._ready:
+                raise self._error
+            data = self._ready.pop(self._taken)
+            self._taken += 1
+            self._condition.notify_all()
+            return data
+
+    def close(self):
+        with self._condition:
+            self._stopped = True
+            self._ready.clear()
+            self._condition.notify_all()
+
+
+class RemoteFile:
+    """
+    A remote file as returned by SSHConnection.open, built for streaming
+    big files:
+
+    - once a file opened for reading is read sequentially, the rest of it
+      is fetched ahead in read_ahead byte windows over `workers` extra sftp
+      sessions; a seek elsewhere stops that and reads plainly again.
+    - files opened for writing are pipelined with a large buffer, write
+      errors surface at flush or close.
+    - readinto fills a caller's bytearray or memoryview.
+    - iterating yields one line at a time, never the whole file.
+
+    Like paramiko's file, read returns bytes and lines are str unless mode
+    has "b". Anything else (stat, chmod, ...) goes to the paramiko file.
+
+    with ssh.open("/var/log/messages") as f:
+        for line in f:
+            parse(line)
+    """
+
+    def __init__(self, ssh, path, mode="r", buffer_size=-1, read_ahead=READ_AHEAD, workers=2):
+        self.ssh = ssh
+        self.path = path
+        self.mode = mode
+        self.writable = any(flag in mode for flag in "wax+")
+        if self.writable and buffer_size < 0:
+            buffer_size = WRITE_BUFFER
+        self.file = ssh.sFTPClient.open(path, mode, buffer_size)
+        if self.writable:
+            self.file.set_pipelined(True)
+        self.read_ahead = read_ahead
+        self.workers = workers
+        self.closed = False
+        # the last plain read or read-ahead window; _data[_offset:] is at _pos
+        self._data = b""
+        self._offset = 0
+        self._pos = 0
+        self._sequential = False
+        self._fetcher = None
+        self._finalizer = None
+
+    def __getattr__(self, name):
+        if name == "file":
+            raise AttributeError(name)
+        return getattr(self.file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _stop(self):
+        if self._fetcher is not None:
+            self._fetcher.close()
+            self._finalizer.detach()
+            self._fetcher = self._finalizer = None
+        self._data = b""
+        self._offset = 0
+
+    def _fill(self):
+        """
+        Load the bytes at _pos into the buffer, False at the end of the file.
+        """
+        if self._fetcher is not None:
+            try:
+                data = self._fetcher.get()
+            except (IOError, OSError, EOFError, paramiko.SSHException):
+                # read plainly from here on; a real read error comes back below
+                data = None
+                self.read_ahead = 0
+            if data:
+                self._data, self._offset = data, 0
+                return True
+            # past the size seen when read-ahead started, the file may have grown
+            self._stop()
+        elif self._sequential and self.read_ahead and self.workers:
+            end = self.file.stat().st_size
+            if end > self._pos:
+                try:
+                    self._fetcher = _ReadAhead(
+                        self.ssh.transport, self.path, self._pos, end, self.read_ahead, self.workers
+                    )
+                except (paramiko.SSHException, socket.error, EOFError):
+                    # no spare sessions on the server, read as paramiko would
+                    self.read_ahead = 0
+                else:
+                    # a file that is never closed must not keep its sessions
+                    # (they count against sshd MaxSessions) until disconnect
+                    self._finalizer = weakref.finalize(self, self._fetcher.close)
+                    self.ssh._read_aheads.add(self._fetcher)
+                    return self._fill()
+        self.file.seek(self._pos)
+        data = self.file.read(READ_BLOCK)
+        # a second plain read right after the first turns read-ahead on
+        self._sequential = True
+        self._data, self._offset = data, 0
+        return bool(data)
+
+    @property
+    def _available(self):
+        return len(self._data) - self._offset
+
+    def _take(self, count):
+        """
+        The next count buffered bytes (as a memoryview, not a copy).
+        """
+        view = memoryview(self._data)[self._offset : self._offset + count]
+        self._offset += count
+        self._pos += count
+        return view
+
+    def readinto(self, buffer):
+        """
+        Read into buffer (bytearray, memoryview, ...) until it is full or the
+        file ends, and return the number of bytes read.
+        """
+        view = memoryview(buffer).cast("B")
+        if self.writable:
+            data = self.file.read(len(view))
+            view[: len(data)] = data
+            return len(data)
+        done = 0
+        while done < len(view):
+            if not self._available and not self._fill():
+                break
+            count = min(len(view) - done, self._available)
+            view[done : done + count] = self._take(count)
+            done += count
+        return done
+
+    def read(self, size=None):
+        if self.writable:
+            return self.file.read(size)
+        if size is None or size < 0:
+            parts = []
+            while self._available or self._fill():
+                parts.append(self._take(self._available))
+            return b"".join(parts)
+        data = bytearray(size)
+        return bytes(data[: self.readinto(data)])
+
+    def readline(self, size=None):
+        if self.writable:
+            return self.file.readline(size)
+        parts = []
+        length = 0
+        while size is None or size < 0 or length < size:
+            if not self._available and not self._fill():
+                break
+            stop = len(self._data)
+            if size is not None and size >= 0:
+                stop = min(stop, self._offset + size - length)
+            end = self._data.find(b"\n", self._offset, stop)
+            count = (stop if end < 0 else end + 1) - self._offset
+            parts.append(self._take(count))
+            length += count
+            if end >= 0:
+                break
+        line = b"".join(parts)
+        return line if "b" in self.mode else line.decode("utf-8")
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def readlines(self):
+        return list(self)
+
+    def write(self, data):
+        self.file.write(data)
+
+    def seek(self, offset, whence=0):
+        if self.writable:
+            return self.file.seek(offset, whence)
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += self.file.stat().st_size
+        if self._pos <= offset <= self._pos + self._available:
+            # still inside the buffer, keep reading ahead
+            self._offset += offset - self._pos
+        else:
+            self._stop()
+            self._sequential = False
+        self._pos = offset
+
+    def tell(self):
+        if self.writable:
+            return self.file.tell()
+        return self._pos
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._stop()
+        try:
+            self.file.close()
+        finally:
+            if self.writable:
+                self.ssh.forget_stat(self.path)
@@ -0,0 +1,27 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+
+
+class CommandResult:
+    """
+    The outcome of one remote command: its output, exit status and elapsed seconds.
+    """
+
+    def __init__(self, command, stdout="", stderr="", exit_status=None, elapsed=0.0):
+        self.command = command
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_status = exit_status
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.exit_status == 0
+
+    def __repr__(self):
+        return "<CommandResult %r exit_status=%s elapsed=%.3fs>" % (
+            self.command,
+            self.exit_status,
+            self.elapsed,
+        )
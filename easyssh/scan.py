@@ -0,0 +1,292 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import errno
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+REACHABLE = "reachable"
+SLOW = "slow"
+UNREACHABLE = "unreachable"
+
+# connect_ex results of a non blocking connect that is still going
+IN_PROGRESS = (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY)
+
+
+class Resolver:
+    """
+    getaddrinfo answers (IPv4 and IPv6) cached for ttl seconds.
+    Failed lookups are not cached.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        key = (host, port)
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            return entry[1]
+        addresses = [
+            (family, sockaddr)
+            for family, _, _, _, sockaddr in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        ]
+        with self._lock:
+            self._cache[key] = (time.time(), addresses)
+        return addresses
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+default_resolver = Resolver()
+
+
+class ScanResult:
+    """
+    What scan found for one host and port: state is reachable, slow
+    (reachable but slower than the slow threshold) or unreachable, with the
+    address that answered, the tcp connect and total times, the ssh banner
+    and, when unreachable, the reason.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.state = UNREACHABLE
+        self.address = None
+        self.connect_time = None
+        self.elapsed = None
+        self.banner = None
+        self.error = None
+
+    def __repr__(self):
+        if self.state == UNREACHABLE:
+            return "<ScanResult %s:%s unreachable: %s>" % (self.host, self.port, self.error)
+        return "<ScanResult %s:%s %s %.3fs %s>" % (
+            self.host,
+            self.port,
+            self.state,
+            self.elapsed,
+            self.banner or "",
+        )
+
+
+class ScanReport:
+    """
+    The results of one scan, split into reachable, slow and unreachable.
+    """
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    def _state(self, state):
+        return [result for result in self.results if result.state == state]
+
+    @property
+    def reachable(self):
+        return self._state(REACHABLE)
+
+    @property
+    def slow(self):
+        return self._state(SLOW)
+
+    @property
+    def unreachable(self):
+        return self._state(UNREACHABLE)
+
+    def alive(self):
+        """
+        {(host, port)} of every host that answered, slow or not.
+        """
+        return set(
+            (result.host, result.port) for result in self.results if result.state != UNREACHABLE
+        )
+
+    def __str__(self):
+        lines = ["! %s:%s %s" % (r.host, r.port, r.error) for r in self.unreachable]
+        lines += ["~ %s:%s %.3fs" % (r.host, r.port, r.elapsed) for r in self.slow]
+        lines.append(
+            "%d reachable, %d slow, %d unreachable in %.2fs"
+            % (len(self.reachable), len(self.slow), len(self.unreachable), self.elapsed)
+        )
+        return "\n".join(lines)
+
+
+def target(server, default_port=22):
+    """
+    (host, port) of a server dict, a (host, port) tuple or a host name.
+    """
+    if isinstance(server, dict):
+        return server.get("host", "127.0.0.1"), server.get("port", default_port)
+    if isinstance(server, (tuple, list)):
+        return server[0], server[1]
+    return server, default_port
+
+
+class _Probe:
+    def __init__(self, result, addresses, timeout):
+        self.result = result
+        self.addresses = deque(addresses)
+        self.started = time.time()
+        self.deadline = self.started + timeout
+        self.sock = None
+        self.buffer = b""
+
+
+def scan(
+    servers,
+    timeout=3.0,
+    total_timeout=10.0,
+    slow=1.0,
+    banner=True,
+    resolver=None,
+    max_sockets=512,
+    resolve_workers=32,
+):
+    """
+    Check which servers accept ssh connections, all at once, and return a
+    ScanReport.
+
+    Names are resolved concurrently (cached by resolver), then one
+    non-blocking connect per host runs in a single selector loop, trying
+    each IPv6/IPv4 address in turn; with banner the host must also send its
+    "SSH-..." banner. A host gets timeout seconds for all of that and
+    counts as slow when it took more than slow seconds. The whole scan
+    stops after total_timeout seconds, hosts still pending are unreachable.
+    At most max_sockets connects are open at the same time.
+
+    servers are dicts like those given to SSHConnection, (host, port)
+    tuples or host names.
+    """
+    start = time.time()
+    deadline = start + total_timeout
+    resolver = resolver or default_resolver
+    results = {}
+    for server in servers:
+        key = target(server)
+        if key not in results:
+            results[key] = ScanResult(*key)
+
+    # getaddrinfo blocks, so names resolve on threads; do not wait for stragglers
+    executor = ThreadPoolExecutor(max_workers=max(1, min(resolve_workers, len(results))))
+    lookups = dict(
+        (executor.submit(resolver.resolve, host, port), results[(host, port)])
+        for host, port in results
+    )
+    wait(lookups, timeout=max(0, deadline - time.time()))
+    executor.shutdown(wait=False)
+    queue = deque()
+    for future, result in lookups.items():
+        if not future.done():
+            result.error = "name resolution timed out"
+        elif future.exception() is not None:
+            result.error = "name resolution failed: %s" % future.exception()
+        else:
+            queue.append((result, future.result()))
+
+    selector = selectors.DefaultSelector()
+    active = set()
+
+    def finish(probe, error=None):
+        result = probe.result
+        if probe.sock is not None:
+            selector.unregister(probe.sock)
+            probe.sock.close()
+            probe.sock = None
+        active.discard(probe)
+        result.elapsed = time.time() - probe.started
+        if error is None:
+            result.error = None
+            result.state = SLOW if result.elapsed > slow else REACHABLE
+        else:
+            result.error = error
+
+    def connect_next(probe, error=None):
+        if probe.sock is not None:
+            selector.unregister(probe.sock)
+            probe.sock.close()
+            probe.sock = None
+        while probe.addresses:
+            family, sockaddr = probe.addresses.popleft()
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            code = sock.connect_ex(sockaddr)
+            if code in IN_PROGRESS:
+                probe.sock = sock
+                probe.result.address = sockaddr[0]
+                selector.register(sock, selectors.EVENT_WRITE, probe)
+                return
+            sock.close()
+            error = os.strerror(code)
+        finish(probe, error or "no address")
+
+    def on_event(probe, mask):
+        if mask & selectors.EVENT_WRITE:
+            code = probe.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if code:
+                connect_next(probe, os.strerror(code))
+                return
+            probe.result.connect_time = time.time() - probe.started
+            if not banner:
+                finish(probe)
+            else:
+                selector.modify(probe.sock, selectors.EVENT_READ, probe)
+            return
+        try:
+            data = probe.sock.recv(1024)
+        except socket.error as e:
+            finish(probe, str(e))
+            return
+        if not data:
+            finish(probe, "closed before the ssh banner")
+            return
+        probe.buffer += data
+        # servers may send other lines before the version line
+        for line in probe.buffer.split(b"\n")[:-1]:
+            if line.startswith(b"SSH-"):
+                probe.result.banner = line.strip().decode("utf-8", "replace")
+                finish(probe)
+                return
+        if len(probe.buffer) > 8192:
+            finish(probe, "no ssh banner")
+
+    try:
+        while (queue or active) and time.time() < deadline:
+            while queue and len(active) < max_sockets:
+                result, addresses = queue.popleft()
+                probe = _Probe(result, addresses, timeout)
+                active.add(probe)
+                connect_next(probe)
+            if not active:
+                continue
+            wake = min(min(probe.deadline for probe in active), deadline)
+            for key, mask in selector.select(max(0, wake - time.time())):
+                # skip events of sockets closed earlier in this batch
+                if key.data in active and key.fileobj is key.data.sock:
+                    on_event(key.data, mask)
+            now = time.time()
+            for probe in list(active):
+                if now >= probe.deadline:
+                    if probe.result.connect_time is None:
+                        finish(probe, "connect timed out after %ss" % timeout)
+                    else:
+                        finish(probe, "no ssh banner after %ss" % timeout)
+    finally:
+        for probe in list(active):
+            finish(probe, "scan stopped after %ss" % total_timeout)
+        selector.close()
+    for result, _ in queue:
+        result.error = "scan stopped after %ss" % total_timeout
+    return ScanReport(list(results.values()), time.time() - start)
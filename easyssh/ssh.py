@@ -2,8 +2,15 @@
 # author = taoyin
 # github = https://github.com/intelyt/easyssh
 from __future__ import print_function, division
+import codecs
+import errno
 import os
+import select
+import socket
 import stat
+import threading
+import time
+import weakref
 
 try:
     from nt import _getvolumepathname
@@ -12,9 +19,218 @@ except ImportError:
 
 import paramiko
 
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from easyssh import batch, edit, remotefile, sync, transfer
+from easyssh.facts import Facts, default_fact_cache
+from easyssh.cache import StatCache, MISSING
+from easyssh.credentials import agent_auth, default_credentials
+from easyssh.result import CommandResult
+from easyssh.telemetry import NULL_TRANSFER
 from easyssh.utils import *
 
 
+class OutputTail:
+    """
+    Byte buffer that keeps only the last max_bytes written to it, None keeps everything.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.chunks = deque()
+        self.size = 0
+        # bytes dropped from the front
+        self.truncated = 0
+
+    def append(self, data):
+        self.chunks.append(data)
+        self.size += len(data)
+        if self.max_bytes is None:
+            return
+        while self.size > self.max_bytes:
+            extra = self.size - self.max_bytes
+            first = self.chunks[0]
+            if len(first) <= extra:
+                self.chunks.popleft()
+                dropped = len(first)
+            else:
+                self.chunks[0] = first[extra:]
+                dropped = extra
+            self.size -= dropped
+            self.truncated += dropped
+
+    def getvalue(self):
+        return b"".join(self.chunks).decode("utf-8", "replace")
+
+
+def channel_finished(channel, command):
+    """
+    Whether the command on channel is over: its eof and exit status are in,
+    or the channel was closed. Taken before draining, everything the server
+    sent before that is already buffered. A connection that closed under a
+    running command raises EOFError instead of reporting exit status -1.
+    """
+    if not channel.exit_status_ready():
+        return False
+    if channel.eof_received:
+        return True
+    if not channel.closed:
+        return False
+    if channel.exit_status == -1:
+        raise EOFError("the connection closed while %r was running" % command)
+    return True
+
+
+class CommandStream:
+    """
+    A running command whose output is read as it arrives.
+
+    Iterating yields ("stdout" | "stderr", text) in arrival order, one line at
+    a time (or one decoded chunk with lines=False), reading both streams
+    together so neither can fill its window and stall the other. Only the
+    last max_output bytes of each stream are kept for stdout/stderr, so
+    memory stays flat however much the command prints. wait() drains the
+    rest and returns a CommandResult.
+    """
+
+    # a line longer than this is handed out in pieces
+    max_line = 64 * 1024
+
+    def __init__(
+        self,
+        channel,
+        command,
+        timeout=3600,
+        max_output=1024 * 1024,
+        lines=True,
+        on_stdout=None,
+        on_stderr=None,
+        max_time=None,
+    ):
+        self.channel = channel
+        self.command = command
+        # seconds without any output before socket.timeout is raised
+        self.timeout = timeout
+        # seconds the command may run in all, output or not; None for no limit
+        self.max_time = max_time
+        self.lines = lines
+        self.callbacks = {"stdout": on_stdout, "stderr": on_stderr}
+        self.tails = {"stdout": OutputTail(max_output), "stderr": OutputTail(max_output)}
+        self.exit_status = None
+        self.start = time.time()
+        # time of the first output, set while reading
+        self.first_byte = None
+        # set by SSHConnection.exec_command_stream when it has metrics
+        self.metrics = None
+        self.host = None
+        self._decoders = dict(
+            (name, codecs.getincrementaldecoder("utf-8")("replace"))
+            for name in self.tails
+        )
+        self._partial = {"stdout": "", "stderr": ""}
+        self._done = False
+
+    @property
+    def stdout(self):
+        return self.tails["stdout"].getvalue()
+
+    @property
+    def stderr(self):
+        return self.tails["stderr"].getvalue()
+
+    def __iter__(self):
+        if self._done:
+            return
+        channel = self.channel
+        last_data = time.time()
+        try:
+            while True:
+                finished = channel_finished(channel, self.command)
+                received = False
+                while channel.recv_ready():
+                    received = True
+                    for item in self._feed("stdout", channel.recv(32768)):
+                        yield item
+                while channel.recv_stderr_ready():
+                    received = True
+                    for item in self._feed("stderr", channel.recv_stderr(32768)):
+                        yield item
+                if finished:
+                    break
+                if received:
+                    last_data = time.time()
+                    continue
+                if time.time() - last_data > self.timeout:
+                    raise socket.timeout(
+                        "%r sent nothing for %ss" % (self.command, self.timeout)
+                    )
+                if self.max_time is not None and time.time() - self.start > self.max_time:
+                    raise socket.timeout(
+                        "%r still running after %.1fs" % (self.command, self.max_time)
+                    )
+                if channel.eof_received:
+                    channel.status_event.wait(0.1)
+                else:
+                    select.select([channel], [], [], 0.1)
+
+            for name in ("stdout", "stderr"):
+                for item in self._feed(name, b"", final=True):
+                    yield item
+            self.exit_status = channel.recv_exit_status()
+            self._done = True
+            if self.metrics is not None:
+                self._record()
+        finally:
+            channel.close()
+
+    def _record(self):
+        now = time.time()
+        labels = {"host": self.host, "exit_status": self.exit_status}
+        self.metrics.phase("exec.first_byte", self.start, self.first_byte or now, **labels)
+        self.metrics.phase("exec.exit", self.start, now, **labels)
+        received = sum(tail.size + tail.truncated for tail in self.tails.values())
+        self.metrics.increment("exec.bytes_received", received, **labels)
+
+    def _feed(self, name, data, final=False):
+        if self.first_byte is None and data:
+            self.first_byte = time.time()
+        self.tails[name].append(data)
+        text = self._decoders[name].decode(data, final)
+        if self.lines:
+            text = self._partial[name] + text
+            pieces = text.splitlines(True)
+            if pieces and not final and not pieces[-1].endswith(("\n", "\r")):
+                self._partial[name] = pieces.pop()
+                if len(self._partial[name]) > self.max_line:
+                    pieces.append(self._partial[name])
+                    self._partial[name] = ""
+            else:
+                self._partial[name] = ""
+        else:
+            pieces = [text] if text else []
+        callback = self.callbacks[name]
+        for piece in pieces:
+            if callback is not None:
+                callback(piece)
+            yield name, piece
+
+    def wait(self):
+        for _ in self:
+            pass
+        return CommandResult(
+            self.command,
+            self.stdout,
+            self.stderr,
+            self.exit_status,
+            time.time() - self.start,
+        )
+
+
+# one regular file (or link to one) found by SSHConnection.walk_folder
+FileRecord = namedtuple("FileRecord", ["path", "size", "mtime", "mode"])
+
+
 class SSHConnection:
     """
     For example:
@@ -28,6 +244,22 @@ class SSHConnection:
     ssh.exec_command("pwd")
     ssh.disconnect()
 
+    private keys may be RSA, ECDSA or Ed25519 (passphrase= for encrypted
+    ones) and are parsed once per process; agent=True uses ssh-agent keys;
+    known_hosts=KnownHosts() rejects servers whose key is not recorded.
+
+    ssh.facts() gathers installed packages, os release, kernel and limits in
+    one round trip and caches them in fact_cache (default_fact_cache unless
+    given); call invalidate_facts after installing or removing packages.
+
+    stat_cache=True (or a StatCache) remembers stat results; paths this
+    object changes are forgotten automatically, after changing files with
+    exec_command call forget_stat yourself.
+
+    telemetry=Telemetry([TerminalSink()]) shows the progress of transfers,
+    which are silent by default. metrics=MetricsRecorder() (or any
+    easyssh.metrics.Metrics) times connect, commands, transfers and stats.
+
     """
 
     def __init__(self, **kwargs):
@@ -41,18 +273,57 @@ class SSHConnection:
         self.username = kwargs.get("username", "root")
         self.password = kwargs.get("password", None)
         self.hostkey = kwargs.get("hostkey", None)
+        self.passphrase = kwargs.get("passphrase", None)
+        # authenticate with ssh-agent keys, also used without password and hostkey
+        self.agent = kwargs.get("agent", False)
+        # parsed private keys shared between connections
+        self.credentials = kwargs.get("credentials", None) or default_credentials
+        # a KnownHosts to check the server key against, None skips the check
+        self.known_hosts = kwargs.get("known_hosts", None)
+        # seconds allowed for the tcp connect, banner, handshake and auth
+        self.timeout = kwargs.get("timeout", None)
+        stat_cache = kwargs.get("stat_cache", None)
+        self.stat_cache = StatCache() if stat_cache is True else stat_cache or None
+        self.fact_cache = kwargs.get("fact_cache", None) or default_fact_cache
+        # zlib compression of the whole ssh stream, worth it on slow links
+        self.compress = kwargs.get("compress", False)
+        # a Telemetry that transfers report their progress to, silent when None
+        self.telemetry = kwargs.get("telemetry", None)
+        # easyssh.metrics.Metrics hooks for per phase timings and counters
+        self.metrics = kwargs.get("metrics", None)
+        # read-ahead of the RemoteFiles opened on this connection
+        self._read_aheads = weakref.WeakSet()
 
     def connect(self):
+        marks = [time.time()]
         # ping
-        assert scan_by_socket(self.host, self.port)
+        if not scan_by_socket(self.host, self.port, self.timeout or 10):
+            raise socket.error("%s:%s is not reachable" % (self.host, self.port))
+        marks.append(time.time())
 
         # tran
-        transport = paramiko.Transport(self.host, self.port)
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        marks.append(time.time())
+        transport = paramiko.Transport(sock)
+        transport.use_compression(self.compress)
+        if self.timeout:
+            transport.banner_timeout = self.timeout
+            transport.handshake_timeout = self.timeout
+            transport.auth_timeout = self.timeout
+        if self.known_hosts is not None:
+            self.known_hosts.restrict(transport, self.host, self.port)
+        transport.start_client(timeout=self.timeout)
+        if self.known_hosts is not None:
+            self.known_hosts.verify(self.host, self.port, transport.get_remote_server_key())
+        marks.append(time.time())
         if self.password:
-            transport.connect(username=self.username, password=self.password)
+            transport.auth_password(self.username, self.password)
+        elif self.agent or not self.hostkey:
+            agent_auth(transport, self.username)
         else:
-            private_key = paramiko.RSAKey.from_private_key_file(self.hostkey)
-            transport.connect(username=self.username, pkey=private_key)
+            private_key = self.credentials.load_key(self.hostkey, self.passphrase)
+            transport.auth_publickey(self.username, private_key)
+        marks.append(time.time())
 
         self.transport = transport
         # ssh
@@ -62,56 +333,194 @@ class SSHConnection:
 
         # sftp
         self.sFTPClient = paramiko.SFTPClient.from_transport(self.transport)
+        marks.append(time.time())
+        if self.metrics is not None:
+            for name, start, end in zip(
+                ("tcp_probe", "tcp_connect", "kex", "auth", "sftp_init"), marks, marks[1:]
+            ):
+                self.metrics.phase("connect." + name, start, end, host=self.host)
+
+    def progress(self, name, total=0):
+        """
+        A Transfer to report the progress of name to self.telemetry, or a
+        no-op stand-in without telemetry; use it as a context manager.
+        """
+        if self.telemetry is None:
+            return NULL_TRANSFER
+        return self.telemetry.transfer(self.host, name, total)
 
     def get_channel(self):
         return self.sFTPClient.get_channel()
 
     def disconnect(self):
+        # read-ahead of RemoteFiles left open, its threads would wait forever
+        for fetcher in list(self._read_aheads):
+            fetcher.close()
         self.transport.close()
         self.sshClient.close()
         self.transport.close()
 
     def exec_command_without_block(self, command, timeout=3600, environment=None):
-        all_put_string = ""
-        stdin, stdout, stderr = self.sshClient.exec_command(
-            command, timeout=timeout, environment=environment
+        stream = self.exec_command_stream(
+            command, timeout=timeout, environment=environment, max_output=None
         )
-        stdout_iter = iter(stdout.readline, "")
-        stderr_iter = iter(stderr.readline, "")
-
         print("======   output  ======")
-        for opt in stdout_iter:
-            if opt:
-                all_put_string += opt
-                print(opt.strip())
+        for name, line in stream:
+            if name == "stderr":
+                print("errput: %s" % line.rstrip())
+            else:
+                print(line.rstrip())
         print("======   output  ======")
-
-        print("======   errput  ======")
-        for ept in stderr_iter:
-            if ept:
-                all_put_string += ept
-                print(ept.strip())
-        print("======   errput  ======")
-        return all_put_string
+        return stream.stdout + stream.stderr
 
     def exec_command(self, command, timeout=3600, environment=None):
-        stdin, stdout, stderr = self.sshClient.exec_command(
-            command, timeout=timeout, environment=environment
-        )
-        res = to_str(stdout.read())
-        error = to_str(stderr.read())
+        result = self.exec_command_result(command, timeout=timeout, environment=environment)
+        res, error = result.stdout, result.stderr
         return res + error if error.strip() else res
 
+    def exec_command_stream(
+        self,
+        command,
+        timeout=3600,
+        environment=None,
+        input=None,
+        max_output=1024 * 1024,
+        lines=True,
+        on_stdout=None,
+        on_stderr=None,
+        max_time=None,
+    ):
+        """
+        Start command and return a CommandStream that yields its output as it arrives.
+        timeout is the seconds allowed without output, max_time the seconds
+        allowed in all; either one closes the channel and raises socket.timeout.
+
+        For example:
+
+        stream = ssh.exec_command_stream("yum -y update", max_output=64 * 1024)
+        for name, line in stream:
+            print(name, line.rstrip())
+        print(stream.exit_status, stream.stdout)
+        """
+        start = time.time()
+        channel = self.transport.open_session()
+        if self.metrics is not None:
+            self.metrics.phase("exec.channel_open", start, time.time(), host=self.host)
+            self.metrics.increment("round_trips", 2, host=self.host)
+            if input is not None:
+                self.metrics.increment("exec.bytes_sent", len(input), host=self.host)
+        if environment:
+            channel.update_environment(environment)
+        channel.exec_command(command)
+        if input is not None:
+            channel.sendall(input)
+            channel.shutdown_write()
+        stream = CommandStream(
+            channel,
+            command,
+            timeout=timeout,
+            max_output=max_output,
+            lines=lines,
+            on_stdout=on_stdout,
+            on_stderr=on_stderr,
+            max_time=max_time,
+        )
+        if self.metrics is not None:
+            stream.metrics, stream.host = self.metrics, self.host
+        return stream
+
+    def exec_command_result(self, command, timeout=3600, environment=None, input=None, max_time=None):
+        return self.exec_command_stream(
+            command,
+            timeout=timeout,
+            environment=environment,
+            input=input,
+            max_output=None,
+            lines=False,
+            max_time=max_time,
+        ).wait()
+
+    def exec_commands(self, commands, max_sessions=10, timeout=3600, environment=None):
+        """
+        Run independent commands in parallel over this one transport, each on
+        its own exec channel, and yield a CommandResult as each one finishes.
+
+        At most max_sessions channels are open at once (sshd MaxSessions
+        defaults to 10); if the server refuses a channel earlier, the limit is
+        lowered to what it accepted and the rest of the commands queue up.
+        """
+        pending = deque(commands)
+        running = {}
+        try:
+            while pending or running:
+                while pending and len(running) < max_sessions:
+                    try:
+                        channel = self.transport.open_session()
+                    except paramiko.ChannelException:
+                        if not running:
+                            raise
+                        max_sessions = len(running)
+                        break
+                    command = pending.popleft()
+                    if environment:
+                        channel.update_environment(environment)
+                    channel.exec_command(command)
+                    running[channel] = (command, [], [], time.time())
+
+                waiting = [
+                    channel for channel in running if not (channel.eof_received or channel.closed)
+                ]
+                select.select(waiting, [], [], 0.1 if waiting else 0.01)
+
+                now = time.time()
+                for channel in list(running):
+                    command, out, err, start = running[channel]
+                    # before draining, so data sent ahead of the eof is read below
+                    finished = channel_finished(channel, command)
+                    while channel.recv_ready():
+                        out.append(channel.recv(32768))
+                    while channel.recv_stderr_ready():
+                        err.append(channel.recv_stderr(32768))
+                    if finished:
+                        del running[channel]
+                        exit_status = channel.recv_exit_status()
+                        channel.close()
+                        yield CommandResult(
+                            command,
+                            to_str(b"".join(out)),
+                            to_str(b"".join(err)),
+                            exit_status,
+                            now - start,
+                        )
+                    elif now - start > timeout:
+                        raise socket.timeout("%r timed out after %ss" % (command, timeout))
+        finally:
+            for channel in running:
+                channel.close()
+
     def upload(self, local_path, remote_path, mode=0o755):
         remote_folder, filepath = os.path.split(remote_path)
         if not self.exists(remote_folder):
             self.exec_command("mkdir -p %s" % remote_folder)
-        self.sFTPClient.put(local_path, remote_path, callback=callback)
+            self.forget_stat(remote_folder, parents=True)
+        start, size = time.time(), os.path.getsize(local_path)
+        with self.progress(remote_path, size) as progress:
+            self.sFTPClient.put(local_path, remote_path, callback=progress.callback)
+        if self.metrics is not None:
+            self._record_transfer("upload", start, size)
         if mode:
             self.sFTPClient.chmod(remote_path, mode)
+        self.forget_stat(remote_path)
 
-    def upload_folder(self, local_folder, remote_folder):
+    def upload_folder(self, local_folder, remote_folder, workers=1, mode=0o755):
+        """
+        Upload every file under local_folder and return the wall time in seconds.
 
+        The remote directories are created with one command before any file
+        moves, files go over `workers` concurrent sftp sessions on this
+        transport, and the mode is set on all of them with one more command.
+        """
+        start = time.time()
         print("upload folder %s ======> %s" % (local_folder, remote_folder))
         local_folder_files = list(get_local_folder_files(local_folder))
 
@@ -126,22 +535,139 @@ class SSHConnection:
             for file in remote_files_relativity
         ]
 
-        for ind, local_file in enumerate(local_folder_files):
-            remote_file = remote_files[ind]
-            print(
-                "\t%s======>%s %d/%d"
-                % (local_file, remote_file, ind, len(local_folder_files))
-            )
-            self.upload(local_file, remote_file)
-        print("upload folder %s ======> %s Done!" % (local_folder, remote_folder))
+        total = len(local_folder_files)
+        self.upload_files(zip(local_folder_files, remote_files), workers, mode)
+        elapsed = time.time() - start
+        print(
+            "upload folder %s ======> %s Done! %d files in %.2fs"
+            % (local_folder, remote_folder, total, elapsed)
+        )
+        return elapsed
+
+    def map_sftp(self, func, items, workers=1):
+        """
+        Call func(sftp_client, item) for every item and return the results.
+
+        With more than one worker each thread opens its own sftp session on
+        this transport, so the requests of several files are in flight at once.
+        """
+        items = list(items)
+        if workers <= 1:
+            return [func(self.sFTPClient, item) for item in items]
+
+        local_sftp = threading.local()
+        sftp_clients = []
+        lock = threading.Lock()
+
+        def call(item):
+            sftp = getattr(local_sftp, "client", None)
+            if sftp is None:
+                sftp = local_sftp.client = paramiko.SFTPClient.from_transport(self.transport)
+                with lock:
+                    sftp_clients.append(sftp)
+            return func(sftp, item)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(call, items))
+        finally:
+            for sftp in sftp_clients:
+                sftp.close()
+
+    def upload_files(self, pairs, workers=1, mode=0o755):
+        """
+        Upload (local_path, remote_path) pairs: one command creates the remote
+        folders, `workers` sftp sessions move the files, one command sets mode.
+        """
+        pairs = list(pairs)
+        total = len(pairs)
+        self.mkdir_trees(set(os.path.dirname(remote) for _, remote in pairs))
+
+        def put(sftp, item):
+            ind, (local_file, remote_file) = item
+            print("\t%s======>%s %d/%d" % (local_file, remote_file, ind, total))
+            start, size = time.time(), os.path.getsize(local_file)
+            with self.progress(remote_file, size) as progress:
+                sftp.put(local_file, remote_file, callback=progress.callback, confirm=False)
+            if self.metrics is not None:
+                self._record_transfer("upload", start, size)
+
+        try:
+            self.map_sftp(put, enumerate(pairs), workers)
+        finally:
+            for _, remote in pairs:
+                self.forget_stat(remote)
+        if mode:
+            self.chmod_many([remote for _, remote in pairs], mode)
+
+    def download_files(self, pairs, workers=1):
+        """
+        Download (remote_path, local_path) pairs over `workers` sftp sessions.
+        """
+        pairs = list(pairs)
+        total = len(pairs)
+        for local_folder in set(os.path.dirname(local) for _, local in pairs):
+            if local_folder and not os.path.exists(local_folder):
+                os.makedirs(local_folder)
+
+        def get(sftp, item):
+            ind, (remote_file, local_file) = item
+            print("\t%s======>%s %d/%d" % (remote_file, local_file, ind, total))
+            start = time.time()
+            with self.progress(remote_file) as progress:
+                sftp.get(remote_file, local_file, callback=progress.callback)
+            if self.metrics is not None:
+                self._record_transfer("download", start, os.path.getsize(local_file))
+
+        self.map_sftp(get, enumerate(pairs), workers)
+
+    def upload_large(self, local_path, remote_path, chunk_size=transfer.CHUNK_SIZE, workers=4, check=True):
+        """
+        Resumable upload of one big file in parallel ranges, see easyssh.transfer.upload_large.
+        """
+        return transfer.upload_large(
+            self, local_path, remote_path, chunk_size=chunk_size, workers=workers, check=check
+        )
+
+    def download_large(self, remote_path, local_path, chunk_size=transfer.CHUNK_SIZE, workers=4, check=True):
+        """
+        Resumable download of one big file in parallel ranges, see easyssh.transfer.download_large.
+        """
+        return transfer.download_large(
+            self, remote_path, local_path, chunk_size=chunk_size, workers=workers, check=check
+        )
+
+    def upload_folder_tar(self, local_folder, remote_folder, compression="gzip"):
+        """
+        Stream local_folder as one compressed tar into remote_folder, see easyssh.transfer.upload_folder_tar.
+        """
+        return transfer.upload_folder_tar(self, local_folder, remote_folder, compression)
+
+    def download_folder_tar(self, remote_folder, local_folder, compression="gzip"):
+        """
+        Stream remote_folder as one compressed tar into local_folder, see easyssh.transfer.download_folder_tar.
+        """
+        return transfer.download_folder_tar(self, remote_folder, local_folder, compression)
+
+    def copy_to(self, targets, remote_path, target_path=None, tree=False, ssh_options="-o BatchMode=yes"):
+        """
+        Copy remote_path on this host to other SSHConnections without local staging, see easyssh.transfer.copy_remote.
+        """
+        return transfer.copy_remote(
+            self, remote_path, targets, target_path, tree=tree, ssh_options=ssh_options
+        )
 
     def download(self, remote_path, local_path):
-        self.sFTPClient.get(remote_path, local_path, callback=callback)
+        start = time.time()
+        with self.progress(remote_path) as progress:
+            self.sFTPClient.get(remote_path, local_path, callback=progress.callback)
+        if self.metrics is not None:
+            self._record_transfer("download", start, os.path.getsize(local_path))
 
-    def download_folder(self, remote_folder, local_folder):
+    def download_folder(self, remote_folder, local_folder, use_find=False, workers=1):
 
         print("download folder %s ======> %s" % (remote_folder, local_folder))
-        remote_folder_files = self.get_folder_files(remote_folder)
+        remote_folder_files = self.get_folder_files(remote_folder, use_find)
 
         remote_folder_len = len(remote_folder)
         remote_files_relativity = [
@@ -155,113 +681,313 @@ class SSHConnection:
             for file in remote_files_relativity
         ]
 
-        for ind, remote_file in enumerate(remote_folder_files):
-            head, _ = os.path.split(remote_file)
-            local_file = local_files[ind]
-            if not os.path.exists(head):
-                os.makedirs(head)
-            print(
-                "\t%s======>%s %d/%d"
-                % (remote_file, local_file, ind, len(remote_folder_files))
-            )
-            self.download(remote_file, local_file)
+        self.download_files(zip(remote_folder_files, local_files), workers)
         print("download folder %s ======> %s Done!" % (remote_folder, local_folder))
 
+    def sync_folder(
+        self,
+        local_folder,
+        remote_folder,
+        direction="upload",
+        checksum=False,
+        delete=False,
+        dry_run=False,
+        workers=1,
+        mode=0o755,
+    ):
+        """
+        Transfer only new or changed files between local_folder and
+        remote_folder and return a SyncReport, see easyssh.sync.sync_folder.
+        """
+        return sync.sync_folder(
+            self,
+            local_folder,
+            remote_folder,
+            direction=direction,
+            checksum=checksum,
+            delete=delete,
+            dry_run=dry_run,
+            workers=workers,
+            mode=mode,
+        )
+
+    def exec_script(self, commands, stop_on_error=True, timeout=3600, environment=None):
+        """
+        Run commands in order in one remote shell, see easyssh.batch.exec_script.
+        """
+        return batch.exec_script(self, commands, stop_on_error, timeout, environment)
+
+    def facts(self, refresh=False):
+        facts = None if refresh else self.fact_cache.get(self)
+        if facts is None:
+            facts = Facts.gather(self)
+            self.fact_cache.put(self, facts)
+        return facts
+
+    def invalidate_facts(self):
+        self.fact_cache.invalidate(self)
+
+    def ensure_block(self, path, marker, content):
+        """
+        Make the remote file hold content between two marker lines, see easyssh.edit.ensure_block.
+        """
+        return edit.ensure_block(self, path, marker, content)
+
+    def ensure_line(self, path, line, match=None):
+        """
+        Make the remote file hold line, see easyssh.edit.ensure_line.
+        """
+        return edit.ensure_line(self, path, line, match)
+
+    def grep(self, path, pattern, fixed=False, max_count=None):
+        return edit.grep(self, path, pattern, fixed, max_count)
+
+    def contains(self, path, pattern, fixed=True):
+        return edit.contains(self, path, pattern, fixed)
+
     def rename(self, old_path, new_path):
         self.sFTPClient.rename(old_path, new_path)
+        self.forget_stat(old_path, tree=True)
+        self.forget_stat(new_path, tree=True)
 
     def chmod(self, path, mode=0o755):
         self.sFTPClient.chmod(path, mode)
+        self.forget_stat(path)
 
     def mkdir(self, path, mode=0o755):
         self.sFTPClient.mkdir(path, mode=mode)
-        return self.exists(path)
+        self.forget_stat(path)
+        # mkdir raises when it fails
+        return True
 
     def mkdir_tree(self, path, mode=0o755):
         if not self.exists(path):
             self.exec_command("mkdir -p %s" % path)
+            self.forget_stat(path, parents=True)
         if mode:
-            self.sFTPClient.chmod(path, mode)
+            self.chmod(path, mode)
         return self.exists(path)
 
+    def mkdir_trees(self, paths):
+        """
+        Create every path in paths, with parents, using a single remote command.
+        """
+        paths = [path for path in paths if path]
+        if paths:
+            result = self.exec_command_result(
+                "xargs -0 mkdir -p --", input="\0".join(paths).encode("utf-8")
+            )
+            # forgotten either way, some of them may have been created
+            for path in paths:
+                self.forget_stat(path, parents=True)
+            if not result.ok:
+                raise IOError(result.stderr.strip() or "mkdir exited with %s" % result.exit_status)
+
+    def chmod_many(self, paths, mode=0o755):
+        paths = list(paths)
+        if paths:
+            result = self.exec_command_result(
+                "xargs -0 chmod %o --" % mode, input="\0".join(paths).encode("utf-8")
+            )
+            for path in paths:
+                self.forget_stat(path)
+            if not result.ok:
+                raise IOError(result.stderr.strip() or "chmod exited with %s" % result.exit_status)
+
     def remove(self, path):
-        if self.exists(path):
+        try:
             self.sFTPClient.remove(path)
-        return not self.exists(path)
+        except (OSError, IOError):
+            return not self.exists(path)
+        self.forget_stat(path, missing=True)
+        return True
 
     def rmdir(self, path):
-
-        if self.exists(path):
+        try:
             self.sFTPClient.rmdir(path)
-        return not self.exists(path)
+        except (OSError, IOError):
+            return not self.exists(path)
+        self.forget_stat(path, tree=True, missing=True)
+        return True
 
     def rm_tree(self, path):
         self.exec_command("rm -rf %s" % path)
+        self.forget_stat(path, tree=True, missing=True)
 
     def chdir(self, path):
         self.sFTPClient.chdir(path)
 
     def symlink(self, source, dest):
         self.sFTPClient.symlink(source, dest)
+        self.forget_stat(dest)
 
     def unlink(self, linkname):
         self.remove(linkname)
 
-    def open(self, filename, mode="r", buffer_size=-1):
-
-        return self.sFTPClient.open(filename, mode, buffer_size)
+    def open(self, filename, mode="r", buffer_size=-1, read_ahead=remotefile.READ_AHEAD, workers=2):
+        """
+        Open a remote file as a RemoteFile: sequential reads are fetched
+        ahead in read_ahead byte windows over workers extra sftp sessions
+        (0 turns that off), writes are pipelined.
+        """
+        return remotefile.RemoteFile(self, filename, mode, buffer_size, read_ahead, workers)
 
     def chown(self, path, uid, gid):
-        return self.sFTPClient.chown(path, uid, gid)
+        result = self.sFTPClient.chown(path, uid, gid)
+        self.forget_stat(path)
+        return result
 
     def listdir(self, path="."):
         return self.sFTPClient.listdir(path)
 
     def listdir_attr(self, path="."):
-        return self.sFTPClient.list_attr(path)
-
-    def get_folder_files(self, folder):
-        result_list = []
-
-        def get_file(folder_name):
-            for base_path in self.listdir(folder_name):
-                abs_path = standardize_path(os.path.join(folder_name, base_path))
-                if self.isdir(abs_path):
-                    get_file(abs_path)
-                elif self.isfile(abs_path):
-                    result_list.append(abs_path)
-                elif self.islink(abs_path):
-                    result_list.append(abs_path)
-
-        get_file(folder)
-        return result_list
-
-    def get_folder_files_size(self, folder):
-        result_list = []
-
-        def get_file(folder_name):
-            for base_path in self.listdir(folder_name):
-                abs_path = standardize_path(os.path.join(folder_name, base_path))
-                if self.isdir(abs_path):
-                    get_file(abs_path)
-                elif self.isfile(abs_path):
-                    result_list.append(self.stat(abs_path).st_size)
-                elif self.islink(abs_path):
-                    result_list.append(self.stat(abs_path).st_size)
+        return self.sFTPClient.listdir_attr(path)
+
+    def walk_folder(self, folder, use_find=False):
+        """
+        Yield a FileRecord(path, size, mtime, mode) for every file under folder.
+
+        Types and sizes come from the attributes the directory listing already
+        returns, so only symlinks cost an extra stat. With use_find the whole
+        tree is listed by one `find -printf` on the server instead, falling
+        back to the sftp listing when the server's find can not do it.
+        """
+        if use_find:
+            found = False
+            try:
+                for record in self._find_folder_files(folder):
+                    found = True
+                    yield record
+                return
+            except (OSError, IOError):
+                if found:
+                    raise
+
+        folders = [folder]
+        while folders:
+            folder_name = folders.pop()
+            links = []
+            for attr in self.sFTPClient.listdir_iter(folder_name):
+                abs_path = standardize_path(os.path.join(folder_name, attr.filename))
+                if stat.S_ISLNK(attr.st_mode):
+                    # stat them once the pipelined listing is drained
+                    links.append((abs_path, attr))
+                elif stat.S_ISDIR(attr.st_mode):
+                    folders.append(abs_path)
+                elif stat.S_ISREG(attr.st_mode):
+                    yield FileRecord(abs_path, attr.st_size, attr.st_mtime, attr.st_mode)
+            for abs_path, attr in links:
+                try:
+                    attr = self.stat(abs_path)
+                except (OSError, IOError):
+                    # dangling link
+                    pass
+                if stat.S_ISDIR(attr.st_mode):
+                    folders.append(abs_path)
                 else:
-                    continue
+                    yield FileRecord(abs_path, attr.st_size, attr.st_mtime, attr.st_mode)
+
+    def _find_folder_files(self, folder):
+        file_types = {"f": stat.S_IFREG, "l": stat.S_IFLNK}
+        command = (
+            "find -L %s -mindepth 1 \\( -type f -o -type l \\) "
+            "-printf '%%y\\0%%p\\0%%s\\0%%T@\\0%%m\\0'" % shell_quote(folder)
+        )
+        stdin, stdout, stderr = self.sshClient.exec_command(command)
+        buffer = b""
+        while True:
+            chunk = stdout.read(65536)
+            if not chunk:
+                break
+            fields = (buffer + chunk).split(b"\0")
+            # the last field is always unterminated
+            complete = (len(fields) - 1) // 5 * 5
+            buffer = b"\0".join(fields[complete:])
+            for i in range(0, complete, 5):
+                file_type, path, size, mtime, mode = fields[i : i + 5]
+                yield FileRecord(
+                    to_str(path),
+                    int(size),
+                    int(float(mtime)),
+                    file_types[to_str(file_type)] | int(mode, 8),
+                )
+        exit_status = stdout.channel.recv_exit_status()
+        if exit_status != 0:
+            raise IOError(
+                "find exited with %d: %s" % (exit_status, to_str(stderr.read()).strip())
+            )
 
-        get_file(folder)
-        return sum(result_list)
-        # return self.exec_command("du -sh /{folder}".format(folder=folder)).strip()
+    def get_folder_files(self, folder, use_find=False):
+        return [record.path for record in self.walk_folder(folder, use_find)]
 
-    def stat(self, path):
+    def get_folder_files_size(self, folder, use_find=False):
+        return sum(record.size for record in self.walk_folder(folder, use_find))
 
-        return self.sFTPClient.stat(path)
+    def stat(self, path):
+        return self._cached_stat("stat", path, self.sFTPClient.stat)
 
     def lstat(self, path):
+        return self._cached_stat("lstat", path, self.sFTPClient.lstat)
+
+    def _timed(self, name, func):
+        def timed(*args):
+            start = time.time()
+            try:
+                return func(*args)
+            finally:
+                self.metrics.phase(name, start, time.time(), host=self.host)
+                self.metrics.increment("round_trips", host=self.host)
+
+        return timed
+
+    def _record_transfer(self, direction, start, size):
+        self.metrics.phase("sftp." + direction, start, time.time(), host=self.host)
+        self.metrics.increment(
+            "sftp.bytes_sent" if direction == "upload" else "sftp.bytes_received",
+            size,
+            host=self.host,
+        )
+
+    def _cached_stat(self, kind, path, func):
+        if self.metrics is not None:
+            func = self._timed("sftp." + kind, func)
+        if self.stat_cache is None:
+            return func(path)
+        attr = self.stat_cache.get(kind, path)
+        if attr is MISSING:
+            raise IOError(errno.ENOENT, "No such file", path)
+        if attr is not None:
+            return attr
+        try:
+            attr = func(path)
+        except IOError as e:
+            if e.errno == errno.ENOENT:
+                self.stat_cache.put(kind, path, MISSING)
+            raise
+        self.stat_cache.put(kind, path, attr)
+        return attr
+
+    def prefetch_stat(self, folder):
+        """
+        Fill the stat cache from one listing of folder.
+        """
+        attrs = self.listdir_attr(folder)
+        if self.stat_cache is not None:
+            self.stat_cache.put_listing(folder, attrs)
+        return attrs
 
-        return self.sFTPClient.lstat(path)
+    def forget_stat(self, path, tree=False, missing=False, parents=False):
+        """
+        Drop cached stat results for path (and below it with tree); with
+        missing remember that path no longer exists, with parents also forget
+        the folders above it, which mkdir -p may have created.
+        """
+        if self.stat_cache is None:
+            return
+        self.stat_cache.invalidate(path, tree, parents)
+        if missing:
+            self.stat_cache.put("stat", path, MISSING)
+            self.stat_cache.put("lstat", path, MISSING)
 
     def exists(self, path):
         try:
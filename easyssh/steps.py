@@ -0,0 +1,266 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from easyssh.cache import HostStore
+from easyssh.ssh import SSHConnection
+
+CACHED = "cached"
+OK = "ok"
+CHANGED = "changed"
+PENDING = "pending"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class Step:
+    """
+    One piece of desired state: check is a cheap shell command that exits 0
+    when the host is already in that state, apply brings it there (a
+    command, a list of commands run in one shell, or func(ssh)).
+
+    fingerprint tells versions of a step apart; by default it comes from
+    the name, check and apply, so editing a step makes it run again. Pass
+    your own when apply is a function or depends on outside data.
+    """
+
+    def __init__(self, name, check, apply, fingerprint=None):
+        self.name = name
+        self.check = check
+        self.apply = apply
+        if fingerprint is None:
+            action = getattr(apply, "__qualname__", None) or repr(apply)
+            fingerprint = hashlib.md5(
+                json.dumps([name, check, action]).encode("utf-8")
+            ).hexdigest()
+        self.fingerprint = fingerprint
+
+    def __repr__(self):
+        return "<Step %s>" % self.name
+
+
+class StepStore(HostStore):
+    """
+    Which steps each host satisfied and when, in memory and, with path, as
+    one json file per host in that folder so later runs can skip them.
+    """
+
+    def get(self, ssh):
+        """
+        {step name: {"fingerprint": ..., "at": timestamp}} for the host of ssh.
+        """
+        return dict(HostStore.get(self, ssh) or {})
+
+    def put(self, ssh, records):
+        HostStore.put(self, ssh, dict(records))
+
+
+default_step_store = StepStore()
+
+
+class StepReport:
+    """
+    What StepEngine.run did on one host: statuses holds (step name, status)
+    in step order, status being cached (skipped on the local record),
+    ok (check passed), changed (applied, check passes now), pending (dry
+    run, would apply), failed or skipped (after a failure). errors maps
+    failed step names to their reason.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.statuses = []
+        self.errors = {}
+        self.contacted = False
+        self.elapsed = 0.0
+
+    def _names(self, status):
+        return [name for name, value in self.statuses if value == status]
+
+    @property
+    def changed(self):
+        return self._names(CHANGED)
+
+    @property
+    def failed(self):
+        return self._names(FAILED)
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def __str__(self):
+        lines = ["%-8s %s" % (status, name) for name, status in self.statuses]
+        for name, error in self.errors.items():
+            lines.append("%s: %s" % (name, error))
+        lines.append(
+            "%s: %d changed, %d failed%s in %.2fs"
+            % (
+                self.host,
+                len(self.changed),
+                len(self.failed),
+                "" if self.contacted else ", not contacted",
+                self.elapsed,
+            )
+        )
+        return "\n".join(lines)
+
+
+class StepEngine:
+    """
+    Bring hosts to the state a list of Steps describes, doing as little as
+    possible:
+
+    1. steps this host satisfied within ttl seconds, with the same
+       fingerprint, are skipped from the local record without connecting;
+    2. the checks of all other steps run in one remote shell, one round trip;
+    3. only steps whose check failed are applied, in order, and checked
+       again; the first failure stops the rest unless stop_on_error=False.
+
+    For example:
+
+    engine = StepEngine([
+        Step("sshd allow", "grep -qx 'sshd: ALL' /etc/hosts.allow",
+             "echo 'sshd: ALL' >> /etc/hosts.allow"),
+        Step("docker", "rpm -q docker", ["yum -y install docker", "systemctl restart docker"]),
+    ], store=StepStore("/var/cache/easyssh/steps"), ttl=3600)
+    for host, report in engine.run_fleet(servers):
+        print(report)
+    """
+
+    def __init__(self, steps, store=None, ttl=3600):
+        self.steps = list(steps)
+        names = [step.name for step in self.steps]
+        if len(set(names)) != len(names):
+            raise ValueError("step names must be unique")
+        self.store = store or default_step_store
+        self.ttl = ttl
+
+    def run(self, ssh, dry_run=False, force=False, stop_on_error=True):
+        """
+        Converge the host of ssh and return a StepReport. ssh is connected
+        only when some step is not cached (and disconnected again if this
+        call connected it). force ignores the local records.
+        """
+        start = time.time()
+        report = StepReport(ssh.host)
+        records = {} if force else self.store.get(ssh)
+        now = time.time()
+        todo = []
+        for step in self.steps:
+            record = records.get(step.name)
+            if (
+                record is not None
+                and record.get("fingerprint") == step.fingerprint
+                and now - record.get("at", 0) < self.ttl
+            ):
+                report.statuses.append((step.name, CACHED))
+            else:
+                todo.append(step)
+        if not todo:
+            report.elapsed = time.time() - start
+            return report
+
+        report.contacted = True
+        connected_here = ssh.transport is None or not ssh.transport.is_active()
+        if connected_here:
+            ssh.connect()
+        try:
+            self._converge(ssh, todo, records, report, dry_run, stop_on_error)
+        finally:
+            if connected_here:
+                ssh.disconnect()
+        # keep the step order in the report
+        order = dict((step.name, index) for index, step in enumerate(self.steps))
+        report.statuses.sort(key=lambda item: order[item[0]])
+        report.elapsed = time.time() - start
+        return report
+
+    @staticmethod
+    def _check_all(ssh, steps):
+        """
+        Exit status of every check, from one remote shell; each check runs
+        in its own subshell so it cannot exit or cd for the others.
+        """
+        results = ssh.exec_script(
+            ["( %s ) >/dev/null 2>&1" % step.check for step in steps], stop_on_error=False
+        )
+        statuses = [result.exit_status for result in results]
+        return statuses + [None] * (len(steps) - len(statuses))
+
+    def _converge(self, ssh, steps, records, report, dry_run, stop_on_error):
+        changed = False
+        failed = False
+        for step, status in zip(steps, self._check_all(ssh, steps)):
+            if failed:
+                report.statuses.append((step.name, SKIPPED))
+                continue
+            if status == 0:
+                report.statuses.append((step.name, OK))
+                records[step.name] = {"fingerprint": step.fingerprint, "at": time.time()}
+                continue
+            if dry_run:
+                report.statuses.append((step.name, PENDING))
+                continue
+            error = self._apply(ssh, step)
+            changed = True
+            if error is None and self._check_all(ssh, [step])[0] != 0:
+                error = "check still fails after apply"
+            if error is None:
+                report.statuses.append((step.name, CHANGED))
+                records[step.name] = {"fingerprint": step.fingerprint, "at": time.time()}
+            else:
+                report.statuses.append((step.name, FAILED))
+                report.errors[step.name] = error
+                records.pop(step.name, None)
+                failed = stop_on_error
+        if changed:
+            ssh.invalidate_facts()
+        self.store.put(ssh, records)
+
+    @staticmethod
+    def _apply(ssh, step):
+        try:
+            if callable(step.apply):
+                step.apply(ssh)
+                return None
+            commands = [step.apply] if isinstance(step.apply, str) else step.apply
+            for result in ssh.exec_script(commands):
+                if not result.ok:
+                    return "%r exited with %d: %s" % (
+                        result.command,
+                        result.exit_status,
+                        result.stderr.strip(),
+                    )
+        except Exception as e:
+            return repr(e)
+        return None
+
+    def run_fleet(self, servers, workers=32, dry_run=False, force=False, stop_on_error=True):
+        """
+        Run on every server (dicts as given to SSHConnection), workers hosts
+        at a time, and yield (host, StepReport) as each host finishes. Hosts
+        whose steps are all cached are never connected to.
+        """
+
+        def job(server):
+            ssh = SSHConnection(**server)
+            try:
+                return ssh.host, self.run(ssh, dry_run, force, stop_on_error)
+            except Exception as e:
+                report = StepReport(ssh.host)
+                report.contacted = True
+                # could not connect: the first step fails, the rest never ran
+                report.statuses = [(step.name, SKIPPED) for step in self.steps]
+                report.statuses[0] = (self.steps[0].name, FAILED)
+                report.errors[self.steps[0].name] = repr(e)
+                return ssh.host, report
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in as_completed([executor.submit(job, server) for server in servers]):
+                yield future.result()
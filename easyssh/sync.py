@@ -0,0 +1,226 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import errno
+import hashlib
+import os
+import time
+
+from easyssh.utils import *
+
+
+class SyncReport:
+    """
+    What sync_folder changed, or would change when it ran as a dry run.
+
+    added, changed, deleted and unchanged hold paths relative to the synced
+    folders; bytes is the amount of data that was (or would be) transferred.
+    """
+
+    def __init__(self, direction, dry_run=False):
+        self.direction = direction
+        self.dry_run = dry_run
+        self.added = []
+        self.changed = []
+        self.deleted = []
+        self.unchanged = []
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        lines = ["+ %s" % path for path in self.added]
+        lines += ["~ %s" % path for path in self.changed]
+        lines += ["- %s" % path for path in self.deleted]
+        lines.append(
+            "%s%s: %d added, %d changed, %d deleted, %d unchanged, %d bytes in %.2fs"
+            % (
+                "(dry run) " if self.dry_run else "",
+                self.direction,
+                len(self.added),
+                len(self.changed),
+                len(self.deleted),
+                len(self.unchanged),
+                self.bytes,
+                self.elapsed,
+            )
+        )
+        return "\n".join(lines)
+
+
+def _raise(error):
+    raise error
+
+
+def local_manifest(folder, missing_ok=False):
+    """
+    {relative path: (size, mtime)} for every file under the local folder.
+
+    With missing_ok a folder that does not exist is empty; any other
+    failure to list it, or a part of it, raises.
+    """
+    manifest = {}
+    if missing_ok and not os.path.lexists(folder):
+        return manifest
+    if not os.path.isdir(folder):
+        raise IOError(errno.ENOTDIR if os.path.exists(folder) else errno.ENOENT, "not a folder", folder)
+    for root, _, files in os.walk(folder, onerror=_raise):
+        for name in files:
+            file = standardize_path(os.path.join(root, name))
+            st = os.stat(file)
+            manifest[file[len(folder) + 1 :]] = (st.st_size, int(st.st_mtime))
+    return manifest
+
+
+def remote_manifest(ssh, folder, missing_ok=False):
+    """
+    {relative path: (size, mtime)} for every file under the remote folder,
+    read with one server side find where possible.
+
+    With missing_ok a folder that does not exist is empty; any other
+    failure to list it, or a part of it, raises.
+    """
+    try:
+        ssh.stat(folder)
+    except (OSError, IOError) as e:
+        if missing_ok and getattr(e, "errno", None) == errno.ENOENT:
+            return {}
+        raise
+    records = list(ssh.walk_folder(folder, use_find=True))
+    return dict(
+        (record.path[len(folder) + 1 :], (record.size, record.mtime))
+        for record in records
+    )
+
+
+def local_checksums(folder, paths):
+    checksums = {}
+    for path in paths:
+        md5 = hashlib.md5()
+        with open(os.path.join(folder, path), "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(chunk)
+        checksums[path] = md5.hexdigest()
+    return checksums
+
+
+def remote_checksums(ssh, folder, paths):
+    paths = list(paths)
+    if not paths:
+        return {}
+    result = ssh.exec_command_result(
+        "cd %s && xargs -0 md5sum -z --" % shell_quote(folder),
+        input="\0".join(paths).encode("utf-8"),
+    )
+    checksums = {}
+    for line in result.stdout.split("\0"):
+        if line:
+            checksum, path = line.split("  ", 1)
+            checksums[path] = checksum
+    return checksums
+
+
+def sync_folder(
+    ssh,
+    local_folder,
+    remote_folder,
+    direction="upload",
+    checksum=False,
+    delete=False,
+    dry_run=False,
+    workers=1,
+    mode=0o755,
+):
+    """
+    Make the destination folder match the source folder, transferring only
+    files that are new or changed.
+
+    direction is "upload" (local -> remote) or "download" (remote -> local).
+    A file is changed when its size or mtime differs, or with checksum=True
+    when its size or md5 differs. delete=True also removes destination files
+    that are missing from the source. dry_run=True only builds the report.
+    Transferred files get the source mtime so the next run sees them unchanged.
+    IOError is raised when a remote delete or mtime update fails.
+    """
+    if direction not in ("upload", "download"):
+        raise ValueError("direction must be 'upload' or 'download', not %r" % direction)
+    start = time.time()
+    local_folder = standardize_path(local_folder).rstrip("/")
+    remote_folder = standardize_path(remote_folder).rstrip("/")
+    report = SyncReport(direction, dry_run)
+
+    # only the destination may be missing, a source that can not be listed
+    # must not look empty or delete would remove everything
+    local = local_manifest(local_folder, missing_ok=direction == "download")
+    remote = remote_manifest(ssh, remote_folder, missing_ok=direction == "upload")
+    source, destination = (local, remote) if direction == "upload" else (remote, local)
+
+    same_size = [
+        path
+        for path, (size, mtime) in source.items()
+        if path in destination and destination[path][0] == size
+    ]
+    if checksum:
+        local_sums = local_checksums(local_folder, same_size)
+        remote_sums = remote_checksums(ssh, remote_folder, same_size)
+        unchanged = set(
+            path for path in same_size if local_sums[path] == remote_sums.get(path)
+        )
+    else:
+        unchanged = set(
+            path for path in same_size if source[path][1] == destination[path][1]
+        )
+
+    for path in sorted(source):
+        if path not in destination:
+            report.added.append(path)
+        elif path in unchanged:
+            report.unchanged.append(path)
+        else:
+            report.changed.append(path)
+    if delete:
+        report.deleted = sorted(path for path in destination if path not in source)
+    transfer = report.added + report.changed
+    report.bytes = sum(source[path][0] for path in transfer)
+
+    if not dry_run:
+        pairs = [
+            (
+                "%s/%s" % (local_folder, path),
+                "%s/%s" % (remote_folder, path),
+            )
+            for path in transfer
+        ]
+        if direction == "upload":
+            ssh.upload_files(pairs, workers, mode)
+            if pairs:
+                # every file is touched, the exit status tells whether all were
+                script = "".join(
+                    "touch -m -d @%d -- %s || failed=1\n" % (local[path][1], shell_quote(remote_path))
+                    for path, (_, remote_path) in zip(transfer, pairs)
+                )
+                result = ssh.exec_command_result(
+                    "sh -s", input=(script + 'exit "${failed:-0}"\n').encode("utf-8")
+                )
+                if not result.ok:
+                    raise IOError("setting mtimes in %s failed: %s" % (remote_folder, result.stderr.strip()))
+            if report.deleted:
+                deleted = ["%s/%s" % (remote_folder, path) for path in report.deleted]
+                result = ssh.exec_command_result(
+                    "xargs -0 rm -f --", input="\0".join(deleted).encode("utf-8")
+                )
+                for path in deleted:
+                    ssh.forget_stat(path, missing=result.ok)
+                if not result.ok:
+                    raise IOError("deleting from %s failed: %s" % (remote_folder, result.stderr.strip()))
+        else:
+            ssh.download_files(
+                [(remote_path, local_path) for local_path, remote_path in pairs], workers
+            )
+            for path, (local_path, _) in zip(transfer, pairs):
+                os.utime(local_path, (remote[path][1], remote[path][1]))
+            for path in report.deleted:
+                os.remove("%s/%s" % (local_folder, path))
+
+    report.elapsed = time.time() - start
+    return report
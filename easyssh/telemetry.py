@@ -0,0 +1,285 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import json
+import logging
+import sys
+import threading
+import time
+
+
+def format_bytes(count):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(count) < 1024:
+            return "%.1f%s" % (count, unit)
+        count /= 1024
+    return "%.1fTB" % count
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return "%d:%02d:%02d" % (hours, minutes, seconds)
+    return "%02d:%02d" % (minutes, seconds)
+
+
+class TerminalSink:
+    """
+    One status line rewritten in place, shared by all running transfers.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self._width = 0
+
+    def emit(self, snapshot):
+        line = "%s/%s %s/s eta %s, %d active, %d done, %d failed" % (
+            format_bytes(snapshot["bytes"]),
+            format_bytes(snapshot["total"]),
+            format_bytes(snapshot["rate"]),
+            format_seconds(snapshot["eta"]),
+            snapshot["active"],
+            snapshot["completed"],
+            snapshot["failed"],
+        )
+        self.stream.write("\r" + line.ljust(self._width))
+        self._width = len(line)
+        if snapshot["final"]:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+class LoggingSink:
+    """
+    One log record per report, with the snapshot in the record's extra data.
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("easyssh.telemetry")
+        self.level = level
+
+    def emit(self, snapshot):
+        self.logger.log(
+            self.level,
+            "transferred %s of %s at %s/s, eta %s, %d active, %d done, %d failed",
+            format_bytes(snapshot["bytes"]),
+            format_bytes(snapshot["total"]),
+            format_bytes(snapshot["rate"]),
+            format_seconds(snapshot["eta"]),
+            snapshot["active"],
+            snapshot["completed"],
+            snapshot["failed"],
+            extra={"telemetry": snapshot},
+        )
+
+
+class JsonSink:
+    """
+    One json object per line per report, to a file object or a path.
+    """
+
+    def __init__(self, stream):
+        if isinstance(stream, str):
+            stream = open(stream, "a")
+        self.stream = stream
+
+    def emit(self, snapshot):
+        self.stream.write(json.dumps(snapshot, sort_keys=True) + "\n")
+        self.stream.flush()
+
+
+class Transfer:
+    """
+    Progress of one file. callback(current, total) matches the sftp
+    put/get callback, add(count) is for transfers counting themselves.
+    Both only store a number and, at most once per interval, let the
+    Telemetry report.
+    """
+
+    def __init__(self, telemetry, host, name, total):
+        self.telemetry = telemetry
+        self.host = host
+        self.name = name
+        self.total = total or 0
+        self.done = 0
+        self._lock = threading.Lock()
+
+    def callback(self, current, total):
+        self.done = current
+        self.total = total
+        self.telemetry.tick()
+
+    def add(self, count):
+        with self._lock:
+            self.done += count
+        self.telemetry.tick()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.telemetry.finish(self, exc_type is None)
+
+
+class Telemetry:
+    """
+    Aggregates the progress of any number of concurrent transfers, over any
+    number of connections, and reports at most once every interval seconds
+    to its sinks (TerminalSink, LoggingSink, JsonSink or anything with an
+    emit(snapshot) method). Without sinks it only counts.
+
+    A snapshot is a dict with bytes, total, rate (bytes/s), eta (seconds),
+    active, completed and failed, and the same counters per host in hosts.
+
+    For example:
+
+    telemetry = Telemetry([TerminalSink()])
+    ssh = SSHConnection(telemetry=telemetry, **server)
+    ssh.connect()
+    ssh.upload_folder("/data/release", "/opt/release", workers=8)
+    telemetry.close()
+    """
+
+    def __init__(self, sinks=None, interval=1.0):
+        self.sinks = list(sinks or [])
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._emit_lock = threading.Lock()
+        self._active = set()
+        self._hosts = {}
+        # source -> latest snapshot from another process, see merge
+        self._remote = {}
+        self._next_emit = 0
+        self._last = None
+        self._rate = 0.0
+
+    def _host(self, host):
+        counters = self._hosts.get(host)
+        if counters is None:
+            counters = self._hosts[host] = {
+                "bytes": 0,
+                "total": 0,
+                "active": 0,
+                "completed": 0,
+                "failed": 0,
+            }
+        return counters
+
+    def transfer(self, host, name, total):
+        transfer = Transfer(self, host, name, total)
+        with self._lock:
+            self._active.add(transfer)
+            self._host(host)["active"] += 1
+        return transfer
+
+    def finish(self, transfer, ok=True):
+        with self._lock:
+            self._active.discard(transfer)
+            counters = self._host(transfer.host)
+            counters["active"] -= 1
+            counters["bytes"] += transfer.done
+            counters["total"] += transfer.total
+            counters["completed" if ok else "failed"] += 1
+        self.tick()
+
+    def merge(self, source, snapshot):
+        """
+        Count the transfers of a snapshot taken by a Telemetry in another
+        process (easyssh.procfleet sends them); the latest one per source
+        replaces the earlier ones, a final one is added to the totals for
+        good.
+        """
+        with self._lock:
+            if snapshot["final"]:
+                self._remote.pop(source, None)
+                for host, other_counters in snapshot["hosts"].items():
+                    counters = self._host(host)
+                    for name, value in other_counters.items():
+                        counters[name] += value
+            else:
+                self._remote[source] = snapshot
+        self.tick()
+
+    def tick(self):
+        if not self.sinks or time.time() < self._next_emit:
+            return
+        # whoever gets the lock reports, the other threads carry on
+        if self._emit_lock.acquire(False):
+            try:
+                self.emit()
+            finally:
+                self._emit_lock.release()
+
+    def snapshot(self, final=False):
+        now = time.time()
+        with self._lock:
+            hosts = dict((host, dict(counters)) for host, counters in self._hosts.items())
+            active = list(self._active)
+            remote = list(self._remote.values())
+        for transfer in active:
+            counters = hosts[transfer.host]
+            counters["bytes"] += transfer.done
+            counters["total"] += transfer.total
+        for other in remote:
+            for host, other_counters in other["hosts"].items():
+                counters = hosts.setdefault(host, dict.fromkeys(other_counters, 0))
+                for name, value in other_counters.items():
+                    counters[name] += value
+        done = sum(counters["bytes"] for counters in hosts.values())
+        total = sum(counters["total"] for counters in hosts.values())
+
+        if self._last is not None and now > self._last[0]:
+            rate = (done - self._last[1]) / (now - self._last[0])
+            # smooth out bursts of acknowledged writes
+            self._rate = rate if not self._rate else 0.7 * self._rate + 0.3 * rate
+        self._last = (now, done)
+        return {
+            "time": now,
+            "bytes": done,
+            "total": total,
+            "rate": self._rate,
+            "eta": (total - done) / self._rate if self._rate > 0 and total >= done else None,
+            "active": len(active) + sum(other["active"] for other in remote),
+            "completed": sum(counters["completed"] for counters in hosts.values()),
+            "failed": sum(counters["failed"] for counters in hosts.values()),
+            "hosts": hosts,
+            "final": final,
+        }
+
+    def emit(self, final=False):
+        self._next_emit = time.time() + self.interval
+        snapshot = self.snapshot(final)
+        for sink in self.sinks:
+            sink.emit(snapshot)
+
+    def close(self):
+        """
+        Report the final counters once, regardless of the interval.
+        """
+        with self._emit_lock:
+            if self.sinks:
+                self.emit(final=True)
+
+
+class NullTransfer:
+    """
+    Stands in for a Transfer when a connection has no telemetry.
+    """
+
+    callback = None
+
+    def add(self, count):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NULL_TRANSFER = NullTransfer()
@@ -0,0 +1,519 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import hashlib
+import json
+import os
+import stat
+import tarfile
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from easyssh.utils import *
+
+CHUNK_SIZE = 64 * 1024 * 1024
+# bytes requested per pipelined batch while reading a range
+READ_BATCH = 8 * 1024 * 1024
+READ_BLOCK = 32 * 1024
+# bytes read from the source and written to every target per step of copy_remote
+COPY_BLOCK = 1024 * 1024
+
+
+class Journal:
+    """
+    Records which ranges of a large transfer are complete, in a small json
+    file next to the local file, so an interrupted transfer can resume.
+
+    The journal only counts for the same transfer: the same host, port and
+    user, remote path, source size and mtime and chunk size. Anything else
+    starts over.
+    """
+
+    def __init__(self, path, identity):
+        self.path = path
+        self.identity = identity
+        self.done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (IOError, OSError, ValueError):
+                state = {}
+            if state.get("identity") == identity:
+                self.done = set(state.get("done", []))
+
+    def mark(self, index):
+        with self._lock:
+            self.done.add(index)
+            # a temp file of its own, other journals may live in the same folder
+            folder, name = os.path.split(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=folder)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"identity": self.identity, "done": sorted(self.done)}, f)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+    def reset(self):
+        self.done = set()
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def journal_identity(ssh, remote_path, st, chunk_size):
+    return [ssh.host, ssh.port, ssh.username, remote_path, st.st_size, int(st.st_mtime), chunk_size]
+
+
+def journal_file(ssh, local_path, direction):
+    """
+    The default journal of a transfer: one per host, so the same local file
+    can go to (or come from) many hosts at once.
+    """
+    host = "%s_%s_%s" % (ssh.host, ssh.port, ssh.username)
+    return "%s.%s.%s.journal" % (local_path, host.replace("/", "_").replace(":", "_"), direction)
+
+
+def ranges(size, chunk_size):
+    return [
+        (index, offset, min(chunk_size, size - offset))
+        for index, offset in enumerate(range(0, size, chunk_size))
+    ]
+
+
+def read_range(f, offset, end):
+    """
+    Yield the bytes of [offset, end) of an open sftp file in blocks. Every
+    block request of a READ_BATCH is pipelined by readv, and only one batch
+    is requested at a time, so memory stays bounded whatever the size.
+    """
+    for batch in range(offset, end, READ_BATCH):
+        batch_end = min(batch + READ_BATCH, end)
+        blocks = [
+            (block, min(READ_BLOCK, batch_end - block))
+            for block in range(batch, batch_end, READ_BLOCK)
+        ]
+        for data in f.readv(blocks):
+            yield data
+
+
+def local_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def remote_sha256(ssh, path):
+    result = ssh.exec_command_result("sha256sum -- %s" % shell_quote(path))
+    if not result.ok:
+        raise IOError("sha256sum %s failed: %s" % (path, result.stderr.strip()))
+    return result.stdout.split()[0]
+
+
+def verify(ssh, local_path, remote_path):
+    local_hash, remote_hash = local_sha256(local_path), remote_sha256(ssh, remote_path)
+    if local_hash != remote_hash:
+        raise IOError(
+            "checksum mismatch %s (%s) != %s (%s)"
+            % (local_path, local_hash, remote_path, remote_hash)
+        )
+
+
+def upload_large(
+    ssh,
+    local_path,
+    remote_path,
+    chunk_size=CHUNK_SIZE,
+    workers=4,
+    journal_path=None,
+    check=True,
+    mode=0o755,
+):
+    """
+    Upload one big file as chunk_size ranges written concurrently over
+    `workers` sftp sessions, and return the wall time in seconds.
+
+    Finished ranges are recorded in journal_path (default local_path +
+    ".<host>_<port>_<user>.upload.journal"); calling again after an
+    interruption only sends the missing ranges. With check the remote
+    sha256 must match the local one; when it does not, the journal is
+    dropped so the next call sends the whole file again.
+    """
+    start = time.time()
+    st = os.stat(local_path)
+    journal = Journal(
+        journal_path or journal_file(ssh, local_path, "upload"),
+        journal_identity(ssh, remote_path, st, chunk_size),
+    )
+    if journal.done and not ssh.exists(remote_path):
+        journal.reset()
+    if not journal.done:
+        ssh.mkdir_trees([os.path.dirname(remote_path)])
+        with ssh.sFTPClient.open(remote_path, "w") as f:
+            f.truncate(st.st_size)
+
+    todo = [r for r in ranges(st.st_size, chunk_size) if r[0] not in journal.done]
+    progress = ssh.progress(remote_path, sum(length for _, _, length in todo))
+
+    def put_range(sftp, item):
+        index, offset, length = item
+        with open(local_path, "rb") as local_file, sftp.open(remote_path, "r+") as f:
+            local_file.seek(offset)
+            f.seek(offset)
+            f.set_pipelined(True)
+            remaining = length
+            while remaining:
+                data = local_file.read(min(READ_BATCH, remaining))
+                if not data:
+                    break
+                f.write(data)
+                remaining -= len(data)
+                progress.add(len(data))
+        # closing waited for every write to be acknowledged
+        journal.mark(index)
+
+    with progress:
+        ssh.map_sftp(put_range, todo, workers)
+    ssh.forget_stat(remote_path)
+    if mode:
+        ssh.chmod(remote_path, mode)
+    if check:
+        try:
+            verify(ssh, local_path, remote_path)
+        except IOError:
+            # the ranges marked done can not be trusted, the next call sends all
+            journal.remove()
+            raise
+    journal.remove()
+    return time.time() - start
+
+
+def download_large(
+    ssh,
+    remote_path,
+    local_path,
+    chunk_size=CHUNK_SIZE,
+    workers=4,
+    journal_path=None,
+    check=True,
+):
+    """
+    Download one big file as chunk_size ranges read concurrently over
+    `workers` sftp sessions, and return the wall time in seconds.
+
+    Finished ranges are recorded in journal_path (default local_path +
+    ".<host>_<port>_<user>.download.journal"); calling again after an
+    interruption only fetches the missing ranges. With check the local
+    sha256 must match the remote one; when it does not, the journal is
+    dropped so the next call fetches the whole file again.
+    """
+    start = time.time()
+    st = ssh.stat(remote_path)
+    journal = Journal(
+        journal_path or journal_file(ssh, local_path, "download"),
+        journal_identity(ssh, remote_path, st, chunk_size),
+    )
+    if journal.done and not os.path.exists(local_path):
+        journal.reset()
+    if not journal.done:
+        local_folder = os.path.dirname(local_path)
+        if local_folder and not os.path.exists(local_folder):
+            os.makedirs(local_folder)
+        with open(local_path, "wb") as f:
+            f.truncate(st.st_size)
+
+    todo = [r for r in ranges(st.st_size, chunk_size) if r[0] not in journal.done]
+    progress = ssh.progress(remote_path, sum(length for _, _, length in todo))
+
+    def get_range(sftp, item):
+        index, offset, length = item
+        with sftp.open(remote_path, "r") as f, open(local_path, "r+b") as local_file:
+            local_file.seek(offset)
+            for data in read_range(f, offset, offset + length):
+                local_file.write(data)
+                progress.add(len(data))
+        journal.mark(index)
+
+    with progress:
+        ssh.map_sftp(get_range, todo, workers)
+    if check:
+        try:
+            verify(ssh, local_path, remote_path)
+        except IOError:
+            # the ranges marked done can not be trusted, the next call sends all
+            journal.remove()
+            raise
+    journal.remove()
+    return time.time() - start
+
+
+# remote tar options for each compression
+TAR_COMPRESSION = {None: "", "gzip": "z", "zstd": ""}
+
+
+def _check_compression(compression):
+    if compression not in TAR_COMPRESSION:
+        raise ValueError("compression must be None, 'gzip' or 'zstd', not %r" % compression)
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("zstd compression needs the zstandard package")
+
+
+def _finish(channel, command):
+    exit_status = channel.recv_exit_status()
+    error = b""
+    while channel.recv_stderr_ready():
+        error += channel.recv_stderr(32768)
+    channel.close()
+    if exit_status != 0:
+        raise IOError("%s exited with %d: %s" % (command, exit_status, to_str(error).strip()))
+
+
+def upload_folder_tar(ssh, local_folder, remote_folder, compression="gzip"):
+    """
+    Upload local_folder by packing it into a compressed tar stream that is
+    unpacked into remote_folder as it arrives, over one exec channel with no
+    temporary files. Much faster than per-file sftp for many small or
+    compressible files. Returns the wall time in seconds.
+
+    compression is "gzip", "zstd" (needs the zstandard package locally and
+    zstd on the server) or None.
+    """
+    _check_compression(compression)
+    start = time.time()
+    unpack = "tar -x%sf - -C %s" % (TAR_COMPRESSION[compression], shell_quote(remote_folder))
+    if compression == "zstd":
+        unpack = "zstd -dc | " + unpack
+    command = "mkdir -p %s && %s" % (shell_quote(remote_folder), unpack)
+    channel = ssh.transport.open_session()
+    channel.exec_command(command)
+    stream = channel.makefile("wb")
+    try:
+        if compression == "zstd":
+            writer = zstandard.ZstdCompressor().stream_writer(stream, closefd=False)
+            with tarfile.open(fileobj=writer, mode="w|") as tar:
+                tar.add(local_folder, arcname=".")
+            writer.close()
+        else:
+            mode = "w|gz" if compression == "gzip" else "w|"
+            with tarfile.open(fileobj=stream, mode=mode) as tar:
+                tar.add(local_folder, arcname=".")
+        stream.close()
+        channel.shutdown_write()
+    except Exception:
+        stream.close()
+        channel.close()
+        raise
+    _finish(channel, command)
+    ssh.forget_stat(remote_folder, tree=True, parents=True)
+    return time.time() - start
+
+
+def download_folder_tar(ssh, remote_folder, local_folder, compression="gzip"):
+    """
+    Download remote_folder as a compressed tar stream unpacked into
+    local_folder as it arrives. Returns the wall time in seconds.
+    """
+    _check_compression(compression)
+    start = time.time()
+    command = "tar -c%sf - -C %s ." % (TAR_COMPRESSION[compression], shell_quote(remote_folder))
+    if compression == "zstd":
+        command += " | zstd -c"
+    channel = ssh.transport.open_session()
+    channel.exec_command(command)
+    stream = channel.makefile("rb")
+    if not os.path.exists(local_folder):
+        os.makedirs(local_folder)
+    try:
+        if compression == "zstd":
+            reader = zstandard.ZstdDecompressor().stream_reader(stream)
+            tar = tarfile.open(fileobj=reader, mode="r|")
+        else:
+            tar = tarfile.open(fileobj=stream, mode="r|gz" if compression == "gzip" else "r|")
+        with tar:
+            # keeps absolute symlinks but refuses members escaping local_folder
+            if hasattr(tarfile, "tar_filter"):
+                tar.extractall(local_folder, filter="tar")
+            else:
+                tar.extractall(local_folder)
+    except tarfile.ReadError:
+        # an empty or broken stream usually means the remote tar failed
+        stream.close()
+        _finish(channel, command)
+        raise
+    except Exception:
+        stream.close()
+        channel.close()
+        raise
+    stream.close()
+    _finish(channel, command)
+    return time.time() - start
+
+
+def _stream_file(source, source_path, targets, target_path):
+    st = source.stat(source_path)
+    for ssh in targets:
+        ssh.mkdir_trees([os.path.dirname(target_path)])
+    writers = []
+    with source.sFTPClient.open(source_path, "rb") as reader:
+        try:
+            for ssh in targets:
+                writer = ssh.sFTPClient.open(target_path, "wb")
+                writer.set_pipelined(True)
+                writers.append(writer)
+            # bounded windows: prefetch would keep every answered block of a
+            # huge file in memory while the writers fall behind
+            for data in read_range(reader, 0, st.st_size):
+                for writer in writers:
+                    writer.write(data)
+        finally:
+            for writer in writers:
+                writer.close()
+    for ssh in targets:
+        ssh.forget_stat(target_path)
+        ssh.chmod(target_path, stat.S_IMODE(st.st_mode))
+
+
+def _stream_folder(source, source_folder, targets, target_folder):
+    command = "tar -cf - -C %s ." % shell_quote(source_folder)
+    unpack = "mkdir -p %s && tar -xf - -C %s" % (
+        shell_quote(target_folder),
+        shell_quote(target_folder),
+    )
+    reader = source.transport.open_session()
+    reader.exec_command(command)
+    writers = []
+    try:
+        for ssh in targets:
+            writer = ssh.transport.open_session()
+            writer.exec_command(unpack)
+            writers.append(writer)
+        for data in iter(lambda: reader.recv(COPY_BLOCK), b""):
+            for writer in writers:
+                writer.sendall(data)
+        for writer in writers:
+            writer.shutdown_write()
+    except Exception:
+        for channel in [reader] + writers:
+            channel.close()
+        raise
+    _finish(reader, command)
+    for writer in writers:
+        _finish(writer, unpack)
+    for ssh in targets:
+        ssh.forget_stat(target_folder, tree=True, parents=True)
+
+
+def _forward(holder, holder_path, target, target_path, mode, ssh_options):
+    """
+    Make holder send holder_path to target with its own ssh client, so the
+    data goes straight from one host to the other.
+    """
+    is_folder = mode is None
+    if is_folder:
+        receive = "mkdir -p %s && tar -xf - -C %s" % (
+            shell_quote(target_path),
+            shell_quote(target_path),
+        )
+        send = "tar -cf - -C %s ." % shell_quote(holder_path)
+    else:
+        receive = "mkdir -p %s && cat > %s && chmod %o %s" % (
+            shell_quote(os.path.dirname(target_path) or "."),
+            shell_quote(target_path),
+            mode,
+            shell_quote(target_path),
+        )
+        send = "cat -- %s" % shell_quote(holder_path)
+    command = "%s | ssh %s -p %d %s %s" % (
+        send,
+        ssh_options,
+        int(target.port),
+        shell_quote("%s@%s" % (target.username, target.host)),
+        shell_quote(receive),
+    )
+    result = holder.exec_command_result(command)
+    if not result.ok:
+        raise IOError(
+            "sent from %s, failed with %d: %s"
+            % (holder.host, result.exit_status, result.stderr.strip())
+        )
+    target.forget_stat(target_path, tree=is_folder, parents=True)
+
+
+def copy_remote(
+    source,
+    source_path,
+    targets,
+    target_path=None,
+    tree=False,
+    ssh_options="-o BatchMode=yes",
+):
+    """
+    Copy a file or folder from the source SSHConnection to every target
+    SSHConnection without writing it to local disk. Returns the wall time in
+    seconds.
+
+    By default the source is read once and every block is written to all
+    targets as it arrives: a file through sftp handles, a folder as one tar
+    stream. The data still passes through this machine once per target.
+
+    With tree=True the data goes host to host instead: in each round every
+    host that already has the copy sends it to one more target with its own
+    ssh client (ssh_options are passed to it), so the number of rounds grows
+    with log2 of the number of targets. The hosts must be able to log in to
+    each other without a password, e.g. with keys in authorized_keys.
+    A target that fails does not forward; IOError lists the failed hosts
+    after every other target was served.
+    """
+    start = time.time()
+    targets = list(targets)
+    target_path = target_path or source_path
+    st = source.stat(source_path)
+    is_folder = stat.S_ISDIR(st.st_mode)
+    if not tree:
+        if is_folder:
+            _stream_folder(source, source_path, targets, target_path)
+        else:
+            _stream_file(source, source_path, targets, target_path)
+        return time.time() - start
+
+    # folders keep their modes inside the tar stream
+    mode = None if is_folder else stat.S_IMODE(st.st_mode)
+    holders = [(source, source_path)]
+    pending = list(targets)
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, len(targets))) as executor:
+        while pending:
+            round_pairs = [(holder, pending.pop(0)) for holder in holders if pending]
+            futures = [
+                (
+                    target,
+                    executor.submit(
+                        _forward, holder, path, target, target_path, mode, ssh_options
+                    ),
+                )
+                for (holder, path), target in round_pairs
+            ]
+            for target, future in futures:
+                try:
+                    future.result()
+                    holders.append((target, target_path))
+                except Exception as e:
+                    errors.append("%s: %s" % (target.host, e))
+    if errors:
+        raise IOError("copy to %d hosts failed:\n%s" % (len(errors), "\n".join(errors)))
+    return time.time() - start
@@ -7,10 +7,15 @@ from os import path, walk
 from sys import stdout
 from math import floor
 
+try:
+    from shlex import quote as shell_quote
+except ImportError:
+    from pipes import quote as shell_quote
+
 
 def progressbar(current_bytes, total_bytes):
     percent = "{:.2%}".format(current_bytes / total_bytes)
-    rate_of_progress = "%dkb/%dkb" % (current_bytes, total_bytes)
+    rate_of_progress = "%dB/%dB" % (current_bytes, total_bytes)
     stdout.write("\r")
 
     stdout.write(
@@ -45,23 +50,17 @@ def to_str(bytes_or_str):
     )
 
 
-def scan_by_socket(host, port):
-
-    from sys import version
-
-    if version.startswith("3."):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as scan_socket:
-            status_code = scan_socket.connect_ex((host, port))
-            if status_code == 0:
-                return True
-    elif version.startswith("2."):
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        status_code = s.connect_ex((host, port))
-        if status_code == 0:
-            s.close()
-            return True
-    else:
-        pass
+def scan_by_socket(host, port, timeout=10):
+    """
+    Whether host (IPv4, IPv6 or a name) accepts tcp connections on port
+    within timeout seconds. easyssh.scan checks many hosts at once.
+    """
+    try:
+        scan_socket = socket.create_connection((host, port), timeout=timeout)
+    except (socket.error, socket.timeout):
+        return False
+    scan_socket.close()
+    return True
 
 
 def standardize_path(path):
@@ -79,4 +78,5 @@ __all__ = [
     "scan_by_socket",
     "standardize_path",
     "get_strftime",
+    "shell_quote",
 ]
@@ -1,5 +1,8 @@
 # coding:utf-8
-from easyssh import SSHConnection
+from easyssh import SSHConnection, Step, StepEngine, StepStore
+
+# hosts that converged are skipped for an hour without connecting
+step_store = StepStore("/tmp/easyssh-steps")
 
 
 class InitCentos7:
@@ -26,36 +29,30 @@ class InitCentos7:
             for command in before_command_list:
                 self.ssh.exec_command(command)
 
-        with self.ssh.open(filename) as f:
-            if tag_string not in f.read().decode('utf-8'):
-                print("start to setting {filename}".format(filename=filename))
-                for command in after_command_list:
-                    self.ssh.exec_command(command)
-                print("end   to setting {filename}".format(filename=filename))
+        # checked on the server, the file is not read over the wire
+        if not self.ssh.contains(filename, tag_string):
+            print("start to setting {filename}".format(filename=filename))
+            for command in after_command_list:
+                self.ssh.exec_command(command)
+            print("end   to setting {filename}".format(filename=filename))
 
     def init_sshd(self):
-        before_command_list = ["cat /etc/hosts.allow"]
-        hosts_allow_filename = "/etc/hosts.allow"
-        hosts_allow_tag_string = "###### Optimization of the sshd ======>{filename} ######".format(
-            filename=hosts_allow_filename)
-        hosts_allow_command = """
-cat >>{hosts_allow_filename}<<EOF
-{hosts_allow_tag_string}
-sshd: ALL
-{hosts_allow_tag_string}
-EOF
-        """.format(hosts_allow_filename=hosts_allow_filename, hosts_allow_tag_string=hosts_allow_tag_string)
-        after_command_list = [hosts_allow_command, "service sshd restart", "cat /etc/hosts.allow"]
-        self.change_setting(before_command_list=before_command_list, filename=hosts_allow_filename,
-                            tag_string=hosts_allow_tag_string, after_command_list=after_command_list)
+        engine = StepEngine([
+            Step("sshd hosts.allow",
+                 "grep -qxF 'sshd: ALL' /etc/hosts.allow",
+                 ["echo 'sshd: ALL' >> /etc/hosts.allow", "service sshd restart"]),
+        ], store=step_store)
+        print(engine.run(self.ssh))
 
     def init_standard_software(self):
-        original_yum_packages_list = self.ssh.exec_command("""yum list | sed '1d' | awk '{print $1}'""")
+        # gathered once per host and cached, membership checks are set lookups
+        installed_packages = self.ssh.facts().packages
         software_list = ["gcc", "gcc-c++", "libstdc++-devel" "nmap", "telnet", "ping", "lsof", "tcpdump", "firewalld"]
-        for software in software_list:
-            if software not in original_yum_packages_list:
-                command = "yum -y install %s" % software
-                self.ssh.exec_command(command)
+        command_list = ["yum -y install %s" % software for software in software_list
+                        if software not in installed_packages]
+        # one remote shell for all of them
+        self.ssh.exec_script(command_list, stop_on_error=False)
+        self.ssh.invalidate_facts()
 
     def init_kernel_package_software(self):
         command = \
@@ -66,18 +63,17 @@ EOF
         print(result_output)
 
     def init_docker(self):
-        original_yum_packages_list = self.ssh.exec_command("""yum list | sed '1d' | awk '{print $1}'""")
-        if "docker" not in original_yum_packages_list:
-            command_list = ["yum -y install docker",
-                            """echo '{"registry-mirrors":["https://mirror.ccs.tencentyun.com",
-                            "http://hub-mirror.c.163.com","https://docker.mirrors.ustc.edu.cn",
-                            "https://registry.docker-cn.com"]}' > /etc/docker/daemon.json;""",
-                            "systemctl daemon-reload",
-                            "systemctl restart docker",
-                            ]
-            for command in command_list:
-                result_output = self.ssh.exec_command(command)
-                print(result_output)
+        engine = StepEngine([
+            Step("docker installed", "rpm -q docker", "yum -y install docker"),
+            Step("docker registry mirrors",
+                 "grep -q mirror.ccs.tencentyun.com /etc/docker/daemon.json",
+                 ["""echo '{"registry-mirrors":["https://mirror.ccs.tencentyun.com",
+                  "http://hub-mirror.c.163.com","https://docker.mirrors.ustc.edu.cn",
+                  "https://registry.docker-cn.com"]}' > /etc/docker/daemon.json;""",
+                  "systemctl daemon-reload",
+                  "systemctl restart docker"]),
+        ], store=step_store)
+        print(engine.run(self.ssh))
 
     def init_kernel_arguments(self):
         # setting /etc/sysctl.conf
@@ -154,7 +150,7 @@ cat >>{limits_conf_filename}<<EOF
         print(limits_command_result)
 
     def init_python3(self, update=False):
-        original_yum_packages_list = self.ssh.exec_command("""yum list | sed '1d' | awk '{print $1}'""")
+        installed_packages = self.ssh.facts().packages
         yum_packages_list = [
             "python3",
             "zlib-devel",
@@ -174,18 +170,19 @@ cat >>{limits_conf_filename}<<EOF
         ]
 
         for package in yum_packages_list:
-            if package not in original_yum_packages_list:
+            if package not in installed_packages:
                 command = "yum -y install %s " % package
                 result_output = self.ssh.exec_command(command)
                 print(result_output)
+        self.ssh.invalidate_facts()
         self.reconnect()
 
-        original_pip3_packages_list = self.ssh.exec_command("""pip3 list | sed '1d' | awk '{print $1 }'""").lower()
+        installed_pip3_packages = self.ssh.facts().pip_packages
         python3_packages = "pip grequests scrapy aiohttp flask fastapi django tornado opencv-python " \
                            "opencv-contrib-python vibora jieba NLTK pandas matplotlib celery " \
                            "pymysql mysqlclient redis pymongo keras".lower().split(" ")
         for python3_package in python3_packages:
-            if python3_package not in original_pip3_packages_list:
+            if python3_package not in installed_pip3_packages:
                 print(python3_package)
                 if update:
                     command = "pip3  install -U %s -i http://mirrors.cloud.tencent.com/pypi/simple" \
@@ -195,6 +192,7 @@ cat >>{limits_conf_filename}<<EOF
                               " --trusted-host mirrors.cloud.tencent.com " % python3_package
                 result_output = self.ssh.exec_command(command)
                 print(result_output)
+        self.ssh.invalidate_facts()
 
     def main(self):
 
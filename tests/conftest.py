@@ -0,0 +1,46 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+"""
+Every test talks to a real ssh/sftp server: the in-process one from
+benchmarks/server.py, which runs commands with /bin/sh and serves sftp from
+the local filesystem, so remote paths are local paths under tmp_path.
+"""
+from __future__ import print_function, division
+import os
+import sys
+
+import paramiko
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from easyssh import SSHConnection
+from server import SSHServer
+
+
+@pytest.fixture(scope="session")
+def server():
+    server = SSHServer(host_key=paramiko.ECDSAKey.generate())
+    yield server
+    server.close()
+
+
+def connect(server, username="test", **kwargs):
+    ssh = SSHConnection(host="127.0.0.1", port=server.port, username=username, password="test", **kwargs)
+    ssh.connect()
+    return ssh
+
+
+@pytest.fixture
+def ssh(server):
+    ssh = connect(server)
+    yield ssh
+    ssh.disconnect()
+
+
+@pytest.fixture
+def cached_ssh(server):
+    ssh = connect(server, stat_cache=True)
+    yield ssh
+    ssh.disconnect()
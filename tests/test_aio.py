@@ -0,0 +1,106 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from easyssh import AsyncSSHConnection
+
+
+def run(server, body, **kwargs):
+    async def main():
+        ssh = AsyncSSHConnection(host="127.0.0.1", port=server.port, username="test", password="test", **kwargs)
+        await ssh.connect()
+        try:
+            return await body(ssh)
+        finally:
+            await ssh.disconnect()
+
+    return asyncio.run(main())
+
+
+def test_commands(server):
+    async def body(ssh):
+        result = await ssh.exec_command_result("echo out; echo err >&2; exit 3")
+        return result, await ssh.exec_command("echo hello")
+
+    result, output = run(server, body)
+    assert (result.stdout, result.stderr, result.exit_status) == ("out\n", "err\n", 3)
+    assert output == "hello\n"
+
+
+def test_commands_hold_no_thread_while_running(server):
+    async def body(ssh):
+        start = time.time()
+        results = await asyncio.gather(*[ssh.exec_command_result("sleep 0.5; echo %d" % n) for n in range(20)])
+        return results, time.time() - start
+
+    # two threads could never run twenty half second commands in time
+    results, elapsed = run(server, body, executor=ThreadPoolExecutor(max_workers=2))
+    assert [result.stdout for result in results] == ["%d\n" % n for n in range(20)]
+    assert elapsed < 3
+
+
+def test_exec_commands(server):
+    async def body(ssh):
+        return [result async for result in ssh.exec_commands(["sleep 0.3; echo a", "echo b"], max_sessions=2)]
+
+    assert [result.stdout for result in run(server, body)] == ["b\n", "a\n"]
+
+
+def test_timeout_and_cancellation(server):
+    async def body(ssh):
+        with pytest.raises(asyncio.TimeoutError):
+            await ssh.exec_command_result("sleep 5", timeout=0.3)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(ssh.exec_command("sleep 5"), 0.3)
+        # the connection stays usable
+        return await ssh.exec_command("echo ok")
+
+    assert run(server, body) == "ok\n"
+
+
+def test_sftp_calls(server, tmp_path):
+    local, remote = str(tmp_path / "local"), str(tmp_path / "remote" / "file")
+    with open(local, "w") as f:
+        f.write("data")
+
+    async def body(ssh):
+        await ssh.upload(local, remote)
+        return await ssh.exists(remote), (await ssh.stat(remote)).st_size, await ssh.listdir(str(tmp_path / "remote"))
+
+    assert run(server, body) == (True, 4, ["file"])
+
+
+def test_blocking_methods_are_refused(server):
+    ssh = AsyncSSHConnection(host="127.0.0.1", port=server.port)
+    with pytest.raises(AttributeError):
+        ssh.walk_folder
+    with pytest.raises(AttributeError):
+        ssh.exec_command_stream
+    assert ssh.host == "127.0.0.1"
+    ssh.forget_stat("/tmp")
+
+
+def test_op_timeout(server):
+    async def body(ssh):
+        with pytest.raises(asyncio.TimeoutError):
+            await ssh.exec_script(["sleep 2"])
+        return True
+
+    assert run(server, body, op_timeout=0.3)
+
+
+def test_connection_closed_under_a_running_command(server):
+    async def body(ssh):
+        asyncio.get_running_loop().call_later(0.3, ssh.ssh.transport.close)
+        start = time.time()
+        with pytest.raises(EOFError):
+            await ssh.exec_command_result("sleep 5")
+        return time.time() - start
+
+    assert run(server, body) < 2
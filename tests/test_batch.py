@@ -0,0 +1,51 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+
+import pytest
+
+
+def test_output_and_exit_status_per_command(ssh):
+    results = ssh.exec_script(["echo one", "echo two >&2", "(exit 4)", "printf 'no newline'"], stop_on_error=False)
+    assert [result.command for result in results] == ["echo one", "echo two >&2", "(exit 4)", "printf 'no newline'"]
+    assert [result.stdout for result in results] == ["one\n", "", "", "no newline"]
+    assert [result.stderr for result in results] == ["", "two\n", "", ""]
+    assert [result.exit_status for result in results] == [0, 0, 4, 0]
+
+
+def test_commands_share_one_shell(ssh, tmp_path):
+    results = ssh.exec_script(["cd %s" % tmp_path, "name=easyssh", "pwd", "echo $name"])
+    assert results[2].stdout.strip() == str(tmp_path)
+    assert results[3].stdout == "easyssh\n"
+
+
+def test_stop_on_error(ssh):
+    results = ssh.exec_script(["echo before", "false", "echo after"])
+    assert [result.exit_status for result in results] == [0, 1]
+    results = ssh.exec_script(["echo before", "false", "echo after"], stop_on_error=False)
+    assert [result.exit_status for result in results] == [0, 1, 0]
+    assert results[2].stdout == "after\n"
+
+
+def test_commands_reading_stdin_do_not_eat_the_script(ssh):
+    results = ssh.exec_script(["cat", "echo still here"])
+    assert [result.stdout for result in results] == ["", "still here\n"]
+
+
+def test_many_commands(ssh):
+    commands = ["echo %d" % number for number in range(3000)]
+    results = ssh.exec_script(commands)
+    assert len(results) == 3000
+    assert [result.stdout for result in results] == ["%d\n" % number for number in range(3000)]
+
+
+def test_shell_exiting_early(ssh):
+    results = ssh.exec_script(["echo one", "exit 3", "echo never"])
+    assert [result.stdout for result in results] == ["one\n"]
+    with pytest.raises(IOError):
+        ssh.exec_script(["exit 3"])
+
+
+def test_no_commands(ssh):
+    assert ssh.exec_script([]) == []
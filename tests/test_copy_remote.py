@@ -0,0 +1,87 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+import shutil
+import stat
+import subprocess
+
+import pytest
+
+from conftest import connect
+
+
+@pytest.fixture
+def hosts(server):
+    # the same server under different users stands in for different hosts;
+    # they share this filesystem, so every copy needs a path of its own
+    connections = [connect(server, username=name) for name in ("source", "one", "two")]
+    yield connections
+    for ssh in connections:
+        ssh.disconnect()
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_copy_file_to_many_targets(hosts, tmp_path):
+    source, targets = hosts[0], hosts[1:]
+    path = str(tmp_path / "big")
+    data = os.urandom(3 * 1024 * 1024 + 5)
+    with open(path, "wb") as f:
+        f.write(data)
+    os.chmod(path, 0o640)
+    target = str(tmp_path / "copy" / "big")
+    source.copy_to(targets, path, target)
+    assert read(target) == data
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o640
+
+
+def test_copy_folder(hosts, tmp_path):
+    source, targets = hosts[0], hosts[1:]
+    folder = tmp_path / "folder"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "sub" / "file").write_text("x" * 1000)
+    (folder / "top").write_text("top")
+    target = str(tmp_path / "copy")
+    source.copy_to(targets, str(folder), target)
+    assert read(os.path.join(target, "sub", "file")) == b"x" * 1000
+    assert read(os.path.join(target, "top")) == b"top"
+
+
+def test_copy_of_a_missing_path_raises(hosts, tmp_path):
+    with pytest.raises(IOError):
+        hosts[0].copy_to(hosts[1:], str(tmp_path / "missing"), str(tmp_path / "copy"))
+
+
+@pytest.fixture
+def ssh_options(tmp_path):
+    if not shutil.which("ssh") or not shutil.which("ssh-keygen"):
+        pytest.skip("needs the openssh client")
+    key = str(tmp_path / "id_ed25519")
+    subprocess.check_call(["ssh-keygen", "-q", "-t", "ed25519", "-N", "", "-f", key])
+    return "-o BatchMode=yes -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -o LogLevel=ERROR -i %s" % key
+
+
+def test_copy_host_to_host(hosts, tmp_path, ssh_options):
+    path = str(tmp_path / "file")
+    with open(path, "w") as f:
+        f.write("forwarded")
+    target = str(tmp_path / "copy" / "file")
+    hosts[0].copy_to(hosts[1:2], path, target, tree=True, ssh_options=ssh_options)
+    assert read(target) == b"forwarded"
+
+
+def test_failed_targets_are_listed(server, hosts, tmp_path, ssh_options):
+    path = str(tmp_path / "file")
+    open(path, "w").close()
+    unreachable = connect(server, username="unreachable")
+    # the holder's ssh client can not reach this port
+    unreachable.port = 1
+    with pytest.raises(IOError) as error:
+        hosts[0].copy_to([unreachable], path, str(tmp_path / "copy"), tree=True, ssh_options=ssh_options)
+    assert "copy to 1 hosts failed" in str(error.value)
+    unreachable.disconnect()
@@ -0,0 +1,149 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+import socket
+import threading
+import time
+
+import paramiko
+import pytest
+
+from conftest import connect
+from easyssh import SSHConnection, credentials
+from easyssh.credentials import CredentialCache, KnownHosts, load_private_key
+from server import SSHServer
+
+
+@pytest.fixture(scope="module")
+def rsa_server():
+    server = SSHServer(host_key=paramiko.RSAKey.generate(2048))
+    yield server
+    server.close()
+
+
+def write_key(key, path, passphrase=None):
+    key.write_private_key_file(str(path), passphrase)
+    return str(path)
+
+
+@pytest.mark.parametrize("key_class", [paramiko.RSAKey, paramiko.ECDSAKey])
+def test_load_encrypted_keys(key_class, tmp_path):
+    key = key_class.generate(2048) if key_class is paramiko.RSAKey else key_class.generate()
+    path = write_key(key, tmp_path / "key", "secret")
+    assert load_private_key(path, "secret") == key
+
+
+def test_key_is_read_once(monkeypatch, tmp_path):
+    path = write_key(paramiko.ECDSAKey.generate(), tmp_path / "key")
+    calls = []
+    load = credentials.load_private_key
+
+    def slow_load(*args):
+        calls.append(args)
+        time.sleep(0.1)
+        return load(*args)
+
+    monkeypatch.setattr(credentials, "load_private_key", slow_load)
+    cache = CredentialCache()
+    keys = []
+    threads = [threading.Thread(target=lambda: keys.append(cache.load_key(path))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(key is keys[0] for key in keys)
+
+    # a key file changed on disk is read again
+    write_key(paramiko.ECDSAKey.generate(), path)
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    assert cache.load_key(path) != keys[0]
+    assert len(calls) == 2
+    cache.clear()
+    cache.load_key(path)
+    assert len(calls) == 3
+
+
+def test_connect_with_a_key(server, tmp_path):
+    path = write_key(paramiko.RSAKey.generate(2048), tmp_path / "key", "secret")
+    cache = CredentialCache()
+    for _ in range(2):
+        ssh = SSHConnection(
+            host="127.0.0.1",
+            port=server.port,
+            username="test",
+            hostkey=path,
+            passphrase="secret",
+            credentials=cache,
+        )
+        ssh.connect()
+        assert ssh.exec_command_result("echo ok").stdout == "ok\n"
+        ssh.disconnect()
+    assert list(cache._keys) == [path]
+
+
+def test_accept_new_records_the_key(server, tmp_path):
+    path = str(tmp_path / "ssh" / "known_hosts")
+    ssh = connect(server, known_hosts=KnownHosts(path, accept_new=True))
+    ssh.disconnect()
+    with open(path) as f:
+        assert f.read().startswith("[127.0.0.1]:%s ecdsa-sha2-nistp256 " % server.port)
+    # a fresh KnownHosts reads the file back
+    ssh = connect(server, known_hosts=KnownHosts(path))
+    ssh.disconnect()
+
+
+def test_unknown_host_is_rejected(server, tmp_path):
+    with pytest.raises(paramiko.SSHException) as error:
+        connect(server, known_hosts=KnownHosts(str(tmp_path / "known_hosts")))
+    assert "has no ecdsa-sha2-nistp256 key" in str(error.value)
+
+
+def test_changed_key_is_rejected(server, tmp_path):
+    path = str(tmp_path / "known_hosts")
+    name = KnownHosts.name("127.0.0.1", server.port)
+    with open(path, "w") as f:
+        f.write("%s ecdsa-sha2-nistp256 %s\n" % (name, paramiko.ECDSAKey.generate().get_base64()))
+    with pytest.raises(paramiko.BadHostKeyException):
+        connect(server, known_hosts=KnownHosts(path, accept_new=True))
+
+
+def test_hashed_entries(server, tmp_path):
+    path = str(tmp_path / "known_hosts")
+    name = KnownHosts.name("127.0.0.1", server.port)
+    with open(path, "w") as f:
+        f.write("%s %s %s\n" % (paramiko.HostKeys.hash_host(name), "ecdsa-sha2-nistp256", server.host_key.get_base64()))
+    known_hosts = KnownHosts(path)
+    assert list(known_hosts.lookup("127.0.0.1", server.port)) == ["ecdsa-sha2-nistp256"]
+    connect(server, known_hosts=known_hosts).disconnect()
+
+
+def test_restrict_asks_for_the_recorded_key_type(rsa_server, tmp_path):
+    path = str(tmp_path / "known_hosts")
+    name = KnownHosts.name("127.0.0.1", rsa_server.port)
+    with open(path, "w") as f:
+        f.write("%s ssh-rsa %s\n" % (name, rsa_server.host_key.get_base64()))
+    known_hosts = KnownHosts(path)
+    # an unstarted transport, only its security options matter
+    left, right = socket.socketpair()
+    transport = paramiko.Transport(left)
+    try:
+        known_hosts.restrict(transport, "127.0.0.1", rsa_server.port)
+        key_types = transport.get_security_options().key_types
+    finally:
+        transport.close()
+        right.close()
+    assert key_types and all(key_type == "ssh-rsa" or key_type.startswith("rsa-sha2-") for key_type in key_types)
+    connect(rsa_server, known_hosts=known_hosts).disconnect()
+
+
+def test_file_is_reloaded_when_it_changes(server, tmp_path):
+    path = str(tmp_path / "known_hosts")
+    known_hosts = KnownHosts(path, refresh=0)
+    assert known_hosts.lookup("127.0.0.1", server.port) == {}
+    with open(path, "w") as f:
+        name = KnownHosts.name("127.0.0.1", server.port)
+        f.write("%s ecdsa-sha2-nistp256 %s\n" % (name, server.host_key.get_base64()))
+    connect(server, known_hosts=known_hosts).disconnect()
@@ -0,0 +1,74 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+
+import pytest
+
+
+def write(path, data):
+    with open(path, "w") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_ensure_block_appends_then_keeps(ssh, tmp_path):
+    path = str(tmp_path / "hosts.allow")
+    write(path, "sshd: 10.0.0.1\n")
+    assert ssh.ensure_block(path, "# easyssh", "sshd: ALL")
+    assert read(path) == "sshd: 10.0.0.1\n# easyssh\nsshd: ALL\n# easyssh\n"
+    assert not ssh.ensure_block(path, "# easyssh", "sshd: ALL")
+    assert read(path) == "sshd: 10.0.0.1\n# easyssh\nsshd: ALL\n# easyssh\n"
+
+
+def test_ensure_block_replaces_only_the_block(ssh, tmp_path):
+    path = str(tmp_path / "config")
+    write(path, "before\n# M\nold\nlines\n# M\nafter\n")
+    inode = os.stat(path).st_ino
+    assert ssh.ensure_block(path, "# M", "new\n")
+    assert read(path) == "before\n# M\nnew\n# M\nafter\n"
+    # rewritten in place
+    assert os.stat(path).st_ino == inode
+
+
+def test_ensure_block_creates_the_file(ssh, tmp_path):
+    path = str(tmp_path / "new")
+    assert ssh.ensure_block(path, "# M", "x")
+    assert read(path) == "# M\nx\n# M\n"
+
+
+def test_ensure_block_unclosed_marker_keeps_the_file(ssh, tmp_path):
+    path = str(tmp_path / "config")
+    write(path, "# M\nkeep1\nkeep2\n")
+    with pytest.raises(IOError) as error:
+        ssh.ensure_block(path, "# M", "y")
+    assert "no closing marker" in str(error.value)
+    assert read(path) == "# M\nkeep1\nkeep2\n"
+
+
+def test_ensure_line(ssh, tmp_path):
+    path = str(tmp_path / "limits.conf")
+    write(path, "* soft nofile 1024\nother\n* soft nofile 2048\n")
+    assert ssh.ensure_line(path, "* soft nofile 65535", match="^\\* soft nofile")
+    assert read(path) == "* soft nofile 65535\nother\n"
+    assert not ssh.ensure_line(path, "* soft nofile 65535", match="^\\* soft nofile")
+    assert ssh.ensure_line(path, "appended")
+    assert not ssh.ensure_line(path, "appended")
+    assert read(path) == "* soft nofile 65535\nother\nappended\n"
+
+
+def test_grep_and_contains(ssh, tmp_path):
+    path = str(tmp_path / "file")
+    write(path, "alpha\nbeta\nalpha beta\n")
+    assert ssh.grep(path, "^alpha") == ["alpha", "alpha beta"]
+    assert ssh.grep(path, "a.p", fixed=True) == []
+    assert ssh.grep(path, "alpha", max_count=1) == ["alpha"]
+    assert ssh.contains(path, "beta")
+    assert not ssh.contains(path, "gamma")
+    with pytest.raises(IOError):
+        ssh.contains(str(tmp_path / "missing"), "beta")
@@ -0,0 +1,69 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import socket
+import threading
+import time
+
+import paramiko
+import pytest
+
+from conftest import connect
+
+
+def test_results_come_as_commands_finish(ssh):
+    commands = ["sleep 0.6; echo slow", "echo fast", "sleep 0.3; echo middle >&2; exit 2"]
+    results = list(ssh.exec_commands(commands))
+    assert [result.command for result in results] == [commands[1], commands[2], commands[0]]
+    assert [result.exit_status for result in results] == [0, 2, 0]
+    assert results[1].stderr == "middle\n"
+    assert results[2].stdout == "slow\n"
+
+
+def test_max_sessions_bounds_the_open_channels(ssh):
+    start = time.time()
+    results = list(ssh.exec_commands(["sleep 0.3"] * 6, max_sessions=2))
+    assert len(results) == 6 and all(result.ok for result in results)
+    # three rounds of two
+    assert 0.85 < time.time() - start < 2
+
+
+def test_refused_channel_lowers_the_limit(ssh, monkeypatch):
+    open_session = ssh.transport.open_session
+    calls = []
+
+    def limited(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 3:
+            raise paramiko.ChannelException(1, "administratively prohibited")
+        return open_session(*args, **kwargs)
+
+    monkeypatch.setattr(ssh.transport, "open_session", limited)
+    results = list(ssh.exec_commands(["echo %d" % number for number in range(8)], max_sessions=5))
+    assert sorted(result.stdout for result in results) == ["%d\n" % number for number in range(8)]
+
+
+def test_no_channel_at_all_raises(ssh, monkeypatch):
+    def refuse(*args, **kwargs):
+        raise paramiko.ChannelException(1, "administratively prohibited")
+
+    monkeypatch.setattr(ssh.transport, "open_session", refuse)
+    with pytest.raises(paramiko.ChannelException):
+        list(ssh.exec_commands(["true"]))
+
+
+def test_timeout(ssh):
+    with pytest.raises(socket.timeout):
+        list(ssh.exec_commands(["sleep 5"], timeout=0.3))
+    # the connection is still usable afterwards
+    assert ssh.exec_command_result("echo ok").stdout == "ok\n"
+
+
+def test_connection_closed_under_running_commands(server):
+    ssh = connect(server)
+    threading.Timer(0.3, ssh.disconnect).start()
+    start = time.time()
+    with pytest.raises(EOFError):
+        list(ssh.exec_commands(["sleep 5", "sleep 5"]))
+    assert time.time() - start < 2
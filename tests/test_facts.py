@@ -0,0 +1,100 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+import socket
+
+import pytest
+
+from conftest import connect
+from easyssh import FactCache, Facts
+from easyssh.facts import parse_limits, parse_os_release
+
+LIMITS = """Limit                     Soft Limit           Hard Limit           Units
+Max cpu time              unlimited            unlimited            seconds
+Max open files            1024                 524288               files
+"""
+
+
+def test_parsers():
+    assert parse_os_release('# comment\nID=centos\nVERSION_ID="7"\nNAME=\'CentOS Linux\'\n') == {
+        "ID": "centos",
+        "VERSION_ID": "7",
+        "NAME": "CentOS Linux",
+    }
+    assert parse_limits(LIMITS) == {
+        "max cpu time": ("unlimited", "unlimited"),
+        "max open files": ("1024", "524288"),
+    }
+
+
+def test_gather(ssh):
+    facts = Facts.gather(ssh)
+    assert facts.hostname == socket.gethostname()
+    assert facts.kernel == os.uname().release
+    assert "max open files" in facts.limits
+    if os.path.exists("/etc/os-release"):
+        assert facts.os_name
+    assert facts.has_pip_package("Paramiko")
+    assert facts.pip_packages["paramiko"]
+
+
+def test_round_trip_through_a_dict():
+    facts = Facts("h", "5.0", {"ID": "x"}, {"max open files": ("1", "2")}, ["gcc"], {"six": "1.0"})
+    again = Facts.from_dict(facts.to_dict())
+    assert again.to_dict() == facts.to_dict()
+    assert again.has_package("gcc") and again.limits["max open files"] == ("1", "2")
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    calls = []
+    gather = Facts.gather.__func__
+
+    def counting(cls, ssh):
+        calls.append(ssh.username)
+        return gather(cls, ssh)
+
+    monkeypatch.setattr(Facts, "gather", classmethod(counting))
+    return calls
+
+
+def test_facts_are_cached(server, tmp_path, counted):
+    cache = FactCache(path=str(tmp_path / "facts"))
+    ssh = connect(server, fact_cache=cache)
+    first = ssh.facts()
+    assert ssh.facts() is first
+    assert ssh.facts(refresh=True) is not first
+    assert len(counted) == 2
+    ssh.invalidate_facts()
+    ssh.facts()
+    assert len(counted) == 3
+    ssh.disconnect()
+
+    # another process (a new cache on the same folder) reads the file
+    other = connect(server, fact_cache=FactCache(path=str(tmp_path / "facts")))
+    assert other.facts().hostname == first.hostname
+    assert len(counted) == 3
+    # other users of the host are separate entries
+    third = connect(server, username="other", fact_cache=cache)
+    third.facts()
+    assert len(counted) == 4
+    other.disconnect()
+    third.disconnect()
+
+
+def test_expired_or_broken_facts_are_gathered_again(server, tmp_path, counted):
+    folder = str(tmp_path / "facts")
+    ssh = connect(server, fact_cache=FactCache(path=folder))
+    ssh.facts()
+    ssh.fact_cache = FactCache(ttl=-1, path=folder)
+    ssh.facts()
+    assert len(counted) == 2
+    for name in os.listdir(folder):
+        with open(os.path.join(folder, name), "w") as f:
+            f.write("{broken")
+    ssh.fact_cache = FactCache(path=folder)
+    assert ssh.facts().hostname
+    assert len(counted) == 3
+    ssh.disconnect()
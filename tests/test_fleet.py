@@ -0,0 +1,80 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import socket
+
+import paramiko
+
+from easyssh import Fleet
+from server import SSHServer
+
+
+def servers_of(server, count):
+    # the same server under different users stands in for different hosts
+    return [
+        {"host": "127.0.0.1", "port": server.port, "username": "user%d" % number, "password": "test"}
+        for number in range(count)
+    ]
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_exec_command_on_every_host(server):
+    fleet = Fleet(servers_of(server, 5), workers=3)
+    results = fleet.exec_command_all(["echo $((1 + 1))", "echo done"])
+    assert len(results) == 5
+    for result in results:
+        assert result.ok and result.error is None
+        assert result.stdout == "2\ndone\n"
+        assert len(result.results) == 2
+
+
+def test_stop_on_error(server):
+    fleet = Fleet(servers_of(server, 1))
+    result = fleet.exec_command_all(["false", "echo after"])[0]
+    assert result.exit_status == 1 and len(result.results) == 1
+    result = fleet.exec_command_all(["false", "echo after"], stop_on_error=False)[0]
+    assert result.ok and result.stdout == "after\n"
+
+
+def test_unreachable_host_is_an_error_not_an_exception(server):
+    servers = servers_of(server, 1) + [{"host": "127.0.0.1", "port": closed_port(), "password": "x"}]
+    results = Fleet(servers, timeout=5).exec_command_all("true")
+    errors = [result.error for result in results if result.error is not None]
+    assert len(errors) == 1
+    assert isinstance(errors[0], socket.error)
+    assert sum(result.ok for result in results) == 1
+
+
+def test_run_returns_values(server):
+    fleet = Fleet(servers_of(server, 3))
+    values = sorted(value for _, value, error, _ in fleet.run(lambda ssh: ssh.username))
+    assert values == ["user0", "user1", "user2"]
+
+
+def test_timeout_stops_a_busy_host_with_partial_results(server):
+    fleet = Fleet(servers_of(server, 1), timeout=1)
+    result = fleet.exec_command_all(["echo first", "while true; do echo tick; sleep 0.1; done"])[0]
+    assert isinstance(result.error, socket.timeout)
+    assert [r.stdout for r in result.results] == ["first\n"]
+    assert result.elapsed < 2
+
+
+def test_timeout_counts_the_connect():
+    slow = SSHServer(latency=0.2, host_key=paramiko.ECDSAKey.generate())
+    try:
+        fleet = Fleet(servers_of(slow, 1), timeout=2)
+        result = fleet.exec_command_all("sleep 10")[0]
+    finally:
+        slow.close()
+    assert isinstance(result.error, socket.timeout)
+    # connecting alone takes well over a second through this link
+    assert result.elapsed < 3
+
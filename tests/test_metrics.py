@@ -0,0 +1,99 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+
+import pytest
+
+from conftest import connect
+from easyssh import metrics
+from easyssh.metrics import MetricsRecorder
+
+HOST = "127.0.0.1"
+
+
+@pytest.fixture
+def recorder():
+    return MetricsRecorder()
+
+
+@pytest.fixture
+def measured_ssh(server, recorder):
+    ssh = connect(server, metrics=recorder)
+    yield ssh
+    ssh.disconnect()
+
+
+def test_connect_phases(measured_ssh, recorder):
+    for name in ("tcp_probe", "tcp_connect", "kex", "auth", "sftp_init"):
+        timing = recorder.timings[("connect." + name, HOST)]
+        assert timing["count"] == 1
+        assert timing["min"] >= 0
+
+
+def test_exec(measured_ssh, recorder):
+    result = measured_ssh.exec_command_result("printf hello; exit 3", input=b"ignored")
+    assert result.exit_status == 3
+    for name in ("exec.channel_open", "exec.first_byte", "exec.exit"):
+        assert recorder.timings[(name, HOST)]["count"] == 1
+    assert recorder.timings[("exec.first_byte", HOST)]["max"] <= recorder.timings[("exec.exit", HOST)]["max"]
+    assert recorder.counters[("round_trips", HOST)] == 2
+    assert recorder.counters[("exec.bytes_received", HOST)] == 5
+    assert recorder.counters[("exec.bytes_sent", HOST)] == 7
+
+
+def test_transfers(measured_ssh, recorder, tmp_path):
+    local_path = str(tmp_path / "file")
+    with open(local_path, "wb") as f:
+        f.write(os.urandom(50000))
+    measured_ssh.upload(local_path, str(tmp_path / "remote"))
+    measured_ssh.download(str(tmp_path / "remote"), str(tmp_path / "back"))
+    assert recorder.timings[("sftp.upload", HOST)]["count"] == 1
+    assert recorder.timings[("sftp.download", HOST)]["count"] == 1
+    assert recorder.counters[("sftp.bytes_sent", HOST)] == 50000
+    assert recorder.counters[("sftp.bytes_received", HOST)] == 50000
+
+
+def test_cached_stats_are_not_round_trips(server, recorder, tmp_path):
+    ssh = connect(server, metrics=recorder, stat_cache=True)
+    try:
+        for _ in range(3):
+            assert ssh.exists(str(tmp_path))
+        with pytest.raises(IOError):
+            ssh.stat(str(tmp_path / "missing"))
+        with pytest.raises(IOError):
+            ssh.stat(str(tmp_path / "missing"))
+    finally:
+        ssh.disconnect()
+    assert recorder.counters[("round_trips", HOST)] == 2
+    assert recorder.summary()["sftp.stat"]["count"] == 2
+
+
+def test_summary(recorder):
+    recorder.phase("exec.exit", 0, 1, host="a")
+    recorder.phase("exec.exit", 0, 3, host="b")
+    recorder.increment("round_trips", 2, host="a")
+    recorder.increment("round_trips", host="b")
+    summary = recorder.summary()
+    assert summary["exec.exit"] == {"count": 2, "total": 4, "mean": 2, "min": 1, "max": 3}
+    assert summary["round_trips"] == 3
+
+
+def test_optional_backends_need_their_packages(monkeypatch):
+    monkeypatch.setattr(metrics, "prometheus_client", None)
+    monkeypatch.setattr(metrics, "otel_trace", None)
+    with pytest.raises(ImportError):
+        metrics.PrometheusMetrics()
+    with pytest.raises(ImportError):
+        metrics.OpenTelemetrySpans()
+
+
+def test_prometheus():
+    prometheus_client = pytest.importorskip("prometheus_client")
+    registry = prometheus_client.CollectorRegistry()
+    backend = metrics.PrometheusMetrics(registry)
+    backend.phase("exec.exit", 0, 2, host=HOST)
+    backend.increment("round_trips", 2, host=HOST)
+    assert registry.get_sample_value("easyssh_exec_exit_seconds_sum", {"host": HOST}) == 2
+    assert registry.get_sample_value("easyssh_round_trips_total", {"host": HOST}) == 2
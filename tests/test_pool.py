@@ -0,0 +1,115 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import socket
+import threading
+import time
+
+import pytest
+
+from easyssh import ConnectionPool, PoolExhausted
+
+
+def server_of(server, username="test"):
+    return {"host": "127.0.0.1", "port": server.port, "username": username, "password": "test"}
+
+
+def test_connections_are_reused_per_key(server):
+    pool = ConnectionPool()
+    with pool.connection(**server_of(server)) as first:
+        pass
+    with pool.connection(**server_of(server)) as second:
+        assert second is first
+    with pool.connection(**server_of(server, "other")) as other:
+        assert other is not first
+    assert len(pool) == 2
+    pool.close()
+    assert len(pool) == 0
+
+
+def test_an_error_discards_the_connection(server):
+    pool = ConnectionPool()
+    with pytest.raises(RuntimeError):
+        with pool.connection(**server_of(server)) as first:
+            raise RuntimeError("half read channel")
+    assert len(pool) == 0
+    assert not first.transport.is_active()
+    with pool.connection(**server_of(server)) as second:
+        assert second is not first
+    pool.close()
+
+
+def test_dead_idle_connection_is_replaced(server):
+    pool = ConnectionPool()
+    with pool.connection(**server_of(server)) as first:
+        assert ConnectionPool.is_alive(first)
+    first.transport.close()
+    assert not ConnectionPool.is_alive(first)
+    with pool.connection(**server_of(server)) as second:
+        assert second is not first
+        assert second.exec_command_result("echo ok").stdout == "ok\n"
+    assert len(pool) == 1
+    pool.close()
+
+
+def test_unanswered_keepalive_is_dead(server):
+    pool = ConnectionPool()
+    ssh = pool.acquire(**server_of(server))
+    # a peer that stopped reading: the request is sent but never answered
+    ssh.transport.global_request = lambda *args, **kwargs: time.sleep(10)
+    start = time.time()
+    assert not ConnectionPool.is_alive(ssh, timeout=0.5)
+    assert time.time() - start < 2
+    pool.discard(ssh)
+
+
+def test_idle_timeout(server):
+    pool = ConnectionPool(idle_timeout=0.2)
+    with pool.connection(**server_of(server)) as first:
+        pass
+    time.sleep(0.3)
+    with pool.connection(**server_of(server)) as second:
+        assert second is not first
+    assert not first.transport.is_active()
+    pool.close()
+
+
+def test_max_size_evicts_the_least_recently_used(server):
+    pool = ConnectionPool(max_size=2)
+    connections = []
+    for username in ("a", "b", "c"):
+        with pool.connection(**server_of(server, username)) as ssh:
+            connections.append(ssh)
+    assert len(pool) == 2
+    assert not connections[0].transport.is_active()
+    assert connections[2].transport.is_active()
+    pool.close()
+
+
+def test_exhausted_pool_waits_then_raises(server):
+    pool = ConnectionPool(max_size=1, wait_timeout=0.3)
+    ssh = pool.acquire(**server_of(server))
+    with pytest.raises(PoolExhausted):
+        pool.acquire(**server_of(server, "other"))
+
+    threading.Timer(0.1, pool.release, args=(ssh,)).start()
+    pool.wait_timeout = 5
+    other = pool.acquire(**server_of(server, "other"))
+    assert other is not ssh and len(pool) == 1
+    pool.release(other)
+    pool.close()
+
+
+def test_failed_connect_frees_its_slot(server):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    pool = ConnectionPool(max_size=1)
+    with pytest.raises(socket.error):
+        pool.acquire(host="127.0.0.1", port=port, password="x", timeout=1)
+    assert len(pool) == 0
+    with pool.connection(**server_of(server)):
+        pass
+    pool.close()
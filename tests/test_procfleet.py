@@ -0,0 +1,90 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import multiprocessing
+import os
+
+import pytest
+
+from easyssh import ProcessFleet, Telemetry
+from easyssh.procfleet import _Shards
+from test_fleet import closed_port, servers_of
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="the tests pass lambdas to the workers"
+)
+
+
+class NeedsArguments(Exception):
+    # unpickling calls NeedsArguments() without the arguments
+    def __init__(self, host, reason):
+        Exception.__init__(self, "%s: %s" % (host, reason))
+
+
+def test_run_yields_every_host(server):
+    servers = servers_of(server, 7)
+    results = list(ProcessFleet(servers, processes=3, workers=2).run(lambda ssh: (ssh.username, os.getpid())))
+    assert sorted(value[0] for _, value, error, _ in results) == sorted(server["username"] for server in servers)
+    assert all(error is None for _, _, error, _ in results)
+    pids = set(value[1] for _, value, _, _ in results)
+    assert os.getpid() not in pids and len(pids) <= 3
+    for server, value, _, _ in results:
+        assert server["username"] == value[0]
+
+
+def test_exec_command_results_come_back(server):
+    servers = servers_of(server, 2) + [{"host": "127.0.0.1", "port": closed_port(), "password": "x"}]
+    results = ProcessFleet(servers, processes=2).exec_command_all(["echo one", "false", "echo never"])
+    assert sorted(result.stdout for result in results) == ["", "one\n", "one\n"]
+    assert sum(result.error is not None for result in results) == 1
+    assert all(len(result.results) == 2 for result in results if result.error is None)
+
+
+def test_errors_that_can_not_be_sent_back(server):
+    def fail(ssh):
+        raise NeedsArguments(ssh.username, "broken")
+
+    [(_, value, error, _)] = ProcessFleet(servers_of(server, 1), processes=1).run(fail)
+    assert value is None
+    assert isinstance(error, RuntimeError) and "user0: broken" in str(error)
+
+    [(_, value, error, _)] = ProcessFleet(servers_of(server, 1), processes=1).run(lambda ssh: lambda: None)
+    assert "can not be sent back" in str(error)
+
+
+def test_dead_worker_leaves_hosts_unfinished(server):
+    results = list(ProcessFleet(servers_of(server, 2), processes=1, workers=1).run(lambda ssh: os._exit(1)))
+    assert len(results) == 2
+    assert all("no result came back" in str(error) for _, _, error, _ in results)
+
+
+def test_telemetry_of_every_process(server, tmp_path):
+    path = str(tmp_path / "file")
+    with open(path, "wb") as f:
+        f.write(os.urandom(10000))
+    telemetry = Telemetry(interval=0)
+    fleet = ProcessFleet(servers_of(server, 4), processes=2, telemetry=telemetry)
+    for _, _, error, _ in fleet.run(lambda ssh: ssh.upload(path, str(tmp_path / ssh.username))):
+        assert error is None
+    snapshot = telemetry.snapshot()
+    assert snapshot["completed"] == 4 and snapshot["active"] == 0
+    assert snapshot["bytes"] == 40000
+
+
+def test_subset_spreads_workers_over_processes(server):
+    fleet = ProcessFleet(servers_of(server, 8), processes=4, workers=32)
+    subset = fleet.subset(fleet.servers[:2], 10)
+    assert isinstance(subset, ProcessFleet)
+    assert subset.workers == 3 and subset.processes == 4
+    assert fleet.subset(fleet.servers, 1).workers == 1
+
+
+def test_shards_steal_from_the_fullest():
+    shards = _Shards(multiprocessing.get_context(), 10, 3)
+    # shards of 4, 4 and 2 hosts
+    assert [shards.take(2) for _ in range(2)] == [8, 9]
+    # shard 2 is empty, it takes from the back of shard 0
+    assert shards.take(2) == 3
+    taken = [shards.take(1) for _ in range(8)]
+    assert sorted(taken[:7]) == [0, 1, 2, 4, 5, 6, 7] and taken[7] is None
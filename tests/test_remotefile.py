@@ -0,0 +1,109 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import gc
+import os
+
+import paramiko
+import pytest
+
+from conftest import connect
+from easyssh import remotefile
+
+WINDOW = 64 * 1024
+
+
+@pytest.fixture
+def data():
+    return os.urandom(10 * WINDOW + 17)
+
+
+@pytest.fixture
+def path(tmp_path, data):
+    path = str(tmp_path / "file")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_read_with_read_ahead(ssh, path, data):
+    with ssh.open(path, "rb", read_ahead=WINDOW) as f:
+        first = f.read(100)
+        assert f._fetcher is None
+        second = f.read(200)
+        assert first + second == data[:300]
+        assert f.read() == data[300:]
+        assert f.read() == b""
+        assert f.tell() == len(data)
+
+
+def test_readinto_and_seek(ssh, path, data):
+    with ssh.open(path, "rb", read_ahead=WINDOW) as f:
+        buffer = bytearray(5 * WINDOW)
+        assert f.readinto(buffer) == len(buffer)
+        assert f.readinto(memoryview(buffer)[:10]) == 10
+        assert bytes(buffer[:10]) == data[5 * WINDOW : 5 * WINDOW + 10]
+        f.seek(3)
+        assert f.read(4) == data[3:7]
+        f.seek(-7, 2)
+        assert f.read() == data[-7:]
+        f.seek(WINDOW)
+        f.seek(10, 1)
+        assert f.tell() == WINDOW + 10
+        assert f.read(10) == data[WINDOW + 10 : WINDOW + 20]
+
+
+def test_lines(ssh, tmp_path):
+    path = str(tmp_path / "lines")
+    lines = ["line %d %s\n" % (number, "x" * (number % 50)) for number in range(20000)]
+    with open(path, "w") as f:
+        f.write("".join(lines) + "last")
+    with ssh.open(path, read_ahead=WINDOW) as f:
+        assert list(f) == lines + ["last"]
+    with ssh.open(path, "rb") as f:
+        assert f.readline() == lines[0].encode()
+        assert f.readline(3) == b"lin"
+        assert f.readlines()[-1] == b"last"
+
+
+def test_write(ssh, tmp_path, data):
+    path = str(tmp_path / "written")
+    with ssh.open(path, "wb") as f:
+        for offset in range(0, len(data), 1000):
+            f.write(data[offset : offset + 1000])
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+def test_no_spare_sessions_reads_plainly(ssh, path, data, monkeypatch):
+    def refuse(transport):
+        raise paramiko.ChannelException(1, "administratively prohibited")
+
+    monkeypatch.setattr(remotefile.paramiko.SFTPClient, "from_transport", staticmethod(refuse))
+    with ssh.open(path, "rb", read_ahead=WINDOW) as f:
+        assert f.read(10) + f.read() == data
+        assert f.read_ahead == 0
+
+
+def test_unclosed_file_releases_its_read_ahead(ssh, path):
+    f = ssh.open(path, "rb", read_ahead=WINDOW)
+    f.read(10)
+    # past the first plain read, so read-ahead starts
+    f.read(remotefile.READ_BLOCK)
+    fetcher = f._fetcher
+    assert fetcher is not None and not fetcher._stopped
+    del f
+    gc.collect()
+    assert fetcher._stopped
+
+
+def test_disconnect_stops_read_ahead(server, path):
+    ssh = connect(server)
+    f = ssh.open(path, "rb", read_ahead=WINDOW)
+    f.read(10)
+    # past the first plain read, so read-ahead starts
+    f.read(remotefile.READ_BLOCK)
+    fetcher = f._fetcher
+    ssh.disconnect()
+    assert fetcher._stopped
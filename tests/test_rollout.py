@@ -0,0 +1,96 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+
+import pytest
+
+from easyssh import Fleet
+from easyssh.fleet import count_of
+
+
+def servers_of(server, count):
+    return [
+        {"host": "127.0.0.1", "port": server.port, "username": "user%d" % number, "password": "test"}
+        for number in range(count)
+    ]
+
+
+def test_count_of():
+    assert count_of(3, 10) == 3
+    assert count_of("25%", 10) == 3
+    assert count_of("1%", 10) == 1
+    assert count_of(0, 10, minimum=0) == 0
+    assert count_of("0%", 10, minimum=0) == 0
+    with pytest.raises(ValueError):
+        count_of(0, 10)
+    with pytest.raises(ValueError):
+        count_of("0%", 10)
+
+
+def test_stages():
+    fleet = Fleet([{"host": "h%d" % number} for number in range(10)])
+    sizes = [(name, len(servers)) for name, servers in fleet.stages(canary=1, batch_size="30%")]
+    assert sizes == [("canary", 1), ("batch 1", 3), ("batch 2", 3), ("batch 3", 3)]
+    sizes = [len(servers) for _, servers in fleet.stages(canary=2, batch_size=[1, 3])]
+    assert sizes == [2, 1, 3, 3, 1]
+    assert [len(servers) for _, servers in fleet.stages(canary=0, batch_size=20)] == [10]
+
+
+def test_rollout_runs_every_stage(server):
+    stages = []
+    fleet = Fleet(servers_of(server, 5))
+    report = fleet.rollout("echo ok", canary=1, batch_size=2, on_stage=stages.append)
+    assert report.ok
+    assert [stage.name for stage in report.stages] == ["canary", "batch 1", "batch 2"]
+    assert stages == report.stages
+    assert len(report.results) == 5
+    assert all(result.stdout == "ok\n" for result in report.results)
+
+
+def test_failing_canary_stops_the_rollout(server):
+    report = Fleet(servers_of(server, 4)).rollout("false", canary=1, batch_size=1)
+    assert report.stopped and report.reason == "canary failed"
+    assert len(report.stages) == 1
+    assert len(report.skipped) == 3
+    assert not report.ok
+
+
+def test_max_failures(server):
+    def func(ssh):
+        if ssh.username in ("user1", "user2"):
+            raise RuntimeError("broken host")
+        return ssh.username
+
+    fleet = Fleet(servers_of(server, 6))
+    report = fleet.rollout(func=func, canary=1, batch_size=2, max_failures=1)
+    assert report.stopped
+    assert [len(stage.failed) for stage in report.stages] == [0, 2]
+    assert len(report.skipped) == 3
+
+    report = fleet.rollout(func=func, canary=1, batch_size=2, max_failures="50%")
+    assert not report.stopped and len(report.failed) == 2
+    assert sorted(result.value for result in report.results if result.error is None) == [
+        "user0",
+        "user3",
+        "user4",
+        "user5",
+    ]
+
+
+def test_empty_fleet():
+    report = Fleet([]).rollout("true")
+    assert report.ok and report.stages == [] and report.results == []
+    assert str(report).endswith("0 hosts, 0 failed in 0.00s")
+
+
+def test_concurrency_zero_still_runs(server):
+    report = Fleet(servers_of(server, 2), workers=0).rollout("true", canary=0)
+    assert report.ok and len(report.results) == 2
+
+
+def test_commands_or_func():
+    with pytest.raises(ValueError):
+        Fleet([]).rollout()
+    with pytest.raises(ValueError):
+        Fleet([]).rollout("true", func=len)
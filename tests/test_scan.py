@@ -0,0 +1,107 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import socket
+
+import pytest
+
+from easyssh import Fleet, Resolver, scan
+from server import SSHServer
+from test_fleet import closed_port, servers_of
+
+
+@pytest.fixture
+def silent_port():
+    # accepts connections but never says anything
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(8)
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+class FailingResolver(Resolver):
+    def resolve(self, host, port):
+        if host == "nowhere":
+            raise socket.gaierror("no such host")
+        return Resolver.resolve(self, host, port)
+
+
+def test_states(server, silent_port):
+    servers = [
+        ("127.0.0.1", server.port),
+        {"host": "127.0.0.1", "port": closed_port()},
+        ("127.0.0.1", silent_port),
+        ("nowhere", 22),
+    ]
+    report = scan(servers, timeout=0.5, resolver=FailingResolver())
+    results = dict(((result.host, result.port), result) for result in report.results)
+    assert [result.port for result in report.reachable] == [server.port]
+    reachable = results[("127.0.0.1", server.port)]
+    assert reachable.banner.startswith("SSH-2.0-")
+    assert reachable.address == "127.0.0.1"
+    assert reachable.connect_time <= reachable.elapsed
+    assert len(report.unreachable) == 3
+    assert results[("127.0.0.1", silent_port)].error == "no ssh banner after 0.5s"
+    assert results[("nowhere", 22)].error.startswith("name resolution failed")
+    assert report.alive() == set([("127.0.0.1", server.port)])
+    assert "1 reachable, 0 slow, 3 unreachable" in str(report)
+
+
+def test_without_banner_a_connect_is_enough(silent_port):
+    report = scan([("127.0.0.1", silent_port)], banner=False)
+    assert len(report.reachable) == 1
+    assert report.reachable[0].banner is None
+
+
+def test_slow_hosts_are_alive():
+    server = SSHServer(latency=0.2)
+    try:
+        report = scan([("127.0.0.1", server.port)], slow=0.1)
+    finally:
+        server.close()
+    assert len(report.slow) == 1
+    assert report.alive() == set([("127.0.0.1", server.port)])
+
+
+def test_total_timeout(silent_port):
+    report = scan([("127.0.0.1", silent_port)], timeout=5, total_timeout=0.3)
+    assert report.elapsed < 2
+    assert report.unreachable[0].error == "scan stopped after 0.3s"
+
+
+def test_duplicates_are_scanned_once(server):
+    report = scan([("127.0.0.1", server.port)] * 3 + [{"host": "127.0.0.1", "port": server.port}])
+    assert len(report.results) == 1
+
+
+def test_resolver_caches_answers(monkeypatch):
+    calls = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting(host, *args):
+        calls.append(host)
+        if host == "nowhere":
+            raise socket.gaierror("no such host")
+        return getaddrinfo(host, *args)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting)
+    resolver = Resolver()
+    assert resolver.resolve("127.0.0.1", 22) == resolver.resolve("127.0.0.1", 22)
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            resolver.resolve("nowhere", 22)
+    assert calls == ["127.0.0.1", "nowhere", "nowhere"]
+    resolver.clear()
+    resolver.resolve("127.0.0.1", 22)
+    assert calls.count("127.0.0.1") == 2
+
+
+def test_preflight_drops_unreachable_hosts(server):
+    servers = servers_of(server, 2) + [{"host": "127.0.0.1", "port": closed_port(), "password": "x"}]
+    fleet = Fleet(servers)
+    report = fleet.preflight(timeout=1)
+    assert len(report.unreachable) == 1
+    assert fleet.servers == servers[:2]
+    assert all(result.ok for result in fleet.exec_command_all("true"))
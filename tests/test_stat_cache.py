@@ -0,0 +1,106 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+
+
+def test_stat_is_answered_from_memory(cached_ssh, tmp_path):
+    path = str(tmp_path / "file")
+    open(path, "w").close()
+    assert cached_ssh.exists(path)
+    misses = cached_ssh.stat_cache.misses
+    assert cached_ssh.isfile(path)
+    assert cached_ssh.stat_cache.misses == misses
+    assert cached_ssh.stat_cache.hits >= 1
+
+    # changed behind the cache's back: still cached until forgotten
+    os.remove(path)
+    assert cached_ssh.exists(path)
+    cached_ssh.forget_stat(path)
+    assert not cached_ssh.exists(path)
+
+
+def test_missing_paths_are_cached(cached_ssh, tmp_path):
+    path = str(tmp_path / "later")
+    assert not cached_ssh.exists(path)
+    open(path, "w").close()
+    assert not cached_ssh.exists(path)
+    cached_ssh.forget_stat(path)
+    assert cached_ssh.exists(path)
+
+
+def test_changes_through_the_connection_invalidate(cached_ssh, tmp_path):
+    path, moved = str(tmp_path / "file"), str(tmp_path / "moved")
+    with open(path, "w") as f:
+        f.write("abc")
+    assert cached_ssh.stat(path).st_size == 3
+
+    with cached_ssh.open(path, "w") as f:
+        f.write(b"abcdef")
+    assert cached_ssh.stat(path).st_size == 6
+
+    cached_ssh.chmod(path, 0o600)
+    assert cached_ssh.stat(path).st_mode & 0o777 == 0o600
+
+    assert not cached_ssh.exists(moved)
+    cached_ssh.rename(path, moved)
+    assert cached_ssh.exists(moved) and not cached_ssh.exists(path)
+
+    assert cached_ssh.remove(moved)
+    misses = cached_ssh.stat_cache.misses
+    assert not cached_ssh.exists(moved)
+    assert cached_ssh.stat_cache.misses == misses
+
+
+def test_tree_invalidation(cached_ssh, tmp_path):
+    folder = str(tmp_path / "folder")
+    os.makedirs(os.path.join(folder, "sub"))
+    inner = os.path.join(folder, "sub", "file")
+    open(inner, "w").close()
+    assert cached_ssh.exists(inner)
+    cached_ssh.rm_tree(folder)
+    assert not cached_ssh.exists(inner)
+    assert not cached_ssh.exists(folder)
+
+
+def test_prefetch_answers_the_whole_listing(cached_ssh, tmp_path):
+    for name in ("a", "b"):
+        open(str(tmp_path / name), "w").close()
+    cached_ssh.prefetch_stat(str(tmp_path))
+    misses = cached_ssh.stat_cache.misses
+    assert cached_ssh.isfile(str(tmp_path / "a"))
+    assert cached_ssh.isfile(str(tmp_path / "b"))
+    assert not cached_ssh.exists(str(tmp_path / "c"))
+    assert cached_ssh.stat_cache.misses == misses
+
+
+def test_folders_created_by_mkdir_p_are_forgotten(cached_ssh, tmp_path):
+    folder = str(tmp_path / "d")
+    assert not cached_ssh.exists(folder + "/a")
+    assert not cached_ssh.exists(folder)
+    cached_ssh.prefetch_stat(str(tmp_path))
+    cached_ssh.mkdir_trees([folder + "/a/b"])
+    assert cached_ssh.isdir(folder + "/a")
+    assert cached_ssh.isdir(folder)
+    assert cached_ssh.exists(folder + "/a/b")
+
+
+def test_mkdir_tree_forgets_parents(cached_ssh, tmp_path):
+    folder = str(tmp_path / "x")
+    assert not cached_ssh.exists(folder)
+    assert cached_ssh.mkdir_tree(folder + "/y/z")
+    assert cached_ssh.isdir(folder)
+
+
+def test_upload_forgets_the_created_folder(cached_ssh, tmp_path):
+    local = str(tmp_path / "local")
+    with open(local, "w") as f:
+        f.write("data")
+    folder = str(tmp_path / "remote" / "sub")
+    assert not cached_ssh.isdir(folder)
+    assert not cached_ssh.exists(str(tmp_path / "remote"))
+    cached_ssh.upload(local, folder + "/file")
+    assert cached_ssh.isdir(folder)
+    assert cached_ssh.isdir(str(tmp_path / "remote"))
+    assert cached_ssh.stat(folder + "/file").st_size == 4
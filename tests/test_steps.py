@@ -0,0 +1,118 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+
+import pytest
+
+from easyssh import SSHConnection, Step, StepEngine, StepStore
+from test_fleet import closed_port, servers_of
+
+
+def marker_step(path, name="marker"):
+    return Step(name, "test -f %s" % path, "touch %s" % path)
+
+
+def unconnected(server):
+    return SSHConnection(host="127.0.0.1", port=server.port, username="steps", password="test")
+
+
+def test_apply_then_skip_from_the_record(server, tmp_path):
+    first, second = str(tmp_path / "first"), str(tmp_path / "second")
+    open(first, "w").close()
+    engine = StepEngine([marker_step(first, "first"), marker_step(second, "second")], store=StepStore())
+    ssh = unconnected(server)
+    report = engine.run(ssh)
+    assert report.statuses == [("first", "ok"), ("second", "changed")]
+    assert report.contacted and report.ok
+    assert os.path.exists(second)
+    assert not ssh.transport.is_active()
+
+    os.remove(second)
+    report = engine.run(ssh)
+    assert report.statuses == [("first", "cached"), ("second", "cached")]
+    assert not report.contacted
+    assert not os.path.exists(second)
+
+    report = engine.run(ssh, force=True)
+    assert report.changed == ["second"]
+
+
+def test_changed_steps_run_again(server, tmp_path):
+    path = str(tmp_path / "file")
+    store = StepStore()
+    StepEngine([marker_step(path)], store=store).run(unconnected(server))
+    edited = Step("marker", "grep -q two %s" % path, "echo two > %s" % path)
+    report = StepEngine([edited], store=store).run(unconnected(server))
+    assert report.changed == ["marker"]
+    assert StepEngine([edited], store=store, ttl=0).run(unconnected(server)).statuses == [("marker", "ok")]
+
+
+def test_dry_run(ssh, tmp_path):
+    path = str(tmp_path / "file")
+    report = StepEngine([marker_step(path)], store=StepStore()).run(ssh, dry_run=True)
+    assert report.statuses == [("marker", "pending")]
+    assert not os.path.exists(path)
+
+
+def test_failures(ssh, tmp_path):
+    after = str(tmp_path / "after")
+    steps = [
+        Step("broken", "false", ["true", "sh -c 'echo bad >&2; exit 4'"]),
+        Step("no effect", "false", "true"),
+        marker_step(after, "after"),
+    ]
+    store = StepStore()
+    report = StepEngine(steps, store=store).run(ssh)
+    assert report.statuses == [("broken", "failed"), ("no effect", "skipped"), ("after", "skipped")]
+    assert "exited with 4: bad" in report.errors["broken"]
+    assert not report.ok and not os.path.exists(after)
+
+    report = StepEngine(steps, store=store).run(ssh, stop_on_error=False)
+    assert report.failed == ["broken", "no effect"]
+    assert report.errors["no effect"] == "check still fails after apply"
+    assert report.changed == ["after"]
+    assert set(store.get(ssh)) == set(["after"])
+
+
+def test_function_apply(ssh, tmp_path):
+    path = str(tmp_path / "file")
+
+    def apply(ssh):
+        with ssh.open(path, "w") as f:
+            f.write("written")
+
+    report = StepEngine([Step("write", "test -s %s" % path, apply, "v1")], store=StepStore()).run(ssh)
+    assert report.changed == ["write"]
+    with open(path) as f:
+        assert f.read() == "written"
+
+
+def test_records_persist_in_files(server, tmp_path):
+    path = str(tmp_path / "file")
+    folder = str(tmp_path / "records")
+    StepEngine([marker_step(path)], store=StepStore(folder)).run(unconnected(server))
+    assert len(os.listdir(folder)) == 1
+    report = StepEngine([marker_step(path)], store=StepStore(folder)).run(unconnected(server))
+    assert report.statuses == [("marker", "cached")]
+    # a record of another user is another host
+    other = SSHConnection(host="127.0.0.1", port=server.port, username="other", password="test")
+    assert StepEngine([marker_step(path)], store=StepStore(folder)).run(other).contacted
+
+
+def test_run_fleet(server, tmp_path):
+    servers = servers_of(server, 2) + [{"host": "127.0.0.1", "port": closed_port(), "password": "x", "timeout": 5}]
+    steps = [marker_step(str(tmp_path / "file")), Step("second", "true", "true")]
+    reports = dict(
+        ((host, report.contacted, report.ok), report)
+        for host, report in StepEngine(steps, store=StepStore()).run_fleet(servers)
+    )
+    assert len(reports) == 2
+    failed = reports[("127.0.0.1", True, False)]
+    assert failed.statuses == [("marker", "failed"), ("second", "skipped")]
+
+
+def test_step_names_are_unique():
+    with pytest.raises(ValueError):
+        StepEngine([Step("same", "true", "true"), Step("same", "false", "true")])
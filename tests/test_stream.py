@@ -0,0 +1,125 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import socket
+import threading
+import time
+
+import pytest
+
+from conftest import connect
+from easyssh.ssh import CommandStream
+
+
+def test_output_interleaves_in_arrival_order(ssh):
+    stream = ssh.exec_command_stream(
+        "echo one; sleep 0.2; echo two >&2; sleep 0.2; echo three"
+    )
+    assert list(stream) == [("stdout", "one\n"), ("stderr", "two\n"), ("stdout", "three\n")]
+    assert stream.exit_status == 0
+    assert stream.stdout == "one\nthree\n"
+    assert stream.stderr == "two\n"
+
+
+def test_lines_are_joined_across_chunks(ssh):
+    stream = ssh.exec_command_stream("printf 'par'; sleep 0.2; printf 'tial\\nlast'")
+    assert list(stream) == [("stdout", "partial\n"), ("stdout", "last")]
+
+
+def test_callbacks(ssh):
+    seen = []
+    result = ssh.exec_command_stream(
+        "echo out; echo err >&2; exit 3", on_stdout=seen.append, on_stderr=seen.append
+    ).wait()
+    assert sorted(seen) == ["err\n", "out\n"]
+    assert result.exit_status == 3
+
+
+def test_max_output_keeps_the_tail(ssh):
+    stream = ssh.exec_command_stream(
+        "head -c 100000 /dev/zero | tr '\\0' x; echo end", max_output=1000
+    )
+    count = sum(len(text) for name, text in stream)
+    assert count == 100004
+    assert len(stream.stdout) == 1000
+    assert stream.stdout.endswith("xend\n")
+    assert stream.tails["stdout"].truncated == 100004 - 1000
+
+
+def test_unlimited_output(ssh):
+    result = ssh.exec_command_result("head -c 3000000 /dev/zero | tr '\\0' x")
+    assert result.stdout == "x" * 3000000
+
+
+def test_input(ssh):
+    result = ssh.exec_command_result("wc -c", input=b"12345")
+    assert result.stdout.strip() == "5"
+
+
+def test_timeout_without_output(ssh):
+    with pytest.raises(socket.timeout):
+        ssh.exec_command_stream("sleep 5", timeout=0.5).wait()
+
+
+def test_max_time_with_output(ssh):
+    with pytest.raises(socket.timeout):
+        ssh.exec_command_stream(
+            "while true; do echo tick; sleep 0.1; done", timeout=10, max_time=0.5
+        ).wait()
+
+
+class LateEofChannel:
+    """
+    A channel whose last stdout chunk and eof both arrive after stdout was
+    found empty, while stderr is checked.
+    """
+
+    def __init__(self):
+        self.eof_received = False
+        self.status_event = threading.Event()
+        self.data = []
+
+    def recv_ready(self):
+        return bool(self.data)
+
+    def recv(self, size):
+        return self.data.pop(0)
+
+    def recv_stderr_ready(self):
+        if not self.eof_received:
+            self.data.append(b"tail\n")
+            self.eof_received = True
+        return False
+
+    def exit_status_ready(self):
+        return self.eof_received
+
+    def recv_exit_status(self):
+        return 0
+
+    def fileno(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+def test_output_sent_just_before_eof_is_kept():
+    assert CommandStream(LateEofChannel(), "late").wait().stdout == "tail\n"
+
+
+def test_exec_commands_runs_in_parallel(ssh):
+    results = list(ssh.exec_commands(["sleep 0.5; echo %d" % i for i in range(5)], max_sessions=5))
+    assert sorted(result.stdout for result in results) == ["%d\n" % i for i in range(5)]
+    assert max(result.elapsed for result in results) < 2
+
+
+def test_connection_closed_under_a_running_command(server):
+    ssh = connect(server)
+    stream = ssh.exec_command_stream("sleep 5")
+    threading.Timer(0.3, ssh.disconnect).start()
+    start = time.time()
+    with pytest.raises(EOFError):
+        stream.wait()
+    assert time.time() - start < 2
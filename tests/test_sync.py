@@ -0,0 +1,134 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+
+import pytest
+
+
+def write(path, data):
+    folder = os.path.dirname(path)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(path, "w") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def folders(tmp_path):
+    local, remote = str(tmp_path / "local"), str(tmp_path / "remote")
+    write(os.path.join(local, "a.txt"), "a")
+    write(os.path.join(local, "sub", "b.txt"), "b")
+    return local, remote
+
+
+def test_upload_copies_only_changes(ssh, folders):
+    local, remote = folders
+    report = ssh.sync_folder(local, remote)
+    assert sorted(report.added) == ["a.txt", "sub/b.txt"]
+    assert read(os.path.join(remote, "sub", "b.txt")) == "b"
+
+    write(os.path.join(local, "a.txt"), "changed")
+    report = ssh.sync_folder(local, remote)
+    assert report.added == [] and report.changed == ["a.txt"]
+    assert report.unchanged == ["sub/b.txt"]
+    assert read(os.path.join(remote, "a.txt")) == "changed"
+
+
+def test_delete_removes_extra_destination_files(ssh, folders):
+    local, remote = folders
+    ssh.sync_folder(local, remote)
+    write(os.path.join(remote, "extra.txt"), "x")
+
+    report = ssh.sync_folder(local, remote)
+    assert report.deleted == []
+    assert os.path.exists(os.path.join(remote, "extra.txt"))
+
+    report = ssh.sync_folder(local, remote, delete=True)
+    assert report.deleted == ["extra.txt"]
+    assert not os.path.exists(os.path.join(remote, "extra.txt"))
+    assert sorted(os.listdir(remote)) == ["a.txt", "sub"]
+
+
+def test_dry_run_changes_nothing(ssh, folders):
+    local, remote = folders
+    ssh.sync_folder(local, remote)
+    write(os.path.join(local, "new.txt"), "new")
+    write(os.path.join(remote, "extra.txt"), "x")
+
+    report = ssh.sync_folder(local, remote, delete=True, dry_run=True)
+    assert report.added == ["new.txt"]
+    assert report.deleted == ["extra.txt"]
+    assert report.bytes == 3
+    assert str(report).endswith("unchanged, 3 bytes in %.2fs" % report.elapsed)
+    assert str(report).startswith("+ new.txt")
+    assert not os.path.exists(os.path.join(remote, "new.txt"))
+    assert os.path.exists(os.path.join(remote, "extra.txt"))
+
+
+def test_download(ssh, folders, tmp_path):
+    local, remote = folders
+    ssh.sync_folder(local, remote)
+    back = str(tmp_path / "back")
+    report = ssh.sync_folder(back, remote, direction="download")
+    assert sorted(report.added) == ["a.txt", "sub/b.txt"]
+    assert read(os.path.join(back, "sub", "b.txt")) == "b"
+
+
+def test_missing_source_raises_instead_of_deleting(ssh, folders, tmp_path):
+    local, remote = folders
+    with pytest.raises(IOError):
+        ssh.sync_folder(local, str(tmp_path / "typo"), direction="download", delete=True)
+    assert sorted(os.listdir(local)) == ["a.txt", "sub"]
+
+    ssh.sync_folder(local, remote)
+    with pytest.raises(IOError):
+        ssh.sync_folder(str(tmp_path / "typo"), remote, delete=True)
+    assert sorted(os.listdir(remote)) == ["a.txt", "sub"]
+
+
+def test_bad_direction(ssh, folders):
+    with pytest.raises(ValueError):
+        ssh.sync_folder(folders[0], folders[1], direction="sideways")
+
+
+def fail_remote(ssh, monkeypatch, prefix, message):
+    run = ssh.exec_command_result
+
+    def failing(command, **kwargs):
+        if command.startswith(prefix):
+            command = "cat > /dev/null; echo %s >&2; exit 1" % message
+        return run(command, **kwargs)
+
+    monkeypatch.setattr(ssh, "exec_command_result", failing)
+
+
+def test_failed_remote_delete_raises(ssh, folders, monkeypatch):
+    local, remote = folders
+    ssh.sync_folder(local, remote)
+    write(os.path.join(remote, "extra.txt"), "x")
+    fail_remote(ssh, monkeypatch, "xargs -0 rm", "cannot-remove")
+    with pytest.raises(IOError) as error:
+        ssh.sync_folder(local, remote, delete=True)
+    assert "cannot-remove" in str(error.value)
+
+
+def test_failed_mtime_update_raises(ssh, folders, monkeypatch):
+    local, remote = folders
+    fail_remote(ssh, monkeypatch, "sh -s", "cannot-touch")
+    with pytest.raises(IOError) as error:
+        ssh.sync_folder(local, remote)
+    assert "cannot-touch" in str(error.value)
+
+
+def test_mtimes_are_synced(ssh, folders):
+    local, remote = folders
+    os.utime(os.path.join(local, "a.txt"), (1000000000, 1000000000))
+    ssh.sync_folder(local, remote)
+    assert int(os.stat(os.path.join(remote, "a.txt")).st_mtime) == 1000000000
@@ -0,0 +1,85 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+import shutil
+import stat
+
+import pytest
+
+from conftest import connect
+from easyssh import transfer
+
+COMPRESSIONS = [None, "gzip"]
+if transfer.zstandard is not None and shutil.which("zstd"):
+    COMPRESSIONS.append("zstd")
+
+
+@pytest.fixture
+def folder(tmp_path):
+    root = tmp_path / "source"
+    (root / "sub" / "empty").mkdir(parents=True)
+    for number in range(50):
+        (root / "sub" / ("file%d.txt" % number)).write_text("line\n" * number)
+    (root / "run.sh").write_text("#!/bin/sh\n")
+    os.chmod(str(root / "run.sh"), 0o750)
+    os.symlink("sub/file1.txt", str(root / "link"))
+    return str(root)
+
+
+def snapshot(folder):
+    found = {}
+    for root, folders, files in os.walk(folder):
+        for name in folders + files:
+            path = os.path.join(root, name)
+            st = os.lstat(path)
+            if stat.S_ISLNK(st.st_mode):
+                value = ("link", os.readlink(path))
+            elif stat.S_ISDIR(st.st_mode):
+                value = ("dir",)
+            else:
+                with open(path) as f:
+                    value = ("file", f.read(), stat.S_IMODE(st.st_mode))
+            found[os.path.relpath(path, folder)] = value
+    return found
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_upload_folder_tar(ssh, folder, tmp_path, compression):
+    remote = str(tmp_path / "remote" / "deeper")
+    ssh.upload_folder_tar(folder, remote, compression=compression)
+    assert snapshot(remote) == snapshot(folder)
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_download_folder_tar(ssh, folder, tmp_path, compression):
+    local = str(tmp_path / "local")
+    ssh.download_folder_tar(folder, local, compression=compression)
+    assert snapshot(local) == snapshot(folder)
+
+
+def test_download_of_a_missing_folder_raises(ssh, tmp_path):
+    with pytest.raises(IOError):
+        ssh.download_folder_tar(str(tmp_path / "missing"), str(tmp_path / "local"))
+
+
+def test_upload_into_a_file_raises(ssh, folder, tmp_path):
+    blocker = str(tmp_path / "blocker")
+    open(blocker, "w").close()
+    with pytest.raises(IOError):
+        ssh.upload_folder_tar(folder, blocker + "/sub")
+
+
+def test_unknown_compression(ssh, folder, tmp_path):
+    with pytest.raises(ValueError):
+        ssh.upload_folder_tar(folder, str(tmp_path / "remote"), compression="lz4")
+
+
+def test_compressed_connection(server, folder, tmp_path):
+    ssh = connect(server, compress=True)
+    # offered; this server does not take it up, so the connection must still work
+    assert "zlib@openssh.com" in ssh.transport.get_security_options().compression
+    ssh.upload_folder(folder, str(tmp_path / "remote"))
+    assert ssh.exec_command_result("echo ok").stdout == "ok\n"
+    ssh.disconnect()
@@ -0,0 +1,121 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import io
+import json
+import logging
+import os
+
+import pytest
+
+from conftest import connect
+from easyssh import JsonSink, LoggingSink, Telemetry, TerminalSink
+
+
+class ListSink:
+    def __init__(self):
+        self.snapshots = []
+
+    def emit(self, snapshot):
+        self.snapshots.append(snapshot)
+
+
+@pytest.fixture
+def files(tmp_path):
+    pairs = []
+    for index in range(4):
+        path = str(tmp_path / ("file%d" % index))
+        with open(path, "wb") as f:
+            f.write(os.urandom(100000 * (index + 1)))
+        pairs.append((path, str(tmp_path / ("copy%d" % index))))
+    return pairs
+
+
+def test_counts_uploads_and_downloads(server, files, tmp_path):
+    sink = ListSink()
+    telemetry = Telemetry([sink], interval=0)
+    ssh = connect(server, telemetry=telemetry)
+    try:
+        ssh.upload_files(files, workers=2)
+        ssh.download(files[0][1], str(tmp_path / "back"))
+    finally:
+        ssh.disconnect()
+    telemetry.close()
+    size = sum(os.path.getsize(local) for local, _ in files)
+    final = sink.snapshots[-1]
+    assert final["final"]
+    assert final["bytes"] == final["total"] == size + os.path.getsize(files[0][0])
+    assert final["completed"] == 5
+    assert final["active"] == final["failed"] == 0
+    assert final["hosts"]["127.0.0.1"]["completed"] == 5
+    assert all(not snapshot["final"] for snapshot in sink.snapshots[:-1])
+
+
+def test_counts_chunked_transfers(server, files, tmp_path):
+    telemetry = Telemetry([ListSink()], interval=0)
+    ssh = connect(server, telemetry=telemetry)
+    try:
+        local_path, remote_path = files[-1]
+        ssh.upload_large(local_path, remote_path, chunk_size=65536)
+    finally:
+        ssh.disconnect()
+    snapshot = telemetry.snapshot()
+    assert snapshot["bytes"] == snapshot["total"] == os.path.getsize(local_path)
+    assert snapshot["completed"] == 1
+
+
+def test_failed_transfer(server, tmp_path):
+    telemetry = Telemetry()
+    ssh = connect(server, telemetry=telemetry)
+    try:
+        with pytest.raises(IOError):
+            ssh.download(str(tmp_path / "missing"), str(tmp_path / "copy"))
+    finally:
+        ssh.disconnect()
+    snapshot = telemetry.snapshot()
+    assert snapshot["failed"] == 1
+    assert snapshot["completed"] == snapshot["active"] == 0
+
+
+def test_reports_at_most_once_per_interval():
+    sink = ListSink()
+    telemetry = Telemetry([sink], interval=3600)
+    with telemetry.transfer("host", "file", 100) as transfer:
+        for _ in range(10):
+            transfer.add(10)
+    assert len(sink.snapshots) == 1
+    telemetry.close()
+    assert len(sink.snapshots) == 2
+    assert sink.snapshots[-1]["bytes"] == 100
+
+
+def test_merge_other_processes():
+    telemetry = Telemetry()
+    other = Telemetry()
+    with other.transfer("remote", "file", 50) as transfer:
+        transfer.add(20)
+        telemetry.merge("worker", other.snapshot())
+        assert telemetry.snapshot()["active"] == 1
+        assert telemetry.snapshot()["bytes"] == 20
+        transfer.add(30)
+    telemetry.merge("worker", other.snapshot(final=True))
+    snapshot = telemetry.snapshot()
+    assert snapshot["active"] == 0
+    assert snapshot["bytes"] == snapshot["total"] == 50
+    assert snapshot["hosts"]["remote"]["completed"] == 1
+
+
+def test_sinks(tmp_path, caplog):
+    stream = io.StringIO()
+    path = str(tmp_path / "telemetry.json")
+    telemetry = Telemetry([TerminalSink(stream), LoggingSink(), JsonSink(path)])
+    with caplog.at_level(logging.INFO, logger="easyssh.telemetry"):
+        with telemetry.transfer("host", "file", 2048) as transfer:
+            transfer.add(2048)
+        telemetry.close()
+    assert stream.getvalue().endswith("2.0KB/2.0KB 0.0B/s eta --:--, 0 active, 1 done, 0 failed\n")
+    assert caplog.records[-1].telemetry["completed"] == 1
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[-1]["final"] and lines[-1]["bytes"] == 2048
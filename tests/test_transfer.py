@@ -0,0 +1,158 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+import threading
+
+import pytest
+
+from conftest import connect
+from easyssh.transfer import Journal, journal_file, journal_identity
+
+CHUNK = 64 * 1024
+SIZE = 4 * CHUNK + 123
+
+
+@pytest.fixture
+def data():
+    return os.urandom(SIZE)
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def journal(ssh, local_path, remote_path, direction, chunk_size=CHUNK):
+    source = local_path if direction == "upload" else remote_path
+    return Journal(
+        journal_file(ssh, local_path, direction),
+        journal_identity(ssh, remote_path, os.stat(source), chunk_size),
+    )
+
+
+def test_upload_large(ssh, tmp_path, data):
+    local, remote = str(tmp_path / "local"), str(tmp_path / "remote" / "file")
+    write(local, data)
+    ssh.upload_large(local, remote, chunk_size=CHUNK)
+    assert read(remote) == data
+    assert not os.path.exists(journal_file(ssh, local, "upload"))
+
+
+def test_upload_large_resumes(ssh, tmp_path, data):
+    local, remote = str(tmp_path / "local"), str(tmp_path / "remote")
+    write(local, data)
+    # an earlier run sent ranges 0 and 2; their bytes on the server are not sent again
+    write(remote, b"x" * SIZE)
+    record = journal(ssh, local, remote, "upload")
+    record.mark(0)
+    record.mark(2)
+
+    ssh.upload_large(local, remote, chunk_size=CHUNK, check=False)
+    uploaded = read(remote)
+    assert uploaded[:CHUNK] == b"x" * CHUNK
+    assert uploaded[CHUNK : 2 * CHUNK] == data[CHUNK : 2 * CHUNK]
+    assert uploaded[2 * CHUNK : 3 * CHUNK] == b"x" * CHUNK
+    assert uploaded[3 * CHUNK :] == data[3 * CHUNK :]
+    assert not os.path.exists(journal_file(ssh, local, "upload"))
+
+
+def test_upload_large_check_catches_a_bad_resume(ssh, tmp_path, data):
+    local, remote = str(tmp_path / "local"), str(tmp_path / "remote")
+    write(local, data)
+    write(remote, b"x" * SIZE)
+    journal(ssh, local, remote, "upload").mark(0)
+    with pytest.raises(IOError):
+        ssh.upload_large(local, remote, chunk_size=CHUNK)
+    # the journal went with the failed check, so a retry sends everything
+    ssh.upload_large(local, remote, chunk_size=CHUNK)
+    assert read(remote) == data
+
+
+def test_upload_large_ignores_a_journal_of_another_transfer(ssh, tmp_path, data):
+    local, remote = str(tmp_path / "local"), str(tmp_path / "remote")
+    write(local, data)
+    write(remote, b"x" * SIZE)
+    journal(ssh, local, remote, "upload", CHUNK * 2).mark(0)
+    ssh.upload_large(local, remote, chunk_size=CHUNK)
+    assert read(remote) == data
+
+
+def test_upload_large_to_many_hosts_at_once(server, tmp_path, data):
+    local = str(tmp_path / "local")
+    write(local, data)
+    # the same server under different users stands in for different hosts
+    connections = [connect(server, username="user%d" % number) for number in range(6)]
+    # one host's journal must not let another skip ranges it never received
+    journal(connections[0], local, str(tmp_path / "remote0"), "upload").mark(0)
+    errors = []
+
+    def upload(number, ssh):
+        remote = str(tmp_path / ("remote%d" % number))
+        write(remote, b"x" * SIZE)
+        try:
+            ssh.upload_large(local, remote, chunk_size=CHUNK, workers=2, check=False)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=upload, args=item) for item in enumerate(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for ssh in connections:
+        ssh.disconnect()
+    assert errors == []
+    assert read(str(tmp_path / "remote0"))[:CHUNK] == b"x" * CHUNK
+    for number in range(1, 6):
+        assert read(str(tmp_path / ("remote%d" % number))) == data
+    assert sorted(os.listdir(str(tmp_path))) == ["local"] + ["remote%d" % number for number in range(6)]
+
+
+def test_download_large_check_failure_starts_over(ssh, tmp_path, data):
+    remote, local = str(tmp_path / "remote"), str(tmp_path / "local")
+    write(remote, data)
+    write(local, b"x" * SIZE)
+    journal(ssh, local, remote, "download").mark(0)
+    with pytest.raises(IOError):
+        ssh.download_large(remote, local, chunk_size=CHUNK)
+    ssh.download_large(remote, local, chunk_size=CHUNK)
+    assert read(local) == data
+
+
+def test_download_large(ssh, tmp_path, data):
+    remote, local = str(tmp_path / "remote"), str(tmp_path / "local" / "file")
+    write(remote, data)
+    ssh.download_large(remote, local, chunk_size=CHUNK)
+    assert read(local) == data
+    assert not os.path.exists(journal_file(ssh, local, "download"))
+
+
+def test_download_large_resumes(ssh, tmp_path, data):
+    remote, local = str(tmp_path / "remote"), str(tmp_path / "local")
+    write(remote, data)
+    write(local, b"x" * SIZE)
+    journal(ssh, local, remote, "download").mark(1)
+
+    ssh.download_large(remote, local, chunk_size=CHUNK, check=False)
+    downloaded = read(local)
+    assert downloaded[:CHUNK] == data[:CHUNK]
+    assert downloaded[CHUNK : 2 * CHUNK] == b"x" * CHUNK
+    assert downloaded[2 * CHUNK :] == data[2 * CHUNK :]
+    assert not os.path.exists(journal_file(ssh, local, "download"))
+
+
+def test_download_large_starts_over_without_the_local_file(ssh, tmp_path, data):
+    remote, local = str(tmp_path / "remote"), str(tmp_path / "local")
+    write(remote, data)
+    record = journal(ssh, local, remote, "download")
+    for index in range(5):
+        record.mark(index)
+    ssh.download_large(remote, local, chunk_size=CHUNK)
+    assert read(local) == data
@@ -0,0 +1,73 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+import stat
+
+import pytest
+
+
+def make_tree(folder, count=20):
+    for number in range(count):
+        sub = os.path.join(folder, "sub%d" % (number % 3))
+        if not os.path.exists(sub):
+            os.makedirs(sub)
+        with open(os.path.join(sub, "file%d" % number), "w") as f:
+            f.write("x" * number)
+
+
+def tree(folder):
+    found = {}
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path) as f:
+                found[os.path.relpath(path, folder)] = (f.read(), stat.S_IMODE(os.stat(path).st_mode))
+    return found
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_upload_folder(ssh, tmp_path, workers):
+    local, remote = str(tmp_path / "local"), str(tmp_path / "remote")
+    make_tree(local)
+    ssh.upload_folder(local, remote, workers=workers, mode=0o640)
+    uploaded = tree(remote)
+    assert sorted(uploaded) == sorted(tree(local))
+    for path, (data, mode) in uploaded.items():
+        assert data == tree(local)[path][0]
+        assert mode == 0o640
+
+
+def test_download_folder(ssh, tmp_path):
+    remote, local = str(tmp_path / "remote"), str(tmp_path / "local")
+    make_tree(remote)
+    ssh.download_folder(remote, local, workers=4)
+    assert sorted(tree(local)) == sorted(tree(remote))
+
+
+def test_mkdir_trees_failure_raises(ssh, tmp_path):
+    blocker = str(tmp_path / "file")
+    open(blocker, "w").close()
+    with pytest.raises(IOError) as error:
+        ssh.mkdir_trees([str(tmp_path / "ok"), blocker + "/sub"])
+    assert "mkdir" in str(error.value)
+    assert os.path.isdir(str(tmp_path / "ok"))
+
+
+def test_upload_files_into_a_file_fails_early(ssh, tmp_path):
+    local = str(tmp_path / "local")
+    open(local, "w").close()
+    blocker = str(tmp_path / "blocker")
+    open(blocker, "w").close()
+    with pytest.raises(IOError) as error:
+        ssh.upload_files([(local, blocker + "/sub/file")])
+    assert "Not a directory" in str(error.value)
+
+
+def test_chmod_many_failure_raises(ssh, tmp_path):
+    path = str(tmp_path / "file")
+    open(path, "w").close()
+    with pytest.raises(IOError):
+        ssh.chmod_many([path, str(tmp_path / "missing")], 0o600)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
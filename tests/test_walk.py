@@ -0,0 +1,56 @@
+# -*- coding:utf-8 -*-
+# author = taoyin
+# github = https://github.com/intelyt/easyssh
+from __future__ import print_function, division
+import os
+import stat
+
+import pytest
+
+
+@pytest.fixture
+def folder(tmp_path):
+    root = tmp_path / "root"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "top").write_text("1")
+    (root / "a" / "mid").write_text("22")
+    (root / "a" / "b" / "deep").write_text("333")
+    os.symlink(str(root / "a" / "mid"), str(root / "link"))
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "linked").write_text("4444")
+    os.symlink(str(other), str(root / "folder_link"))
+    return str(root)
+
+
+def records(ssh, folder, use_find):
+    return sorted(
+        (os.path.relpath(record.path, folder), record.size, stat.S_ISREG(record.mode))
+        for record in ssh.walk_folder(folder, use_find)
+    )
+
+
+@pytest.mark.parametrize("use_find", [False, True])
+def test_walk_folder(ssh, folder, use_find):
+    assert records(ssh, folder, use_find) == [
+        ("a/b/deep", 3, True),
+        ("a/mid", 2, True),
+        ("folder_link/linked", 4, True),
+        ("link", 2, True),
+        ("top", 1, True),
+    ]
+    assert ssh.get_folder_files_size(folder, use_find) == 12
+    assert len(ssh.get_folder_files(folder, use_find)) == 5
+
+
+def test_sftp_and_find_agree_on_mtimes(ssh, folder):
+    def mtimes(use_find):
+        return sorted((record.path, record.mtime) for record in ssh.walk_folder(folder, use_find))
+
+    assert mtimes(False) == mtimes(True)
+
+
+@pytest.mark.parametrize("use_find", [False, True])
+def test_missing_folder_raises(ssh, tmp_path, use_find):
+    with pytest.raises(IOError):
+        list(ssh.walk_folder(str(tmp_path / "missing"), use_find))